@@ -16,6 +16,7 @@ import threading
 import asyncio
 import os
 import re
+import sys
 from typing import Optional, List
 import tempfile
 from datetime import datetime
@@ -23,82 +24,10 @@ from docxtpl import DocxTemplate
 from openpyxl import Workbook, load_workbook
 from openpyxl.styles import Font, Alignment
 
-# Импортируем новый менеджер базы данных
-try:
-    from database_manager import DatabaseManager
-    print("✅ Используется новый менеджер базы данных")
-except ImportError:
-    print("⚠️ Новый менеджер базы данных не найден, используем старый SQLite")
-    import sqlite3
-    
-    class DatabaseManager:
-        def __init__(self):
-            self.conn = sqlite3.connect('concrete.db')
-            self.create_tables()
-            self.db_type = 'sqlite'
-        
-        def create_tables(self):
-            scripts = [
-                """CREATE TABLE IF NOT EXISTS organizations (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL UNIQUE,
-                    contact TEXT,
-                    phone TEXT)""",
-                """CREATE TABLE IF NOT EXISTS objects (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    org_id INTEGER NOT NULL,
-                    name TEXT NOT NULL,
-                    address TEXT,
-                    FOREIGN KEY (org_id) REFERENCES organizations(id))""",
-                """CREATE TABLE IF NOT EXISTS constructions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    object_id INTEGER NOT NULL,
-                    pour_date TEXT NOT NULL,
-                    element TEXT,
-                    concrete_class TEXT,
-                    frost_resistance TEXT,
-                    water_resistance TEXT,
-                    supplier TEXT,
-                    concrete_passport TEXT,
-                    volume_concrete REAL,
-                    cubes_count INTEGER,
-                    cones_count INTEGER,
-                    slump TEXT,
-                    temperature TEXT,
-                    temp_measurements INTEGER,
-                    executor TEXT,
-                    act_number TEXT,
-                    request_number TEXT,
-                    FOREIGN KEY (object_id) REFERENCES objects(id))"""
-            ]
-            cursor = self.conn.cursor()
-            for script in scripts:
-                cursor.execute(script)
-            # Миграция: добавляем колонку 'invoice' в constructions, если отсутствует
-            cursor.execute("PRAGMA table_info(constructions)")
-            columns_info = cursor.fetchall()
-            column_names = [col[1] for col in columns_info]
-            if 'invoice' not in column_names:
-                cursor.execute("ALTER TABLE constructions ADD COLUMN invoice TEXT")
-            self.conn.commit()
-        
-        def close(self):
-            if self.conn:
-                self.conn.close()
-        
-        def get_connection_info(self):
-            return {
-                'type': 'SQLite (Fallback)',
-                'database': 'concrete.db',
-                'status': 'Connected'
-            }
-        
-        def test_connection(self):
-            try:
-                self.conn.execute("SELECT 1")
-                return True
-            except:
-                return False
+# Менеджер базы данных: SQLite или PostgreSQL Railway за одним интерфейсом
+import models
+import queries
+from database_manager import DatabaseManager
 
 # =================== Telegram Bot Service ===================
 TELEGRAM_BOT_TOKEN = os.getenv(
@@ -141,16 +70,8 @@ class TelegramBotService:
 
         def fetch_distinct(column: str) -> List[str]:
             try:
-                if self.db_manager.db_type == 'postgresql':
-                    query = f"SELECT DISTINCT {column} FROM constructions WHERE {column} IS NOT NULL AND {column} != '' ORDER BY {column}"
-                else:
-                    query = f"SELECT DISTINCT {column} FROM constructions WHERE {column} IS NOT NULL AND {column} != '' ORDER BY {column}"
-                
-                rows = fetchall(query)
-                if self.db_manager.db_type == 'postgresql':
-                    return [r[column] for r in rows if r.get(column)]
-                else:
-                    return [r[column] for r in rows if r.get(column)]
+                # Справочник уникальных значений ведет менеджер базы данных
+                return self.db_manager.fetch_distinct('constructions', column)
             except Exception as e:
                 print(f"[TG] Distinct query error: {e}")
                 return []
@@ -198,7 +119,8 @@ class ConcreteApp(tk.Tk):
 
         # Инициализируем менеджер базы данных
         try:
-            self.db = DatabaseManager()
+            # Строки-словари и для SQLite, и для PostgreSQL
+            self.db = DatabaseManager(row_factory='dict')
             print(f"✅ База данных: {self.db.get_connection_info()}")
         except Exception as e:
             print(f"❌ Ошибка инициализации БД: {e}")
@@ -496,17 +418,10 @@ class ConcreteApp(tk.Tk):
 
     def load_organizations(self):
         try:
-            if self.db.db_type == 'postgresql':
-                rows = self.db.execute_query("SELECT id, name FROM organizations ORDER BY name")
-                self.org_tree.delete(*self.org_tree.get_children())
-                for row in rows:
-                    self.org_tree.insert("", tk.END, values=(row['name'],), iid=row['id'])
-            else:
-                cursor = self.db.conn.cursor()
-                cursor.execute("SELECT id, name FROM organizations")
-                self.org_tree.delete(*self.org_tree.get_children())
-                for row in cursor.fetchall():
-                    self.org_tree.insert("", tk.END, values=(row[1],), iid=row[0])
+            orgs = self.db.execute_named('organizations.list', record=models.Organization)
+            self.org_tree.delete(*self.org_tree.get_children())
+            for org in orgs:
+                self.org_tree.insert("", tk.END, values=(org.name,), iid=org.id)
         except Exception as e:
             print(f"Ошибка загрузки организаций: {e}")
             messagebox.showerror("Ошибка", f"Не удалось загрузить организации:\n{str(e)}")
@@ -516,17 +431,10 @@ class ConcreteApp(tk.Tk):
             return
             
         try:
-            if self.db.db_type == 'postgresql':
-                rows = self.db.execute_query("SELECT id, name, address FROM objects WHERE org_id = %s ORDER BY name", (self.current_org_id,))
-                self.object_tree.delete(*self.object_tree.get_children())
-                for row in rows:
-                    self.object_tree.insert("", tk.END, values=(row['name'], row['address']), iid=row['id'])
-            else:
-                cursor = self.db.conn.cursor()
-                cursor.execute("SELECT id, name, address FROM objects WHERE org_id = ?", (self.current_org_id,))
-                self.object_tree.delete(*self.object_tree.get_children())
-                for row in cursor.fetchall():
-                    self.object_tree.insert("", tk.END, values=row[1:], iid=row[0])
+            objects = self.db.execute_named('objects.by_org', (self.current_org_id,), record=models.Object)
+            self.object_tree.delete(*self.object_tree.get_children())
+            for obj in objects:
+                self.object_tree.insert("", tk.END, values=(obj.name, obj.address), iid=obj.id)
         except Exception as e:
             print(f"Ошибка загрузки объектов: {e}")
             messagebox.showerror("Ошибка", f"Не удалось загрузить объекты:\n{str(e)}")
@@ -538,49 +446,17 @@ class ConcreteApp(tk.Tk):
         self.construction_tree.delete(*self.construction_tree.get_children())
 
         try:
-            if self.db.db_type == 'postgresql':
-                query = """
-                    SELECT id, pour_date, element, concrete_class, frost_resistance, water_resistance,
-                    supplier, concrete_passport, volume_concrete, cubes_count, cones_count,
-                    slump, temperature, temp_measurements, executor, act_number, request_number, invoice
-                    FROM constructions 
-                    WHERE object_id = %s
-                """
-                params = [self.current_object_id]
-
-                if filters:
-                    query += " AND " + " AND ".join([f"{key} LIKE %s" for key in filters.keys()])
-                    params.extend([f"%{value}%" for value in filters.values()])
-
-                rows = self.db.execute_query(query, tuple(params))
-                
-                for row in rows:
-                    values = ["☐"] + [str(row.get(col, "")) for col in [
-                        'pour_date', 'element', 'concrete_class', 'frost_resistance', 'water_resistance',
-                        'supplier', 'concrete_passport', 'volume_concrete', 'cubes_count', 'cones_count',
-                        'slump', 'temperature', 'temp_measurements', 'executor', 'act_number', 'request_number', 'invoice'
-                    ]]
-                    self.construction_tree.insert("", "end", values=values, iid=row['id'])
-            else:
-                cursor = self.db.conn.cursor()
-                query = """
-                    SELECT id, pour_date, element, concrete_class, frost_resistance, water_resistance,
-                    supplier, concrete_passport, volume_concrete, cubes_count, cones_count,
-                    slump, temperature, temp_measurements, executor, act_number, request_number, invoice
-                    FROM constructions 
-                    WHERE object_id = ?
-                """
-                params = [self.current_object_id]
-
-                if filters:
-                    query += " AND " + " AND ".join([f"{key} LIKE ?" for key in filters.keys()])
-                    params.extend([f"%{value}%" for value in filters.values()])
-
-                cursor.execute(query, params)
-                
-                for row in cursor.fetchall():
-                    values = ["☐"] + [str(row[i]) if row[i] is not None else "" for i in range(1, len(row))]
-                    self.construction_tree.insert("", "end", values=values, iid=row[0])
+            query = queries.sql('constructions.by_object', self.db.db_type)
+            params = [self.current_object_id]
+
+            if filters:
+                query += " AND " + " AND ".join([f"{key} LIKE {self.db.placeholder}" for key in filters.keys()])
+                params.extend([f"%{value}%" for value in filters.values()])
+
+            # Серверный курсор: записи приходят порциями, а не все сразу
+            for row in self.db.iter_query(query, tuple(params), record=models.Construction):
+                values = ["☐"] + ["" if value is None else str(value) for value in row.data_values]
+                self.construction_tree.insert("", "end", values=values, iid=row.id)
             
             self.update_counters()
             self.update_header_checkbox_state()
@@ -1,35 +1,43 @@
+from startup_profiler import profiler
+
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog, filedialog
 from ttkbootstrap import Style
 from ttkbootstrap.widgets import DateEntry
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import (
-    ApplicationBuilder,
-    CommandHandler,
-    MessageHandler,
-    CallbackQueryHandler,
-    ConversationHandler,
-    ContextTypes,
-    filters,
-)
-import threading
-import asyncio
-import os
-import re
-from typing import Optional, List
-import tempfile
 import sqlite3
-from datetime import datetime
 import os
-from docxtpl import DocxTemplate
-from openpyxl import Workbook, load_workbook
-from openpyxl.styles import Font, Alignment
+from datetime import datetime
+
+import archive
+import change_log
+import distinct_cache
+import documents
+import models
+import queries
+import query_stats
+import scheduler
+import usage_ranking
+import write_queue
+from distinct_cache import DistinctValueCache
+from lazy_imports import lazy_import, import_report, report_enabled
+
+profiler.mark('imports')
+
+# Период опроса изменений из бота и других окон, мс
+CHANGE_POLL_MS = 1000
+# Задержка запуска фоновых задач после старта окна, мс
+BACKGROUND_JOBS_DELAY_MS = 5000
 
 
 class ConcreteDatabase:
     def __init__(self):
-        self.conn = sqlite3.connect('concrete.db')
+        self.conn = query_stats.connect('concrete.db')
         self.create_tables()
+        # Архивы прошлых лет и представление all_constructions для поиска и выгрузки
+        self.archive_years = archive.attach_archives(self.conn)
+        self.distinct_cache = DistinctValueCache(self.conn)
+        # Вставки и правки записей контроля идут через общую с ботом очередь
+        self.writes = write_queue.get_queue('concrete.db')
     
     def create_tables(self):
         scripts = [
@@ -74,867 +82,41 @@ class ConcreteDatabase:
         column_names = [col[1] for col in columns_info]
         if 'invoice' not in column_names:
             cursor.execute("ALTER TABLE constructions ADD COLUMN invoice TEXT")
+        # Индексы для постраничного вывода объектов и записей контроля
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_objects_org_id ON objects(org_id, name)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_constructions_object_id ON constructions(object_id)")
+        # Справочник уникальных значений для выпадающих списков и клавиатур бота
+        distinct_cache.ensure_schema(self.conn)
+        # Счетчики использования значений для подсказок бота
+        usage_ranking.ensure_schema(self.conn)
+        # Журнал изменений для синхронизации с PostgreSQL
+        change_log.ensure_schema(self.conn)
         self.conn.commit()
 
 
-# =================== Telegram Bot Service ===================
-TELEGRAM_BOT_TOKEN = os.getenv(
-    'TELEGRAM_BOT_TOKEN',
-    '7619596833:AAEtEBVEcQeyevk61-kZdXvpZp1skfdzomA'
-)
-
-class TelegramBotService:
-    """Background Telegram bot that guides user to add a new construction record."""
-
-    # Conversation states
-    (ACTION, ORG, OBJ, CLASS, FROST, WATER, ELEMENT, SUPPLIER, PASSPORT,
-     CUBES, CONES, SLUMP, VOLUME, TEMP, TEMP_MEAS, EXECUTOR, ACT, REQUEST, DATE,
-     SEND_ACT, DOC_PICK, ORG_DOCS, OBJ_DOCS) = range(23)
-
-    def __init__(self, token: str, db_path: str = 'concrete.db'):
-        self.token = token
-        self.db_path = db_path
-        self.thread: Optional[threading.Thread] = None
-
-    def is_running(self) -> bool:
-        return self.thread is not None and self.thread.is_alive()
-
-    def start(self) -> None:
-        if self.is_running():
-            return
-        self.thread = threading.Thread(target=self._run, daemon=True)
-        self.thread.start()
-
-    def _run(self) -> None:
-        print("[TG] Building application...")
-        application = ApplicationBuilder().token(self.token).build()
-
-        # Local DB connection for this thread
-        try:
-            db_conn = sqlite3.connect(self.db_path)
-        except Exception as e:
-            print(f"[TG] DB connect error: {e}")
-            return
-
-        def fetchall(query: str, params: tuple = ()):
-            cur = db_conn.cursor()
-            cur.execute(query, params)
-            return cur.fetchall()
-
-        def fetch_distinct(column: str) -> List[str]:
-            rows = fetchall(
-                f"SELECT DISTINCT {column} FROM constructions WHERE {column} IS NOT NULL AND {column} != '' ORDER BY {column}"
-            )
-            return [r[0] for r in rows]
-
-        async def start_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
-            keyboard = [
-                [InlineKeyboardButton("Хочу добавить контроль", callback_data="ACTION:ADD")],
-                [InlineKeyboardButton("Сформировать документ по записи", callback_data="ACTION:DOCS")]
-            ]
-            await update.effective_message.reply_text(
-                "Че надо?",
-                reply_markup=InlineKeyboardMarkup(keyboard)
-            )
-            return self.ACTION
-
-        async def action_selected(update: Update, context: ContextTypes.DEFAULT_TYPE):
-            query = update.callback_query
-            await query.answer()
-            if query.data == "ACTION:ADD":
-                # Ask for organization
-                orgs = fetchall("SELECT id, name FROM organizations ORDER BY name")
-                if not orgs:
-                    await query.edit_message_text("Нет организаций в базе.")
-                    return ConversationHandler.END
-                keyboard = []
-                row = []
-                for oid, name in orgs:
-                    row.append(InlineKeyboardButton(name, callback_data=f"ORG:{oid}"))
-                    if len(row) == 2:
-                        keyboard.append(row)
-                        row = []
-                if row:
-                    keyboard.append(row)
-                await query.edit_message_text(
-                    "Какая организация?",
-                    reply_markup=InlineKeyboardMarkup(keyboard)
-                )
-                return self.ORG
-            if query.data == "ACTION:DOCS":
-                # Сначала спросим организацию
-                orgs = fetchall("SELECT id, name FROM organizations ORDER BY name")
-                if not orgs:
-                    await query.edit_message_text("Нет организаций в базе.")
-                    return ConversationHandler.END
-                keyboard = []
-                row = []
-                for oid, name in orgs:
-                    row.append(InlineKeyboardButton(name, callback_data=f"ORG_DOCS:{oid}"))
-                    if len(row) == 2:
-                        keyboard.append(row)
-                        row = []
-                if row:
-                    keyboard.append(row)
-                await query.edit_message_text("Выберите организацию:", reply_markup=InlineKeyboardMarkup(keyboard))
-                return self.ORG_DOCS
-            return ConversationHandler.END
-        async def pick_construction(update: Update, context: ContextTypes.DEFAULT_TYPE):
-            query = update.callback_query
-            await query.answer()
-            m = re.match(r"PICK:(\d+)", query.data)
-            if not m:
-                await query.edit_message_text("Неверный выбор")
-                return ConversationHandler.END
-            constr_id = int(m.group(1))
-            # Предложить что сформировать
-            keyboard = [
-                [InlineKeyboardButton("Акт", callback_data=f"MAKE:ACT:{constr_id}"), InlineKeyboardButton("Заявку", callback_data=f"MAKE:REQ:{constr_id}")],
-                [InlineKeyboardButton("Оба", callback_data=f"MAKE:BOTH:{constr_id}")]
-            ]
-            await query.edit_message_text("Что сформировать?", reply_markup=InlineKeyboardMarkup(keyboard))
-            return self.DOC_PICK
-
-        async def org_docs_selected(update: Update, context: ContextTypes.DEFAULT_TYPE):
-            query = update.callback_query
-            await query.answer()
-            m = re.match(r"ORG_DOCS:(\d+)", query.data)
-            if not m:
-                await query.edit_message_text("Неверный выбор организации")
-                return ConversationHandler.END
-            org_id = int(m.group(1))
-            context.user_data['org_docs_id'] = org_id
-            objs = fetchall("SELECT id, name FROM objects WHERE org_id=? ORDER BY name", (org_id,))
-            if not objs:
-                await query.edit_message_text("У организации нет объектов.")
-                return ConversationHandler.END
-            keyboard = []
-            row = []
-            for oid, name in objs:
-                row.append(InlineKeyboardButton(name, callback_data=f"OBJ_DOCS:{oid}"))
-                if len(row) == 2:
-                    keyboard.append(row)
-                    row = []
-            if row:
-                keyboard.append(row)
-            await query.edit_message_text("Выберите объект:", reply_markup=InlineKeyboardMarkup(keyboard))
-            return self.OBJ_DOCS
-
-        async def obj_docs_selected(update: Update, context: ContextTypes.DEFAULT_TYPE):
-            query = update.callback_query
-            await query.answer()
-            m = re.match(r"OBJ_DOCS:(\d+)", query.data)
-            if not m:
-                await query.edit_message_text("Неверный выбор объекта")
-                return ConversationHandler.END
-            object_id = int(m.group(1))
-            # Показываем последние 50 записей по объекту
-            rows = fetchall(
-                """
-                SELECT id, pour_date, element, concrete_class
-                FROM constructions
-                WHERE object_id = ?
-                ORDER BY id DESC LIMIT 50
-                """,
-                (object_id,)
-            )
-            if not rows:
-                await query.edit_message_text("Нет контролей по этому объекту")
-                return ConversationHandler.END
-            keyboard = []
-            for cid, date, elem, cls in rows:
-                text = f"#{cid} | {date or ''} | {elem or ''} | {cls or ''}"
-                keyboard.append([InlineKeyboardButton(text[:60], callback_data=f"PICK:{cid}")])
-            await query.edit_message_text("Выбери запись:", reply_markup=InlineKeyboardMarkup(keyboard))
-            return self.DOC_PICK
-
-        async def make_docs(update: Update, context: ContextTypes.DEFAULT_TYPE):
-            query = update.callback_query
-            await query.answer()
-            parts = query.data.split(":")
-            if len(parts) != 3:
-                await query.edit_message_text("Ошибка параметров")
-                return ConversationHandler.END
-            _, kind, id_str = parts
-            constr_id = int(id_str)
-            try:
-                cur = db_conn.cursor()
-                cur.execute("""
-                    SELECT 
-                        c.pour_date, c.element, c.concrete_class, c.frost_resistance, c.water_resistance,  
-                        c.supplier, c.concrete_passport, c.volume_concrete, c.cubes_count, c.act_number, c.request_number,
-                        o.name as object_name, o.address,
-                        org.name as org_name, org.contact, org.phone
-                    FROM constructions c
-                    JOIN objects o ON c.object_id = o.id
-                    JOIN organizations org ON o.org_id = org.id
-                    WHERE c.id = ?
-                """, (constr_id,))
-                columns = [col[0] for col in cur.description]
-                row = cur.fetchone()
-                if not row:
-                    await query.edit_message_text("Запись не найдена")
-                    return ConversationHandler.END
-                construction_data = dict(zip(columns, row))
-
-                async def render_and_send(template_file: str, doc_type: str, filename: str):
-                    context_tpl = {
-                        'doc_type': doc_type,
-                        'current_date': datetime.now().strftime("%d.%m.%Y"),
-                        'construction': {
-                            'object': construction_data.get('object_name', '') or '',
-                            'address': construction_data.get('address', '') or '',
-                            'date': construction_data.get('pour_date', '') or '',
-                            'element': construction_data.get('element', '') or '',  
-                            'concrete': construction_data.get('concrete_class', '') or '',
-                            'frost': construction_data.get('frost_resistance', '') or '',
-                            'water': construction_data.get('water_resistance', '') or '',
-                            'supplier': construction_data.get('supplier', '') or '',
-                            'passport': construction_data.get('concrete_passport', '') or '',
-                            'volume': construction_data.get('volume_concrete', '') or '',
-                            'act': construction_data.get('act_number', '') or '',
-                            'request': construction_data.get('request_number', '') or '' 
-                        },
-                        'organization': {
-                            'name': construction_data.get('org_name', '') or '',
-                            'contact': construction_data.get('contact', '') or '',
-                            'phone': construction_data.get('phone', '') or ''
-                        }
-                    }
-                    base_dir = os.path.dirname(os.path.abspath(__file__))
-                    template_path = os.path.join(base_dir, template_file)
-                    if not os.path.exists(template_path):
-                        await query.message.reply_text(f"Шаблон не найден: {template_path}")
-                        return False
-                    with tempfile.TemporaryDirectory() as tmpdir:
-                        out_path = os.path.join(tmpdir, filename)
-                        doc = DocxTemplate(template_path)
-                        doc.render(context_tpl)
-                        doc.save(out_path)
-                        with open(out_path, 'rb') as f:
-                            await query.message.reply_document(document=f, filename=filename)
-                    return True
-
-                sent_any = False
-                if kind in ('ACT', 'BOTH'):
-                    ok = await render_and_send('act_template.docx', 'Акт', 'act.docx')
-                    sent_any = sent_any or ok
-                if kind in ('REQ', 'BOTH'):
-                    ok = await render_and_send('request_template.docx', 'Заявка', 'request.docx')
-                    sent_any = sent_any or ok
-                await query.edit_message_text("Готово" if sent_any else "Не удалось отправить документы")
-            except Exception as e:
-                await query.edit_message_text(f"Ошибка: {str(e)}")
-            return ConversationHandler.END
-
-        async def org_selected(update: Update, context: ContextTypes.DEFAULT_TYPE):
-            query = update.callback_query
-            await query.answer()
-            m = re.match(r"ORG:(\d+)", query.data)
-            if not m:
-                await query.edit_message_text("Неверный выбор организации")
-                return ConversationHandler.END
-            org_id = int(m.group(1))
-            context.user_data['org_id'] = org_id
-
-            objs = fetchall("SELECT id, name FROM objects WHERE org_id=? ORDER BY name", (org_id,))
-            if not objs:
-                await query.edit_message_text("У организации нет объектов.")
-                return ConversationHandler.END
-            keyboard = []
-            row = []
-            for oid, name in objs:
-                row.append(InlineKeyboardButton(name, callback_data=f"OBJ:{oid}"))
-                if len(row) == 2:
-                    keyboard.append(row)
-                    row = []
-            if row:
-                keyboard.append(row)
-            await query.edit_message_text(
-                "Какой объект?",
-                reply_markup=InlineKeyboardMarkup(keyboard)
-            )
-            return self.OBJ
-
-        async def obj_selected(update: Update, context: ContextTypes.DEFAULT_TYPE):
-            query = update.callback_query
-            await query.answer()
-            m = re.match(r"OBJ:(\d+)", query.data)
-            if not m:
-                await query.edit_message_text("Неверный выбор объекта")
-                return ConversationHandler.END
-            object_id = int(m.group(1))
-            context.user_data['object_id'] = object_id
-
-            # Объединяем значения из БД и расширенный справочник
-            classes_db = fetch_distinct('concrete_class')
-            classes_fallback = ["B7,5", "B10", "B12,5", "B15", "B20", "B22,5", "B25", "B27,5", "B30", "B35", "B40", "B45", "B50"]
-            classes = []
-            for v in classes_db + classes_fallback:
-                if v not in classes:
-                    classes.append(v)
-            keyboard = []
-            row = []
-            for val in classes:
-                row.append(InlineKeyboardButton(val, callback_data=f"CLASS:{val}"))
-                if len(row) == 3:
-                    keyboard.append(row)
-                    row = []
-            if row:
-                keyboard.append(row)
-            keyboard.append([InlineKeyboardButton("Пропустить", callback_data="SKIP:concrete_class")])
-            await query.edit_message_text("Класс бетона?", reply_markup=InlineKeyboardMarkup(keyboard))
-            return self.CLASS
-
-        async def class_selected(update: Update, context: ContextTypes.DEFAULT_TYPE):
-            query = update.callback_query
-            await query.answer()
-            context.user_data['concrete_class'] = query.data.split(":", 1)[1]
-
-            frosts_db = fetch_distinct('frost_resistance')
-            frosts_fallback = ["F50", "F75", "F100", "F150", "F200", "F300", "F400", "F500"]
-            frosts = []
-            for v in frosts_db + frosts_fallback:
-                if v not in frosts:
-                    frosts.append(v)
-            keyboard = []
-            row = []
-            for val in frosts:
-                row.append(InlineKeyboardButton(val, callback_data=f"FROST:{val}"))
-                if len(row) == 3:
-                    keyboard.append(row)
-                    row = []
-            if row:
-                keyboard.append(row)
-            keyboard.append([InlineKeyboardButton("Пропустить", callback_data="SKIP:frost_resistance")])
-            await query.edit_message_text("Морозостойкость?", reply_markup=InlineKeyboardMarkup(keyboard))
-            return self.FROST
-
-        async def frost_selected(update: Update, context: ContextTypes.DEFAULT_TYPE):
-            query = update.callback_query
-            await query.answer()
-            context.user_data['frost_resistance'] = query.data.split(":", 1)[1]
-
-            waters_db = fetch_distinct('water_resistance')
-            waters_fallback = ["W2", "W4", "W6", "W8", "W10", "W12", "W14"]
-            waters = []
-            for v in waters_db + waters_fallback:
-                if v not in waters:
-                    waters.append(v)
-            keyboard = []
-            row = []
-            for val in waters:
-                row.append(InlineKeyboardButton(val, callback_data=f"WATER:{val}"))
-                if len(row) == 3:
-                    keyboard.append(row)
-                    row = []
-            if row:
-                keyboard.append(row)
-            keyboard.append([InlineKeyboardButton("Пропустить", callback_data="SKIP:water_resistance")])
-            await query.edit_message_text("Водопроницаемость?", reply_markup=InlineKeyboardMarkup(keyboard))
-            return self.WATER
-
-        async def water_selected(update: Update, context: ContextTypes.DEFAULT_TYPE):
-            query = update.callback_query
-            await query.answer()
-            context.user_data['water_resistance'] = query.data.split(":", 1)[1]
-            await query.edit_message_text("Конструктив? (введите текст)", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Пропустить", callback_data="SKIP:element")]]))
-            return self.ELEMENT
-
-        async def element_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
-            context.user_data['element'] = update.message.text.strip()
-            suppliers = fetch_distinct('supplier')
-            if not suppliers:
-                suppliers = ["Неизвестно"]
-            keyboard = []
-            row = []
-            for val in suppliers:
-                row.append(InlineKeyboardButton(val, callback_data=f"SUPPLIER:{val}"))
-                if len(row) == 2:
-                    keyboard.append(row)
-                    row = []
-            if row:
-                keyboard.append(row)
-            keyboard.append([InlineKeyboardButton("Пропустить", callback_data="SKIP:supplier")])
-            await update.message.reply_text("Поставщик?", reply_markup=InlineKeyboardMarkup(keyboard))
-            return self.SUPPLIER
-
-        async def supplier_selected(update: Update, context: ContextTypes.DEFAULT_TYPE):
-            query = update.callback_query
-            await query.answer()
-            context.user_data['supplier'] = query.data.split(":", 1)[1]
-            await query.edit_message_text("Паспорт? (введите текст)", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Пропустить", callback_data="SKIP:concrete_passport")]]))
-            return self.PASSPORT
-
-        async def passport_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
-            context.user_data['concrete_passport'] = update.message.text.strip()
-            await update.message.reply_text("Количество кубиков? (число)", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Пропустить", callback_data="SKIP:cubes_count")]]))
-            return self.CUBES
-
-        async def cubes_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
-            try:
-                context.user_data['cubes_count'] = int(update.message.text.strip())
-            except Exception:
-                await update.message.reply_text("Введите целое число для кубиков")
-                return self.CUBES
-            await update.message.reply_text("Количество конусов? (число)", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Пропустить", callback_data="SKIP:cones_count")]]))
-            return self.CONES
-
-        async def cones_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
-            try:
-                context.user_data['cones_count'] = int(update.message.text.strip())
-            except Exception:
-                await update.message.reply_text("Введите целое число для конусов")
-                return self.CONES
-            await update.message.reply_text("Просадка? (введите текст, например 10)", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Пропустить", callback_data="SKIP:slump")]]))
-            return self.SLUMP
-
-        async def slump_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
-            context.user_data['slump'] = update.message.text.strip()
-            await update.message.reply_text("Объем бетонной смеси? (число, можно с точкой)", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Пропустить", callback_data="SKIP:volume_concrete")]]))
-            return self.VOLUME
-
-        async def volume_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
-            try:
-                context.user_data['volume_concrete'] = float(update.message.text.strip())
-            except Exception:
-                await update.message.reply_text("Введите число для объема")
-                return self.VOLUME
-            await update.message.reply_text("Температура? (введите текст, например 12)", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Пропустить", callback_data="SKIP:temperature")]]))
-            return self.TEMP
-
-        async def temp_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
-            context.user_data['temperature'] = update.message.text.strip()
-            await update.message.reply_text("Сколько замеров темп.? (целое число)", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Пропустить", callback_data="SKIP:temp_measurements")]]))
-            return self.TEMP_MEAS
-
-        async def temp_meas_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
-            try:
-                context.user_data['temp_measurements'] = int(update.message.text.strip())
-            except Exception:
-                await update.message.reply_text("Введите целое число для замеров")
-                return self.TEMP_MEAS
-
-            executors = fetch_distinct('executor')
-            if not executors:
-                executors = ["Исполнитель"]
-            keyboard = []
-            row = []
-            for val in executors:
-                row.append(InlineKeyboardButton(val, callback_data=f"EXECUTOR:{val}"))
-                if len(row) == 2:
-                    keyboard.append(row)
-                    row = []
-            if row:
-                keyboard.append(row)
-            keyboard.append([InlineKeyboardButton("Пропустить", callback_data="SKIP:executor")])
-            await update.message.reply_text("Исполнитель?", reply_markup=InlineKeyboardMarkup(keyboard))
-            return self.EXECUTOR
-
-        async def executor_selected(update: Update, context: ContextTypes.DEFAULT_TYPE):
-            query = update.callback_query
-            await query.answer()
-            context.user_data['executor'] = query.data.split(":", 1)[1]
-            await query.edit_message_text("Как назвать Акт? (введите текст)", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Пропустить", callback_data="SKIP:act_number")]]))
-            return self.ACT
-
-        async def act_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
-            context.user_data['act_number'] = update.message.text.strip()
-            await update.message.reply_text("№ Заявки? (введите текст)")
-            return self.REQUEST
-
-        async def request_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
-            context.user_data['request_number'] = update.message.text.strip()
-            keyboard = [[InlineKeyboardButton("Сегодня", callback_data="DATE:TODAY")], [InlineKeyboardButton("Пропустить", callback_data="SKIP:pour_date")]]
-            await update.message.reply_text(
-                "Какая дата? (введите ДД-ММ-ГГГГ или нажмите 'Сегодня')",
-                reply_markup=InlineKeyboardMarkup(keyboard)
-            )
-            return self.DATE
-
-        async def date_today(update: Update, context: ContextTypes.DEFAULT_TYPE):
-            query = update.callback_query
-            await query.answer()
-            from datetime import datetime as dt
-            context.user_data['pour_date'] = dt.now().strftime("%d-%m-%Y")
-            return await finalize_and_save(update, context, edit_message=True)
-
-        async def date_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
-            text = update.message.text.strip()
-            if not re.match(r"^\d{2}-\d{2}-\d{4}$", text):
-                await update.message.reply_text("Формат даты: ДД-ММ-ГГГГ")
-                return self.DATE
-            context.user_data['pour_date'] = text
-            return await finalize_and_save(update, context, edit_message=False)
-
-        async def skip_selected(update: Update, context: ContextTypes.DEFAULT_TYPE):
-            query = update.callback_query
-            await query.answer()
-            field = query.data.split(":", 1)[1]
-            defaults = {
-                'concrete_class': '',
-                'frost_resistance': '',
-                'water_resistance': '',
-                'element': '',
-                'supplier': '',
-                'concrete_passport': '',
-                'cubes_count': 0,
-                'cones_count': 0,
-                'slump': '',
-                'volume_concrete': 0.0,
-                'temperature': '',
-                'temp_measurements': 0,
-                'executor': '',
-                'act_number': '',
-                'request_number': '',
-                'pour_date': None,
-            }
-            context.user_data[field] = defaults.get(field)
-
-            # route to next step
-            if field == 'concrete_class':
-                frosts = fetch_distinct('frost_resistance')
-                if not frosts:
-                    frosts = ["F50", "F100", "F150", "F200", "F300", "F400"]
-                keyboard = []
-                row = []
-                for val in frosts:
-                    row.append(InlineKeyboardButton(val, callback_data=f"FROST:{val}"))
-                    if len(row) == 3:
-                        keyboard.append(row)
-                        row = []
-                if row:
-                    keyboard.append(row)
-                keyboard.append([InlineKeyboardButton("Пропустить", callback_data="SKIP:frost_resistance")])
-                await query.edit_message_text("Морозостойкость?", reply_markup=InlineKeyboardMarkup(keyboard))
-                return self.FROST
-            if field == 'frost_resistance':
-                waters = fetch_distinct('water_resistance')
-                if not waters:
-                    waters = ["W2", "W4", "W6", "W8", "W10"]
-                keyboard = []
-                row = []
-                for val in waters:
-                    row.append(InlineKeyboardButton(val, callback_data=f"WATER:{val}"))
-                    if len(row) == 3:
-                        keyboard.append(row)
-                        row = []
-                if row:
-                    keyboard.append(row)
-                keyboard.append([InlineKeyboardButton("Пропустить", callback_data="SKIP:water_resistance")])
-                await query.edit_message_text("Водопроницаемость?", reply_markup=InlineKeyboardMarkup(keyboard))
-                return self.WATER
-            if field == 'water_resistance':
-                await query.edit_message_text("Конструктив? (введите текст)", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Пропустить", callback_data="SKIP:element")]]))
-                return self.ELEMENT
-            if field == 'element':
-                suppliers = fetch_distinct('supplier')
-                if not suppliers:
-                    suppliers = ["Неизвестно"]
-                keyboard = []
-                row = []
-                for val in suppliers:
-                    row.append(InlineKeyboardButton(val, callback_data=f"SUPPLIER:{val}"))
-                    if len(row) == 2:
-                        keyboard.append(row)
-                        row = []
-                if row:
-                    keyboard.append(row)
-                keyboard.append([InlineKeyboardButton("Пропустить", callback_data="SKIP:supplier")])
-                await query.edit_message_text("Поставщик?", reply_markup=InlineKeyboardMarkup(keyboard))
-                return self.SUPPLIER
-            if field == 'supplier':
-                await query.edit_message_text("Паспорт? (введите текст)", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Пропустить", callback_data="SKIP:concrete_passport")]]))
-                return self.PASSPORT
-            if field == 'concrete_passport':
-                await query.edit_message_text("Количество кубиков? (число)", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Пропустить", callback_data="SKIP:cubes_count")]]))
-                return self.CUBES
-            if field == 'cubes_count':
-                await query.edit_message_text("Количество конусов? (число)", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Пропустить", callback_data="SKIP:cones_count")]]))
-                return self.CONES
-            if field == 'cones_count':
-                await query.edit_message_text("Просадка? (введите текст, например 10)", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Пропустить", callback_data="SKIP:slump")]]))
-                return self.SLUMP
-            if field == 'slump':
-                await query.edit_message_text("Объем бетонной смеси? (число, можно с точкой)", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Пропустить", callback_data="SKIP:volume_concrete")]]))
-                return self.VOLUME
-            if field == 'volume_concrete':
-                await query.edit_message_text("Температура? (введите текст, например 12)", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Пропустить", callback_data="SKIP:temperature")]]))
-                return self.TEMP
-            if field == 'temperature':
-                await query.edit_message_text("Сколько замеров темп.? (целое число)", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Пропустить", callback_data="SKIP:temp_measurements")]]))
-                return self.TEMP_MEAS
-            if field == 'temp_measurements':
-                executors = fetch_distinct('executor')
-                if not executors:
-                    executors = ["Исполнитель"]
-                keyboard = []
-                row = []
-                for val in executors:
-                    row.append(InlineKeyboardButton(val, callback_data=f"EXECUTOR:{val}"))
-                    if len(row) == 2:
-                        keyboard.append(row)
-                        row = []
-                if row:
-                    keyboard.append(row)
-                keyboard.append([InlineKeyboardButton("Пропустить", callback_data="SKIP:executor")])
-                await query.edit_message_text("Исполнитель?", reply_markup=InlineKeyboardMarkup(keyboard))
-                return self.EXECUTOR
-            if field == 'executor':
-                await query.edit_message_text("Как назвать Акт? (введите текст)", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Пропустить", callback_data="SKIP:act_number")]]))
-                return self.ACT
-            if field == 'act_number':
-                await query.edit_message_text("№ Заявки? (введите текст)", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Пропустить", callback_data="SKIP:request_number")]]))
-                return self.REQUEST
-            if field == 'request_number':
-                keyboard = [[InlineKeyboardButton("Сегодня", callback_data="DATE:TODAY")], [InlineKeyboardButton("Пропустить", callback_data="SKIP:pour_date")]]
-                await query.edit_message_text("Какая дата? (введите ДД-ММ-ГГГГ или нажмите 'Сегодня')", reply_markup=InlineKeyboardMarkup(keyboard))
-                return self.DATE
-            if field == 'pour_date':
-                from datetime import datetime as dt
-                context.user_data['pour_date'] = dt.now().strftime("%d-%m-%Y")
-                return await finalize_and_save(update, context, edit_message=True)
-            await query.edit_message_text("Отменено")
-            return ConversationHandler.END
-
-        async def finalize_and_save(update: Update, context: ContextTypes.DEFAULT_TYPE, edit_message: bool):
-            data = context.user_data
-            # Required fields defaulting
-            fields = {
-                'object_id': int(data.get('object_id')),
-                'pour_date': data.get('pour_date') or '',
-                'element': data.get('element') or '',
-                'concrete_class': data.get('concrete_class') or '',
-                'frost_resistance': data.get('frost_resistance') or '',
-                'water_resistance': data.get('water_resistance') or '',
-                'supplier': data.get('supplier') or '',
-                'concrete_passport': data.get('concrete_passport') or '',
-                'volume_concrete': float(data.get('volume_concrete') or 0),
-                'cubes_count': int(data.get('cubes_count') or 0),
-                'cones_count': int(data.get('cones_count') or 0),
-                'slump': data.get('slump') or '',
-                'temperature': data.get('temperature') or '',
-                'temp_measurements': int(data.get('temp_measurements') or 0),
-                'executor': data.get('executor') or '',
-                'act_number': data.get('act_number') or '',
-                'request_number': data.get('request_number') or '',
-                'invoice': ''
-            }
-            try:
-                cur = db_conn.cursor()
-                cur.execute(
-                    """
-                    INSERT INTO constructions (
-                        object_id, pour_date, element, concrete_class, frost_resistance,
-                        water_resistance, supplier, concrete_passport, volume_concrete, cubes_count,
-                        cones_count, slump, temperature, temp_measurements,
-                        executor, act_number, request_number, invoice
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
-                    (
-                        fields['object_id'], fields['pour_date'], fields['element'], fields['concrete_class'],
-                        fields['frost_resistance'], fields['water_resistance'], fields['supplier'], fields['concrete_passport'],
-                        fields['volume_concrete'], fields['cubes_count'], fields['cones_count'], fields['slump'],
-                        fields['temperature'], fields['temp_measurements'], fields['executor'], fields['act_number'],
-                        fields['request_number'], fields['invoice']
-                    )
-                )
-                db_conn.commit()
-                new_id = cur.lastrowid
-            except Exception as e:
-                msg = f"Ошибка сохранения: {str(e)}"
-                if edit_message and update.callback_query:
-                    await update.callback_query.edit_message_text(msg)
-                else:
-                    await update.effective_message.reply_text(msg)
-                return ConversationHandler.END
-
-            # Предложить сразу прислать документы
-            context.user_data['new_construction_id'] = new_id
-            keyboard = [
-                [InlineKeyboardButton("Прислать акт", callback_data="SEND:ACT"), InlineKeyboardButton("Прислать заявку", callback_data="SEND:REQ")],
-                [InlineKeyboardButton("Прислать оба", callback_data="SEND:BOTH")],
-                [InlineKeyboardButton("Нет, спасибо", callback_data="SEND:NONE")]
-            ]
-            text = "Молодец что не был ленивой жопой и заполнил базу данных. Что прислать?"
-            if edit_message and update.callback_query:
-                await update.callback_query.edit_message_text(text, reply_markup=InlineKeyboardMarkup(keyboard))
-            else:
-                await update.effective_message.reply_text(text, reply_markup=InlineKeyboardMarkup(keyboard))
-            return self.SEND_ACT
-        async def send_act_choice(update: Update, context: ContextTypes.DEFAULT_TYPE):
-            query = update.callback_query
-            await query.answer()
-            choice = query.data.split(":", 1)[1]
-            if choice == 'NONE':
-                await query.edit_message_text("Ок, ничего не отправляю")
-                context.user_data.clear()
-                return ConversationHandler.END
-
-            constr_id = context.user_data.get('new_construction_id')
-            if not constr_id:
-                await query.edit_message_text("Не найден идентификатор записи")
-                context.user_data.clear()
-                return ConversationHandler.END
-
-            # Сгенерировать документ(ы) во временный файл и отправить
-            try:
-                cur = db_conn.cursor()
-                cur.execute("""
-                    SELECT 
-                        c.pour_date, c.element, c.concrete_class, c.frost_resistance, c.water_resistance,  
-                        c.supplier, c.concrete_passport, c.volume_concrete, c.cubes_count, c.act_number, c.request_number,
-                        o.name as object_name, o.address,
-                        org.name as org_name, org.contact, org.phone
-                    FROM constructions c
-                    JOIN objects o ON c.object_id = o.id
-                    JOIN organizations org ON o.org_id = org.id
-                    WHERE c.id = ?
-                """, (constr_id,))
-                columns = [col[0] for col in cur.description]
-                row = cur.fetchone()
-                if not row:
-                    await query.edit_message_text("Запись не найдена для документов")
-                    context.user_data.clear()
-                    return ConversationHandler.END
-                construction_data = dict(zip(columns, row))
-
-                async def render_and_send(template_file: str, doc_type: str, filename: str):
-                    context_tpl = {
-                        'doc_type': doc_type,
-                        'current_date': datetime.now().strftime("%d.%m.%Y"),
-                        'construction': {
-                            'object': construction_data.get('object_name', '') or '',
-                            'address': construction_data.get('address', '') or '',
-                            'date': construction_data.get('pour_date', '') or '',
-                            'element': construction_data.get('element', '') or '',  
-                            'concrete': construction_data.get('concrete_class', '') or '',
-                            'frost': construction_data.get('frost_resistance', '') or '',
-                            'water': construction_data.get('water_resistance', '') or '',
-                            'supplier': construction_data.get('supplier', '') or '',
-                            'passport': construction_data.get('concrete_passport', '') or '',
-                            'volume': construction_data.get('volume_concrete', '') or '',
-                            'act': construction_data.get('act_number', '') or '',
-                            'request': construction_data.get('request_number', '') or '' 
-                        },
-                        'organization': {
-                            'name': construction_data.get('org_name', '') or '',
-                            'contact': construction_data.get('contact', '') or '',
-                            'phone': construction_data.get('phone', '') or ''
-                        }
-                    }
-                    base_dir = os.path.dirname(os.path.abspath(__file__))
-                    template_path = os.path.join(base_dir, template_file)
-                    if not os.path.exists(template_path):
-                        await query.message.reply_text(f"Шаблон не найден: {template_path}")
-                        return False
-                    with tempfile.TemporaryDirectory() as tmpdir:
-                        out_path = os.path.join(tmpdir, filename)
-                        doc = DocxTemplate(template_path)
-                        doc.render(context_tpl)
-                        doc.save(out_path)
-                        with open(out_path, 'rb') as f:
-                            await query.message.reply_document(document=f, filename=filename)
-                    return True
-
-                sent_any = False
-                if choice in ('ACT', 'BOTH'):
-                    ok = await render_and_send('act_template.docx', 'Акт', 'act.docx')
-                    sent_any = sent_any or ok
-                if choice in ('REQ', 'BOTH'):
-                    ok = await render_and_send('request_template.docx', 'Заявка', 'request.docx')
-                    sent_any = sent_any or ok
-
-                await query.edit_message_text("Готово" if sent_any else "Не удалось отправить документы")
-            except Exception as e:
-                await query.edit_message_text(f"Ошибка при формировании акта: {str(e)}")
-            finally:
-                context.user_data.clear()
-            return ConversationHandler.END
-
-        async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
-            context.user_data.clear()
-            await update.effective_message.reply_text("Отменено")
-            return ConversationHandler.END
-
-        conv = ConversationHandler(
-            entry_points=[CommandHandler("start", start_cmd)],
-            states={
-                self.ACTION: [CallbackQueryHandler(action_selected, pattern=r"^ACTION:")],
-                self.DOC_PICK: [CallbackQueryHandler(pick_construction, pattern=r"^PICK:"), CallbackQueryHandler(make_docs, pattern=r"^MAKE:")],
-                self.ORG_DOCS: [CallbackQueryHandler(org_docs_selected, pattern=r"^ORG_DOCS:")],
-                self.OBJ_DOCS: [CallbackQueryHandler(obj_docs_selected, pattern=r"^OBJ_DOCS:")],
-                self.ORG: [CallbackQueryHandler(org_selected, pattern=r"^ORG:")],
-                self.OBJ: [CallbackQueryHandler(obj_selected, pattern=r"^OBJ:")],
-                self.CLASS: [CallbackQueryHandler(class_selected, pattern=r"^CLASS:"), CallbackQueryHandler(skip_selected, pattern=r"^SKIP:concrete_class$")],
-                self.FROST: [CallbackQueryHandler(frost_selected, pattern=r"^FROST:"), CallbackQueryHandler(skip_selected, pattern=r"^SKIP:frost_resistance$")],
-                self.WATER: [CallbackQueryHandler(water_selected, pattern=r"^WATER:"), CallbackQueryHandler(skip_selected, pattern=r"^SKIP:water_resistance$")],
-                self.ELEMENT: [MessageHandler(filters.TEXT & ~filters.COMMAND, element_input)],
-                self.SUPPLIER: [CallbackQueryHandler(supplier_selected, pattern=r"^SUPPLIER:"), CallbackQueryHandler(skip_selected, pattern=r"^SKIP:supplier$")],
-                self.PASSPORT: [MessageHandler(filters.TEXT & ~filters.COMMAND, passport_input), CallbackQueryHandler(skip_selected, pattern=r"^SKIP:concrete_passport$")],
-                self.CUBES: [MessageHandler(filters.TEXT & ~filters.COMMAND, cubes_input), CallbackQueryHandler(skip_selected, pattern=r"^SKIP:cubes_count$")],
-                self.CONES: [MessageHandler(filters.TEXT & ~filters.COMMAND, cones_input), CallbackQueryHandler(skip_selected, pattern=r"^SKIP:cones_count$")],
-                self.SLUMP: [MessageHandler(filters.TEXT & ~filters.COMMAND, slump_input), CallbackQueryHandler(skip_selected, pattern=r"^SKIP:slump$")],
-                self.VOLUME: [MessageHandler(filters.TEXT & ~filters.COMMAND, volume_input), CallbackQueryHandler(skip_selected, pattern=r"^SKIP:volume_concrete$")],
-                self.TEMP: [MessageHandler(filters.TEXT & ~filters.COMMAND, temp_input), CallbackQueryHandler(skip_selected, pattern=r"^SKIP:temperature$")],
-                self.TEMP_MEAS: [MessageHandler(filters.TEXT & ~filters.COMMAND, temp_meas_input), CallbackQueryHandler(skip_selected, pattern=r"^SKIP:temp_measurements$")],
-                self.EXECUTOR: [CallbackQueryHandler(executor_selected, pattern=r"^EXECUTOR:"), CallbackQueryHandler(skip_selected, pattern=r"^SKIP:executor$")],
-                self.ACT: [MessageHandler(filters.TEXT & ~filters.COMMAND, act_input), CallbackQueryHandler(skip_selected, pattern=r"^SKIP:act_number$")],
-                self.REQUEST: [MessageHandler(filters.TEXT & ~filters.COMMAND, request_input), CallbackQueryHandler(skip_selected, pattern=r"^SKIP:request_number$")],
-                self.DATE: [
-                    CallbackQueryHandler(date_today, pattern=r"^DATE:TODAY$"),
-                    CallbackQueryHandler(skip_selected, pattern=r"^SKIP:"),
-                    MessageHandler(filters.TEXT & ~filters.COMMAND, date_input)
-                ],
-                self.SEND_ACT: [CallbackQueryHandler(send_act_choice, pattern=r"^SEND:")],
-            },
-            fallbacks=[CommandHandler("cancel", cancel)],
-            allow_reentry=True,
-        )
-
-        application.add_handler(conv)
-        try:
-            print("[TG] Preparing event loop...")
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            print("[TG] Starting polling...")
-            application.run_polling()
-        except Exception as e:
-            print(f"[TG] run_polling error: {e}")
-
-
 class ConcreteApp(tk.Tk):
     def __init__(self):
         super().__init__()
-
-        self.db = ConcreteDatabase()
-        # Проверяем соединение с базой
-        cursor = self.db.conn.cursor()
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-        tables = cursor.fetchall()
-        print("Доступные таблицы:", tables)  # Для отладки
-            
-        self.current_org_id = None
-        self.current_object_id = None
-        self.buttons_dict = {}
-              
-      
+        profiler.mark('tk_init')
 
         self.title("Учет заливок бетона (prototipe by Kliapich v2.0)")
         self.geometry("1500x700")
         # Фиксируем размер окна и отключаем системный ресайз
         self.resizable(False, False)
         # Стиль ttkbootstrap: тема по умолчанию
-        self.style = Style(theme="flatly")
+        with profiler.phase('theme'):
+            self.style = Style(theme="flatly")
         # Отключаем sizegrip из темы (маленький квадрат/ручка внизу)
         try:
             self.style.layout('TSizegrip', [])
         except Exception:
             pass
         # Инициализация базы данных
-        self.db = ConcreteDatabase()
+        with profiler.phase('db_open_migrate'):
+            self.db = ConcreteDatabase()
         self.current_org_id = None
         self.current_object_id = None
+        self.current_filters = None
         self.buttons_dict = {}
         
         # Настройки панелей
@@ -951,9 +133,31 @@ class ConcreteApp(tk.Tk):
         self.resizing_object_panel = False
         
         # Остальная инициализация...
-        self.create_widgets()
-        self.load_organizations()
-        self.update_buttons_state()
+        with profiler.phase('widgets'):
+            self.create_widgets()
+        with profiler.phase('first_data_load'):
+            self.load_organizations()
+            self.update_buttons_state()
+        # Изменения бота и других окон применяются точечно, без полной перезагрузки
+        self.change_feed = change_log.ChangeFeed(self.db.conn)
+        self.after(CHANGE_POLL_MS, self._poll_changes)
+        # Фоновые задачи (копии и обслуживание базы) запускаются после открытия окна
+        self.after(BACKGROUND_JOBS_DELAY_MS, self._start_background_jobs)
+        if profiler.enabled:
+            # Idle-колбэк выполнится после первой отрисовки окна
+            self.after_idle(self._finish_startup_profile)
+
+    def _start_background_jobs(self):
+        try:
+            # APScheduler грузится только здесь, не замедляя запуск окна
+            scheduler.schedule_backups('concrete.db')
+            scheduler.schedule_maintenance('concrete.db')
+        except Exception as e:
+            print(f"Фоновые задачи не запущены: {e}")
+
+    def _finish_startup_profile(self):
+        profiler.mark('first_paint')
+        profiler.finish('Beton_control v2.0')
 
     
 
@@ -1120,6 +324,8 @@ class ConcreteApp(tk.Tk):
         # Колонка с чекбоксами
         self.construction_tree.heading("selected", text="☐", command=self.toggle_all_checkboxes)
         self.construction_tree.column("selected", width=30, anchor="center")
+        # Записи архивов прошлых лет (поиск с фильтрами) только для просмотра
+        self.construction_tree.tag_configure('archived', foreground='gray')
         self.construction_tree.bind("<<TreeviewSelect>>", lambda e: self.update_counters())
 
         # Остальные колонки
@@ -1280,17 +486,19 @@ class ConcreteApp(tk.Tk):
         if not items:
             messagebox.showwarning("Внимание", "Выберите хотя бы одну запись")
             return
+        if self.has_archived(items):
+            return
         try:
-            cursor = self.db.conn.cursor()
             placeholders = ','.join(['?'] * len(items))
             params = [value] + list(items)
-            cursor.execute(f"UPDATE constructions SET invoice = ? WHERE id IN ({placeholders})", params)
-            self.db.conn.commit()
+            updated = self.db.writes.execute(
+                f"UPDATE constructions SET invoice = ? WHERE id IN ({placeholders})", params
+            ).result()
             # Обновляем значения в таблице
             for iid in items:
                 if self.construction_tree.exists(iid):
                     self.construction_tree.set(iid, 'invoice', value)
-            messagebox.showinfo("Готово", f"Обновлено записей: {cursor.rowcount}")
+            messagebox.showinfo("Готово", f"Обновлено записей: {updated}")
             # Очистка поля и фокус обратно на ввод
             self.invoice_value_var.set("")
             try:
@@ -1346,13 +554,19 @@ class ConcreteApp(tk.Tk):
                 selected.append(item)
         return selected if selected else self.construction_tree.selection()
 
+    def has_archived(self, items):
+        """Предупреждает, если среди записей есть архивные (их нельзя менять)"""
+        if any(self.construction_tree.tag_has('archived', item) for item in items):
+            messagebox.showwarning("Архив", "Записи архива прошлых лет только для просмотра")
+            return True
+        return False
+
     ################## Методы для работы с данными ######################
     def load_organizations(self):
-        cursor = self.db.conn.cursor()
-        cursor.execute("SELECT id, name FROM organizations")
+        orgs = models.fetchall(self.db.conn, 'organizations.list', models.Organization)
         self.org_tree.delete(*self.org_tree.get_children())
-        for row in cursor.fetchall():
-            self.org_tree.insert("", tk.END, values=(row[1],), iid=row[0])
+        for org in orgs:
+            self.org_tree.insert("", tk.END, values=(org.name,), iid=org.id)
 
     def on_org_select(self, event=None):
         selected = self.org_tree.selection()
@@ -1368,11 +582,10 @@ class ConcreteApp(tk.Tk):
         if not self.current_org_id:
             return
             
-        cursor = self.db.conn.cursor()
-        cursor.execute("SELECT id, name, address FROM objects WHERE org_id = ?", (self.current_org_id,))
+        objects = models.fetchall(self.db.conn, 'objects.by_org', models.Object, (self.current_org_id,))
         self.object_tree.delete(*self.object_tree.get_children())
-        for row in cursor.fetchall():
-            self.object_tree.insert("", tk.END, values=row[1:], iid=row[0])
+        for obj in objects:
+            self.object_tree.insert("", tk.END, values=(obj.name, obj.address), iid=obj.id)
 
     def on_object_select(self, event=None):
         selected = self.object_tree.selection()
@@ -1387,27 +600,29 @@ class ConcreteApp(tk.Tk):
         if not self.current_object_id:
             return
         
+        self.current_filters = filters
         self.construction_tree.delete(*self.construction_tree.get_children())
 
-        cursor = self.db.conn.cursor()
-        query = """
-            SELECT id, pour_date, element, concrete_class, frost_resistance, water_resistance,
-            supplier, concrete_passport, volume_concrete, cubes_count, cones_count,
-            slump, temperature, temp_measurements, executor, act_number, request_number, invoice
-            FROM constructions 
-            WHERE object_id = ?
-        """
-        params = [self.current_object_id]
-
         if filters:
+            # Поиск идет и по архивам прошлых лет
+            query = queries.sql('constructions.by_object_history')
             query += " AND " + " AND ".join([f"{key} LIKE ?" for key in filters.keys()])
-            params.extend([f"%{value}%" for value in filters.values()])
-
-        cursor.execute(query, params)
+            params = [self.current_object_id] + [f"%{value}%" for value in filters.values()]
+            cursor = self.db.conn.cursor()
+            cursor.row_factory = models.row_factory(models.Construction)
+            rows = cursor.execute(query, params).fetchall()
+            ids = [row.id for row in rows]
+            current = {row[0] for row in change_log.fetch_rows(self.db.conn, 'constructions', ['id'], ids)}
+            archived = set(ids) - current
+        else:
+            rows = models.fetchall(self.db.conn, 'constructions.by_object', models.Construction,
+                                   (self.current_object_id,))
+            archived = set()
     
-        for row in cursor.fetchall():
-            values = ["☐"] + [str(row[i]) if row[i] is not None else "" for i in range(1, len(row))]
-            self.construction_tree.insert("", "end", values=values, iid=row[0])
+        for row in rows:
+            values = ["☐"] + ["" if value is None else str(value) for value in row.data_values]
+            tags = ('archived',) if row.id in archived else ()
+            self.construction_tree.insert("", "end", values=values, iid=row.id, tags=tags)
             self.update_counters()  # Обновляем счетчики после загрузки
         self.update_header_checkbox_state()
         
@@ -1430,9 +645,98 @@ class ConcreteApp(tk.Tk):
         if self.current_org_id:
             self.load_objects()
         if self.current_object_id:
-            self.load_constructions()
+            self.load_constructions(self.current_filters)
         self.update_buttons_state()
 
+    ################## Изменения из других соединений ###################
+    def _poll_changes(self):
+        """Опрашивает ленту изменений и обновляет таблицы (через after)"""
+        try:
+            changes = self.change_feed.poll()
+            if changes is None:
+                # Журнал уже обрезан синхронизацией или изменений слишком много
+                self.refresh_data()
+            elif any(changes.values()):
+                self.apply_changes(changes)
+        except Exception as e:
+            print(f"Ошибка обновления по журналу изменений: {e}")
+        self.after(CHANGE_POLL_MS, self._poll_changes)
+
+    def apply_changes(self, changes):
+        """Точечно обновляет строки таблиц по изменениям {таблица: {id: операция}}"""
+        conn = self.db.conn
+        orgs = changes.get('organizations')
+        if orgs:
+            rows = change_log.fetch_rows(conn, 'organizations', ['id', 'name'], list(orgs))
+            alive = {row[0]: row for row in rows}
+            for org_id in orgs:
+                row = alive.get(org_id)
+                self._sync_tree_row(self.org_tree, org_id, (row[1],) if row else None, ordered=True)
+            if self.current_org_id in orgs and self.current_org_id not in alive:
+                self.current_org_id = None
+                self.current_object_id = None
+                self.object_tree.delete(*self.object_tree.get_children())
+                self.construction_tree.delete(*self.construction_tree.get_children())
+
+        objects = changes.get('objects')
+        if objects and self.current_org_id:
+            rows = change_log.fetch_rows(conn, 'objects', ['id', 'org_id', 'name', 'address'], list(objects))
+            alive = {row[0]: row for row in rows if row[1] == self.current_org_id}
+            for obj_id in objects:
+                row = alive.get(obj_id)
+                self._sync_tree_row(self.object_tree, obj_id, row[2:] if row else None, ordered=True)
+            if self.current_object_id in objects and self.current_object_id not in alive:
+                self.current_object_id = None
+                self.construction_tree.delete(*self.construction_tree.get_children())
+
+        constructions = changes.get('constructions')
+        if constructions and self.current_object_id:
+            rows = change_log.fetch_rows(conn, 'constructions', list(models.Construction._fields), list(constructions))
+            alive = {}
+            for row in map(models.Construction._make, rows):
+                if row.object_id == self.current_object_id:
+                    alive[row.id] = row
+            if self.current_filters:
+                # Подходит ли запись под фильтры, проще узнать перезагрузкой
+                if alive or any(self.construction_tree.exists(str(i)) for i in constructions):
+                    self.load_constructions(self.current_filters)
+            else:
+                for constr_id in constructions:
+                    row = alive.get(constr_id)
+                    values = None
+                    if row:
+                        mark = "☐"
+                        if self.construction_tree.exists(str(constr_id)):
+                            mark = self.construction_tree.set(str(constr_id), "selected")
+                        values = [mark] + ["" if value is None else str(value) for value in row.data_values]
+                    self._sync_tree_row(self.construction_tree, constr_id, values)
+            self.update_counters()
+            self.update_header_checkbox_state()
+        self.update_buttons_state()
+
+    def _sync_tree_row(self, tree, row_id, values, ordered=False):
+        """Вставляет или обновляет строку Treeview (values=None - удаляет).
+
+        ordered - держать порядок по первой колонке, как ORDER BY name.
+        """
+        iid = str(row_id)
+        exists = tree.exists(iid)
+        if values is None:
+            if exists:
+                tree.delete(iid)
+            return
+        index = 'end'
+        if ordered:
+            name = str(values[0])
+            index = sum(1 for child in tree.get_children()
+                        if child != iid and str(tree.item(child, 'values')[0]) < name)
+        if exists:
+            tree.item(iid, values=values)
+            if ordered:
+                tree.move(iid, '', index)
+        else:
+            tree.insert('', index, iid=iid, values=values)
+
     ################## Методы для работы с организациями ################
     def add_organization(self):
         dialog = tk.Toplevel(self)
@@ -1454,11 +758,10 @@ class ConcreteApp(tk.Tk):
         
         def save():
             try:
-                self.db.conn.execute(
+                self.db.writes.execute(
                     "INSERT INTO organizations (name, contact, phone) VALUES (?, ?, ?)",
                     (entries['name'].get(), entries['contact'].get(), entries['phone'].get())
-                )
-                self.db.conn.commit()
+                ).result()
                 self.refresh_data()
                 dialog.destroy()
             except sqlite3.IntegrityError:
@@ -1473,8 +776,7 @@ class ConcreteApp(tk.Tk):
             return
         
         if messagebox.askyesno("Подтверждение", "Удалить выбранную организацию и все связанные данные?"):
-            self.db.conn.execute("DELETE FROM organizations WHERE id=?", (selected[0],))
-            self.db.conn.commit()
+            self.db.writes.execute("DELETE FROM organizations WHERE id=?", (selected[0],)).result()
             self.current_org_id = None
             self.current_object_id = None
             self.refresh_data()
@@ -1510,11 +812,10 @@ class ConcreteApp(tk.Tk):
         
         def save():
             try:
-                self.db.conn.execute(
+                self.db.writes.execute(
                     "UPDATE organizations SET name=?, contact=?, phone=? WHERE id=?",
                     (entries['name'].get(), entries['contact'].get(), entries['phone'].get(), org_id)
-                )
-                self.db.conn.commit()
+                ).result()
                 self.refresh_data()
                 dialog.destroy()
             except sqlite3.IntegrityError:
@@ -1546,11 +847,10 @@ class ConcreteApp(tk.Tk):
         
         def save():
             try:
-                self.db.conn.execute(
+                self.db.writes.execute(
                     "INSERT INTO objects (org_id, name, address) VALUES (?, ?, ?)",
                     (self.current_org_id, entries['name'].get(), entries['address'].get())
-                )
-                self.db.conn.commit()
+                ).result()
                 self.refresh_data()
                 dialog.destroy()
             except sqlite3.Error as e:
@@ -1565,8 +865,7 @@ class ConcreteApp(tk.Tk):
             return
         
         if messagebox.askyesno("Подтверждение", "Удалить выбранный объект и все связанные данные?"):
-            self.db.conn.execute("DELETE FROM objects WHERE id=?", (selected[0],))
-            self.db.conn.commit()
+            self.db.writes.execute("DELETE FROM objects WHERE id=?", (selected[0],)).result()
             self.current_object_id = None
             self.refresh_data()
 
@@ -1600,11 +899,10 @@ class ConcreteApp(tk.Tk):
         
         def save():
             try:
-                self.db.conn.execute(
+                self.db.writes.execute(
                     "UPDATE objects SET name=?, address=? WHERE id=?",
                     (entries['name'].get(), entries['address'].get(), object_id)
-                )
-                self.db.conn.commit()
+                ).result()
                 self.refresh_data()
                 dialog.destroy()
             except sqlite3.Error as e:
@@ -1685,7 +983,8 @@ class ConcreteApp(tk.Tk):
                 if not entries['pour_date'].get() or not entries['concrete_class'].get():
                     raise ValueError("Заполните обязательные поля (Дата и Класс бетона)")
             
-                self.db.conn.execute(
+                # Через общую очередь записи: коммит вместе с записями бота
+                self.db.writes.execute(
                     """INSERT INTO constructions (
                         object_id, pour_date, element, concrete_class, frost_resistance,
                         water_resistance, supplier, concrete_passport, volume_concrete, cubes_count,
@@ -1712,8 +1011,7 @@ class ConcreteApp(tk.Tk):
                         entries['request_number'].get(),
                         entries['invoice'].get()
                     )
-                )
-                self.db.conn.commit()
+                ).result()
                 saved_successfully = True
                 dialog.destroy()
                 self.refresh_data()
@@ -1737,6 +1035,8 @@ class ConcreteApp(tk.Tk):
         if not selected:
             messagebox.showwarning("Ошибка", "Выберите хотя бы один контроль для удаления")
             return
+        if self.has_archived(selected):
+            return
         
         # Подтверждение удаления
         confirm = messagebox.askyesno(
@@ -1749,17 +1049,15 @@ class ConcreteApp(tk.Tk):
             return
             
         try:
-            cursor = self.db.conn.cursor()
             # Формируем параметризованный запрос для удаления нескольких записей
             placeholders = ','.join(['?'] * len(selected))
             query = f"DELETE FROM constructions WHERE id IN ({placeholders})"
             
-            cursor.execute(query, selected)
-            self.db.conn.commit()
+            deleted = self.db.writes.execute(query, selected).result()
             
             messagebox.showinfo(
                 "Успех",
-                f"Удалено {cursor.rowcount} записей",
+                f"Удалено {deleted} записей",
                 parent=self
             )
             
@@ -1778,16 +1076,14 @@ class ConcreteApp(tk.Tk):
         if not selected:
             messagebox.showwarning("Ошибка", "Выберите Контроль для редактирования")
             return
+        if self.has_archived(selected[:1]):
+            return
             
         constr_id = int(selected[0])
-        cursor = self.db.conn.cursor()
-        cursor.execute("""
-            SELECT pour_date, element, concrete_class, frost_resistance, water_resistance,
-                   supplier, concrete_passport, volume_concrete, cubes_count, cones_count,
-                   slump, temperature, temp_measurements, executor, act_number, request_number, invoice
-            FROM constructions WHERE id=?
-        """, (constr_id,))
-        constr_data = cursor.fetchone()
+        constr_data = models.fetchone(self.db.conn, 'constructions.get', models.Construction, (constr_id,))
+        if constr_data is None:
+            messagebox.showwarning("Ошибка", "Запись перенесена в архив прошлых лет, изменить ее нельзя")
+            return
         
         dialog = tk.Toplevel(self)
         dialog.title("Редактировать контроль")
@@ -1795,23 +1091,23 @@ class ConcreteApp(tk.Tk):
         dialog.grab_set()
         
         fields = [
-            ("Дата (ДД-ММ-ГГГГ):", "pour_date", constr_data[0]),
-            ("Конструктив:", "element", constr_data[1]),  
-            ("Класс бетона:", "concrete_class", constr_data[2]),
-            ("Морозостойкость:", "frost_resistance", constr_data[3]),
-            ("Водопроницаемость:", "water_resistance", constr_data[4]),
-            ("Поставщик:", "supplier", constr_data[5]),
-            ("Паспорт:", "concrete_passport", constr_data[6]),
-            ("Объем бетона (м³):", "volume_concrete", constr_data[7]),
-            ("Кубики:", "cubes_count", constr_data[8]),
-            ("Конусы:", "cones_count", constr_data[9]),
-            ("Осадка (см):", "slump", constr_data[10]),
-            ("Температура (°C):", "temperature", constr_data[11]),
-            ("Замеры темп.:", "temp_measurements", constr_data[12]),
-            ("Исполнитель:", "executor", constr_data[13]),
-            ("№ Акта:", "act_number", constr_data[14]),
-            ("№ Заявки:", "request_number", constr_data[15]),
-            ("Счет:", "invoice", constr_data[16])
+            ("Дата (ДД-ММ-ГГГГ):", "pour_date", constr_data.pour_date),
+            ("Конструктив:", "element", constr_data.element),  
+            ("Класс бетона:", "concrete_class", constr_data.concrete_class),
+            ("Морозостойкость:", "frost_resistance", constr_data.frost_resistance),
+            ("Водопроницаемость:", "water_resistance", constr_data.water_resistance),
+            ("Поставщик:", "supplier", constr_data.supplier),
+            ("Паспорт:", "concrete_passport", constr_data.concrete_passport),
+            ("Объем бетона (м³):", "volume_concrete", constr_data.volume_concrete),
+            ("Кубики:", "cubes_count", constr_data.cubes_count),
+            ("Конусы:", "cones_count", constr_data.cones_count),
+            ("Осадка (см):", "slump", constr_data.slump),
+            ("Температура (°C):", "temperature", constr_data.temperature),
+            ("Замеры темп.:", "temp_measurements", constr_data.temp_measurements),
+            ("Исполнитель:", "executor", constr_data.executor),
+            ("№ Акта:", "act_number", constr_data.act_number),
+            ("№ Заявки:", "request_number", constr_data.request_number),
+            ("Счет:", "invoice", constr_data.invoice)
         ]
         
         entries = {}
@@ -1854,7 +1150,7 @@ class ConcreteApp(tk.Tk):
         
         def save():
             try:
-                self.db.conn.execute("""
+                self.db.writes.execute("""
                     UPDATE constructions SET
                         pour_date=?, element=?, concrete_class=?, frost_resistance=?,
                         water_resistance=?, supplier=?, concrete_passport=?,
@@ -1881,8 +1177,7 @@ class ConcreteApp(tk.Tk):
                     entries['request_number'].get(),
                     entries['invoice'].get(),
                     constr_id
-                ))
-                self.db.conn.commit()
+                )).result()
                 self.refresh_data()
                 dialog.destroy()
             except ValueError as e:
@@ -1898,6 +1193,8 @@ class ConcreteApp(tk.Tk):
         if not selected:
             messagebox.showwarning("Ошибка", "Выберите хотя бы один контроль")
             return
+        if self.has_archived(selected):
+            return
 
         for constr_id in selected:
             self.generate_document(constr_id, "request_template.docx", "Заявка")
@@ -1907,6 +1204,8 @@ class ConcreteApp(tk.Tk):
         if not selected:
             messagebox.showwarning("Ошибка", "Выберите хотя бы один контроль")
             return
+        if self.has_archived(selected):
+            return
 
         for constr_id in selected:
             self.generate_document(constr_id, "act_template.docx", "Акт")
@@ -1915,72 +1214,18 @@ class ConcreteApp(tk.Tk):
         """Генерация документа (акта или заявки) на основе шаблона"""
         try:
             # Проверка существования шаблона
-            if not os.path.exists(template_name):
+            if not os.path.exists(documents.template_path(template_name)):
                 messagebox.showerror("Ошибка", f"Шаблон {template_name} не найден")
                 return
-            
-            cursor = self.db.conn.cursor()
-            cursor.execute("""
-                SELECT 
-                    c.pour_date, c.element, c.concrete_class, c.frost_resistance, c.water_resistance,  
-                    c.supplier, c.concrete_passport, c.volume_concrete, c.cubes_count, c.act_number, c.request_number, c.invoice,
-                    o.name as object_name, o.address,
-                    org.name as org_name, org.contact, org.phone
-                FROM constructions c
-                JOIN objects o ON c.object_id = o.id
-                JOIN organizations org ON o.org_id = org.id
-                WHERE c.id = ?
-            """, (constr_id,))
-
-            columns = [col[0] for col in cursor.description]
-            row = cursor.fetchone()
-            if not row:
+
+            construction_data = documents.fetch_construction(self.db.conn, constr_id)
+            if not construction_data:
                 messagebox.showerror("Ошибка", "Контроль не найден")
                 return
-            
-            construction_data = dict(zip(columns, row))
-
-            # Обработка даты
-            #try:
-            #     pour_date = datetime.strptime(construction_data['pour_date'], "%d-%m-%Y")
-            #   formatted_date = pour_date.strftime("%d.%m.%Y")
-            #    file_date = pour_date.strftime(formatted_date)
-            #except ValueError:
-            #    file_date = "pour_date"
-                
-                
-                ################ Индексы для замены слов ####################
-            context = {
-                'doc_type': doc_type,
-                'current_date': datetime.now().strftime("%d.%m.%Y"),
-                'construction': {
-                    'object': construction_data.get('object_name', '') or '',
-                    'address': construction_data.get('address', '') or '',
-                    'date': construction_data.get('pour_date', '') or '',
-                    'element': construction_data.get('element', '') or '',  
-                    'concrete': construction_data.get('concrete_class', '') or '',
-                    'frost': construction_data.get('frost_resistance', '') or '',
-                    'water': construction_data.get('water_resistance', '') or '',
-                    'supplier': construction_data.get('supplier', '') or '',
-                    'passport': construction_data.get('concrete_passport', '') or '',
-                    'volume': construction_data.get('volume_concrete', '') or '',
-                    'cubes': construction_data.get('cubes_count', '') or '',
-                    'cones': construction_data.get('cones_count', '') or '',
-                    'slump': construction_data.get('slump', '') or '',
-                    'temp': construction_data.get('temperature', '') or '',
-                    'temp_measurements': construction_data.get('temp_measurements', '') or '',
-                    'act': construction_data.get('act_number', '') or '',
-                    'request': construction_data.get('request_number', '') or '',
-                    'invoice': construction_data.get('invoice', '') or '' 
-                },
-                'organization': {
-                    'name': construction_data.get('org_name', '') or '',
-                    'contact': construction_data.get('contact', '') or '',
-                    'phone': construction_data.get('phone', '') or ''
-                }
-            }
-            
-                # Формирование имени файла
+
+            context = documents.build_context(construction_data, doc_type)
+
+            # Формирование имени файла
             object_name = construction_data.get('object_name', 'объект').replace(' ', '_')
             element_name = construction_data.get('element', 'конструктив').replace(' ', '_')
             pour_date = construction_data.get('pour_date', 'дата заливки').replace(' ', '_')
@@ -2001,9 +1246,7 @@ class ConcreteApp(tk.Tk):
         
             if filepath:
                 # Заполнение и сохранение шаблона
-                doc = DocxTemplate(template_name)
-                doc.render(context)
-                doc.save(filepath)
+                documents.render_document(template_name, context, filepath)
                 messagebox.showinfo("Готово", f"{doc_type} сохранен:\n{os.path.basename(filepath)}")
         
         except Exception as e:
@@ -2018,7 +1261,8 @@ class ConcreteApp(tk.Tk):
             parent=self
         )
 
-        wb = Workbook()
+        openpyxl = lazy_import('openpyxl')
+        wb = openpyxl.Workbook()
         ws = wb.active
 
         if template_type == "org":
@@ -2056,7 +1300,8 @@ class ConcreteApp(tk.Tk):
             return
 
         try:
-            wb = load_workbook(filename=filepath)
+            openpyxl = lazy_import('openpyxl')
+            wb = openpyxl.load_workbook(filename=filepath)
             ws = wb.active
 
             import_type = simpledialog.askstring(
@@ -2081,14 +1326,16 @@ class ConcreteApp(tk.Tk):
 
     def _import_organizations(self, worksheet):
         """Импорт организаций из Excel"""
-        for row in worksheet.iter_rows(min_row=2, values_only=True):
-            if row and row[0]:
-                self.db.conn.execute(
-                    """INSERT OR IGNORE INTO organizations 
-                    (name, contact, phone) VALUES (?, ?, ?)""",
-                    (row[0], row[1] if len(row) > 1 else None, row[2] if len(row) > 2 else None)
-                )
-        self.db.conn.commit()
+        rows = [
+            (row[0], row[1] if len(row) > 1 else None, row[2] if len(row) > 2 else None)
+            for row in worksheet.iter_rows(min_row=2, values_only=True)
+            if row and row[0]
+        ]
+        self._import_rows(
+            """INSERT OR IGNORE INTO organizations 
+            (name, contact, phone) VALUES (?, ?, ?)""",
+            rows
+        )
         messagebox.showinfo("Успех", f"Импортировано {worksheet.max_row-1} организаций")
 
     def _import_objects(self, worksheet):
@@ -2096,14 +1343,16 @@ class ConcreteApp(tk.Tk):
         if not self.current_org_id:
             raise ValueError("Сначала выберите организацию")
 
-        for row in worksheet.iter_rows(min_row=2, values_only=True):
-            if row and row[0]:
-                self.db.conn.execute(
-                    """INSERT OR IGNORE INTO objects 
-                    (org_id, name, address) VALUES (?, ?, ?)""",
-                    (self.current_org_id, row[0], row[1] if len(row) > 1 else None)
-                )
-        self.db.conn.commit()
+        rows = [
+            (self.current_org_id, row[0], row[1] if len(row) > 1 else None)
+            for row in worksheet.iter_rows(min_row=2, values_only=True)
+            if row and row[0]
+        ]
+        self._import_rows(
+            """INSERT OR IGNORE INTO objects 
+            (org_id, name, address) VALUES (?, ?, ?)""",
+            rows
+        )
         messagebox.showinfo("Успех", f"Импортировано {worksheet.max_row-1} объектов")
 
     def _import_constructions(self, worksheet):
@@ -2112,7 +1361,7 @@ class ConcreteApp(tk.Tk):
             raise ValueError("Сначала выберите объект")
 
         headers = [cell.value for cell in worksheet[1]]
-        imported_count = 0
+        rows = []
 
         for row in worksheet.iter_rows(min_row=2, values_only=True):
             if not row or not row[0]:
@@ -2139,19 +1388,22 @@ class ConcreteApp(tk.Tk):
                 'invoice': row[headers.index('Счет')] if 'Счет' in headers else None
             }
 
-            self.db.conn.execute("""
-                INSERT INTO constructions (
-                    object_id, pour_date, element, concrete_class, frost_resistance,
-                    water_resistance, supplier, concrete_passport, volume_concrete, cubes_count,
-                    cones_count, slump, temperature, temp_measurements,
-                    executor, act_number, request_number, invoice
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, tuple(data.values()))
+            rows.append(tuple(data.values()))
 
-            imported_count += 1
+        self._import_rows("""
+            INSERT INTO constructions (
+                object_id, pour_date, element, concrete_class, frost_resistance,
+                water_resistance, supplier, concrete_passport, volume_concrete, cubes_count,
+                cones_count, slump, temperature, temp_measurements,
+                executor, act_number, request_number, invoice
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+        messagebox.showinfo("Успех", f"Импортировано {len(rows)} контролей")
 
-        self.db.conn.commit()
-        messagebox.showinfo("Успех", f"Импортировано {imported_count} контролей")
+    def _import_rows(self, sql, rows):
+        """Записывает строки импорта одной операцией очереди записи (все или ничего)"""
+        if rows:
+            self.db.writes.submit(lambda conn: conn.executemany(sql, rows).rowcount).result()
 
     def export_to_excel(self):
         if not self.current_object_id:
@@ -2159,16 +1411,7 @@ class ConcreteApp(tk.Tk):
             return
     
         try:
-            cursor = self.db.conn.cursor()
-            cursor.execute("""
-                SELECT 
-                    o.name as object_name, 
-                    org.name as org_name
-                FROM objects o
-                JOIN organizations org ON o.org_id = org.id
-                WHERE o.id = ?
-            """, (self.current_object_id,))
-            result = cursor.fetchone()
+            result = queries.fetchone(self.db.conn, 'objects.with_org', (self.current_object_id,))
         
             if not result:
                 messagebox.showwarning("Ошибка", "Не удалось получить данные объекта")
@@ -2177,21 +1420,17 @@ class ConcreteApp(tk.Tk):
             object_name = result[0]
             org_name = result[1]
     
-            cursor.execute("""
-                SELECT pour_date, element, concrete_class, frost_resistance, water_resistance,
-                    supplier, concrete_passport, volume_concrete, cubes_count, cones_count,
-                    slump, temperature, temp_measurements, executor, act_number, request_number, invoice
-                FROM constructions 
-                WHERE object_id = ?
-                ORDER BY pour_date
-            """, (self.current_object_id,))
-            constructions = cursor.fetchall()
+            # Выгрузка за все годы, включая архивы
+            constructions = queries.fetchall(self.db.conn, 'constructions.export_history', (self.current_object_id,))
     
             if not constructions:
                 messagebox.showwarning("Ошибка", "Нет данных для экспорта")
                 return
     
-            wb = Workbook()
+            openpyxl = lazy_import('openpyxl')
+            styles = lazy_import('openpyxl.styles')
+            Font, Alignment = styles.Font, styles.Alignment
+            wb = openpyxl.Workbook()
             ws = wb.active
             ws.title = "Бетонные работы"
     
@@ -2267,7 +1506,9 @@ class ConcreteApp(tk.Tk):
         """Запускает Telegram-бота в фоновом потоке (один раз)."""
         try:
             if not hasattr(self, '_tg_service'):
-                self._tg_service = TelegramBotService(TELEGRAM_BOT_TOKEN)
+                # telegram и telegram.ext загружаются только при запуске бота
+                telegram_bot = lazy_import('telegram_bot')
+                self._tg_service = telegram_bot.TelegramBotService(telegram_bot.TELEGRAM_BOT_TOKEN)
             if self._tg_service.is_running():
                 messagebox.showinfo("Бот", "Бот уже запущен")
                 return
@@ -2283,12 +1524,7 @@ class ConcreteApp(tk.Tk):
     def _get_distinct_suppliers(self):
         """Возвращает список уникальных поставщиков из БД для выпадающего списка."""
         try:
-            cursor = self.db.conn.cursor()
-            cursor.execute(
-                "SELECT DISTINCT supplier FROM constructions "
-                "WHERE supplier IS NOT NULL AND supplier != '' ORDER BY supplier"
-            )
-            return [row[0] for row in cursor.fetchall()]
+            return self.db.distinct_cache.get('supplier')
         except Exception:
             return []
 
@@ -2321,4 +1557,8 @@ class ConcreteApp(tk.Tk):
 
 if __name__ == "__main__":
     app = ConcreteApp()
-    app.mainloop()
\ No newline at end of file
+    app.mainloop()
+    if report_enabled():
+        print(import_report())
+    if query_stats.report_enabled():
+        print(query_stats.stats.report())
\ No newline at end of file
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Архив закрытых лет: записи контроля по годам в отдельных файлах SQLite
+
+Записи прошлых лет (по году в pour_date, ДД-ММ-ГГГГ) переносятся из
+constructions в <база>_archive_<год>.db рядом с базой (BETON_ARCHIVE_DIR) с
+теми же id. Рабочая база остается маленькой: быстрее загрузка, копии и
+обслуживание. attach_archives подключает архивы к соединению (ATTACH) и
+создает временное представление all_constructions - рабочая таблица вместе
+со всеми архивами - для поиска и выгрузки за все годы.
+
+Перенос в архив - не удаление: записи журнала изменений об этих строках
+убираются, чтобы синхронизация не удалила их в PostgreSQL.
+
+Запуск: python archive.py [--db concrete.db] [--before 2025] [--list]
+"""
+
+import argparse
+import glob
+import logging
+import os
+import re
+import sqlite3
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import change_log
+
+# Год записи контроля из даты ДД-ММ-ГГГГ
+YEAR_SQL = "substr(pour_date, 7, 4)"
+_YEAR_WHERE = f"length(pour_date) = 10 AND {YEAR_SQL} = ?"
+
+VIEW_NAME = 'all_constructions'
+
+logger = logging.getLogger(__name__)
+
+
+def archive_dir_for(db_path: str) -> str:
+    """Каталог архивов: BETON_ARCHIVE_DIR или каталог базы"""
+    return os.getenv('BETON_ARCHIVE_DIR') or os.path.dirname(os.path.abspath(db_path))
+
+
+def _prefix(db_path: str) -> str:
+    return os.path.splitext(os.path.basename(db_path))[0]
+
+
+def archive_path(db_path: str, year: int) -> str:
+    return os.path.join(archive_dir_for(db_path), f"{_prefix(db_path)}_archive_{year}.db")
+
+
+def list_archives(db_path: str) -> Dict[int, str]:
+    """Архивные файлы базы по годам"""
+    pattern = re.compile(r'_archive_(\d{4})\.db$')
+    result = {}
+    for path in glob.glob(os.path.join(archive_dir_for(db_path), f"{_prefix(db_path)}_archive_*.db")):
+        match = pattern.search(path)
+        if match:
+            result[int(match.group(1))] = path
+    return dict(sorted(result.items()))
+
+
+def _columns(conn: sqlite3.Connection, schema: str = 'main') -> List[tuple]:
+    """(имя, тип) колонок constructions в схеме schema"""
+    return [(row[1], row[2]) for row in conn.execute(f"PRAGMA {schema}.table_info(constructions)")]
+
+
+def _ensure_table(conn: sqlite3.Connection, schema: str) -> None:
+    """Таблица constructions в архиве с теми же колонками, что и в рабочей базе"""
+    columns = _columns(conn)
+    existing = {name for name, _ in _columns(conn, schema)}
+    if not existing:
+        definitions = ', '.join(
+            f"{name} INTEGER PRIMARY KEY" if name == 'id' else f"{name} {col_type}" for name, col_type in columns
+        )
+        conn.execute(f"CREATE TABLE {schema}.constructions ({definitions})")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {schema}.idx_constructions_object_id ON constructions(object_id)")
+        return
+    for name, col_type in columns:
+        # В рабочей базе появились новые колонки (как invoice)
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {schema}.constructions ADD COLUMN {name} {col_type}")
+
+
+def open_years(conn: sqlite3.Connection) -> List[int]:
+    """Годы, записи которых есть в рабочей таблице"""
+    rows = conn.execute(
+        f"SELECT DISTINCT {YEAR_SQL} FROM constructions WHERE length(pour_date) = 10 ORDER BY 1"
+    ).fetchall()
+    return [int(row[0]) for row in rows if row[0] and row[0].isdigit()]
+
+
+def archive_year(db_path: str, year: int) -> int:
+    """Переносит записи года в архивный файл, возвращает число перенесенных"""
+    conn = sqlite3.connect(db_path, isolation_level=None, timeout=30)
+    try:
+        conn.execute("ATTACH DATABASE ? AS archive", (archive_path(db_path, year),))
+        _ensure_table(conn, 'archive')
+        columns = ', '.join(name for name, _ in _columns(conn))
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            seq = change_log.last_seq(conn)
+            # OR REPLACE: повторный запуск после сбоя не создаст дублей
+            conn.execute(
+                f"INSERT OR REPLACE INTO archive.constructions ({columns}) "
+                f"SELECT {columns} FROM main.constructions WHERE {_YEAR_WHERE}", (str(year),)
+            )
+            moved = conn.execute(f"DELETE FROM main.constructions WHERE {_YEAR_WHERE}", (str(year),)).rowcount
+            conn.execute("DELETE FROM change_log WHERE seq > ?", (seq,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("DETACH DATABASE archive")
+    finally:
+        conn.close()
+    logger.info(f"Архив {year}: перенесено записей {moved}")
+    return moved
+
+
+def archive_closed_years(db_path: str, before_year: Optional[int] = None) -> Dict[int, int]:
+    """Переносит в архив все годы раньше before_year (по умолчанию текущего)"""
+    before_year = before_year or datetime.now().year
+    conn = sqlite3.connect(db_path)
+    try:
+        years = [year for year in open_years(conn) if year < before_year]
+    finally:
+        conn.close()
+    return {year: archive_year(db_path, year) for year in years}
+
+
+def attach_archives(conn: sqlite3.Connection) -> List[int]:
+    """Подключает архивы к соединению и создает temp-представление all_constructions.
+
+    Возвращает подключенные годы. Число ATTACH ограничено SQLite (обычно 10),
+    поэтому при избытке подключаются самые свежие архивы.
+    """
+    db_path = next(row[2] for row in conn.execute("PRAGMA database_list") if row[1] == 'main')
+    attached = {row[1] for row in conn.execute("PRAGMA database_list")}
+    years = []
+    for year, path in sorted(list_archives(db_path).items(), reverse=True):
+        schema = f"archive_{year}"
+        if schema not in attached:
+            try:
+                conn.execute("ATTACH DATABASE ? AS " + schema, (path,))
+            except sqlite3.OperationalError as e:
+                logger.warning(f"Архив {year} не подключен: {e}")
+                break
+            _ensure_table(conn, schema)
+        years.append(year)
+    columns = ', '.join(name for name, _ in _columns(conn))
+    parts = [f"SELECT {columns} FROM main.constructions"]
+    parts += [f"SELECT {columns} FROM archive_{year}.constructions" for year in sorted(years)]
+    conn.execute(f"DROP VIEW IF EXISTS temp.{VIEW_NAME}")
+    conn.execute(f"CREATE TEMP VIEW {VIEW_NAME} AS " + " UNION ALL ".join(parts))
+    return sorted(years)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Архив записей контроля по годам")
+    parser.add_argument('--db', default=os.getenv('RAILWAY_DB_PATH', 'concrete.db'), help="Файл базы")
+    parser.add_argument('--before', type=int, default=None, help="Архивировать годы раньше этого (по умолчанию текущего)")
+    parser.add_argument('--list', action='store_true', help="Показать годы в базе и архивы")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.list:
+        conn = sqlite3.connect(args.db)
+        try:
+            print(f"🗄️  В рабочей базе: {', '.join(map(str, open_years(conn))) or 'нет записей'}")
+        finally:
+            conn.close()
+        for year, path in list_archives(args.db).items():
+            print(f"📦 {year}: {path}")
+        return
+    moved = archive_closed_years(args.db, args.before)
+    if not moved:
+        print("✅ Закрытых лет в рабочей базе нет")
+    for year, count in moved.items():
+        print(f"✅ {year}: в архив перенесено {count} записей ({archive_path(args.db, year)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Онлайн-резервные копии SQLite через backup API
+
+Копия снимается порциями страниц (BACKUP_PAGES) с паузой между шагами, так
+что бот и GUI продолжают писать во время копирования: блокировка чтения
+держится только на время одного шага. Готовый снимок сжимается gzip и
+кладется в каталог копий; старые копии сверх BETON_BACKUP_KEEP удаляются.
+
+Архивы закрытых лет (archive.py) после переноса не меняются, поэтому в
+ротацию не попадают: каждый архив копируется один раз в
+<база>_archive_<год>.db.gz рядом со снимками и заново - только если архив
+изменился позже своей копии (повторный перенос года).
+
+Запуск вручную: python backup.py [--db concrete.db] [--dir backups] [--keep 14]
+По расписанию копии делает scheduler.py (BETON_BACKUP_HOURS).
+"""
+
+import argparse
+import glob
+import gzip
+import logging
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import archive
+
+# Страниц за один шаг копирования и пауза между шагами, с
+BACKUP_PAGES = 256
+BACKUP_PAUSE = 0.01
+# Сколько последних копий хранить
+DEFAULT_KEEP = 14
+
+logger = logging.getLogger(__name__)
+
+
+def backup_dir_for(db_path: str) -> str:
+    """Каталог копий: BETON_BACKUP_DIR или backups рядом с файлом БД"""
+    return os.getenv('BETON_BACKUP_DIR') or os.path.join(os.path.dirname(os.path.abspath(db_path)), 'backups')
+
+
+def _prefix(db_path: str) -> str:
+    return os.path.splitext(os.path.basename(db_path))[0]
+
+
+def list_backups(db_path: str, backup_dir: Optional[str] = None) -> List[str]:
+    """Копии базы от старых к новым"""
+    backup_dir = backup_dir or backup_dir_for(db_path)
+    return sorted(glob.glob(os.path.join(backup_dir, f"{_prefix(db_path)}-*.db.gz")))
+
+
+def latest_backup_age(db_path: str, backup_dir: Optional[str] = None) -> Optional[float]:
+    """Возраст последней копии в секундах (None, если копий нет)"""
+    backups = list_backups(db_path, backup_dir)
+    if not backups:
+        return None
+    return time.time() - os.path.getmtime(backups[-1])
+
+
+def backup_database(db_path: str, backup_dir: Optional[str] = None, keep: Optional[int] = None,
+                    pages: int = BACKUP_PAGES, pause: float = BACKUP_PAUSE) -> str:
+    """Снимает согласованную копию работающей базы, сжимает и ротирует копии.
+
+    Возвращает путь к новой копии.
+    """
+    backup_dir = backup_dir or backup_dir_for(db_path)
+    keep = keep if keep is not None else int(os.getenv('BETON_BACKUP_KEEP', DEFAULT_KEEP))
+    os.makedirs(backup_dir, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+    target = os.path.join(backup_dir, f"{_prefix(db_path)}-{stamp}.db.gz")
+
+    started = time.perf_counter()
+    _snapshot(db_path, target, pages, pause)
+    removed = rotate(db_path, backup_dir, keep)
+    logger.info(
+        f"Резервная копия {target}: {os.path.getsize(target) / 1024:.0f} КБ "
+        f"за {time.perf_counter() - started:.2f} с, удалено старых: {removed}"
+    )
+    backup_archives(db_path, backup_dir, pages, pause)
+    return target
+
+
+def backup_archives(db_path: str, backup_dir: Optional[str] = None,
+                    pages: int = BACKUP_PAGES, pause: float = BACKUP_PAUSE) -> Dict[int, str]:
+    """Копирует архивы лет, у которых еще нет актуальной копии; возвращает новые копии"""
+    backup_dir = backup_dir or backup_dir_for(db_path)
+    os.makedirs(backup_dir, exist_ok=True)
+    copied = {}
+    for year, path in archive.list_archives(db_path).items():
+        target = os.path.join(backup_dir, os.path.basename(path) + '.gz')
+        if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+            continue
+        _snapshot(path, target, pages, pause)
+        logger.info(f"Копия архива {year}: {target}")
+        copied[year] = target
+    return copied
+
+
+def _snapshot(source_path: str, target: str, pages: int, pause: float) -> None:
+    """Копия базы через backup API, сжатая gzip в target"""
+    snapshot = target[:-len('.gz')] + '.tmp'
+
+    def progress(status, remaining, total):
+        # Пауза между шагами отдает блокировку писателям
+        if remaining:
+            time.sleep(pause)
+
+    source = sqlite3.connect(source_path)
+    try:
+        destination = sqlite3.connect(snapshot)
+        try:
+            source.backup(destination, pages=pages, progress=progress)
+        finally:
+            destination.close()
+    finally:
+        source.close()
+
+    try:
+        with open(snapshot, 'rb') as src, gzip.open(target + '.part', 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(target + '.part', target)
+    finally:
+        for leftover in (snapshot, target + '.part'):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+
+def rotate(db_path: str, backup_dir: str, keep: int) -> int:
+    """Удаляет копии сверх keep последних, возвращает их число"""
+    backups = list_backups(db_path, backup_dir)
+    old = backups[:-keep] if keep > 0 else []
+    for path in old:
+        os.remove(path)
+    return len(old)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Онлайн-резервная копия базы SQLite")
+    parser.add_argument('--db', default=os.getenv('RAILWAY_DB_PATH', 'concrete.db'), help="Файл базы")
+    parser.add_argument('--dir', default=None, help="Каталог копий (по умолчанию backups рядом с базой)")
+    parser.add_argument('--keep', type=int, default=None, help="Сколько последних копий хранить")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    path = backup_database(args.db, args.dir, args.keep)
+    print(f"✅ Копия сохранена: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Нагрузочные замеры на синтетических данных
+
+Генерирует правдоподобные организации, объекты и записи контроля (10k, 100k,
+1M записей и т.п.) с фиксированным seed и замеряет горячие пути приложения:
+списки и фильтры GUI, справочники, страницы и подсказки бота, подготовку
+документов, Excel и миграцию в PostgreSQL. Результат - JSON-отчет, который
+можно сравнить с отчетом предыдущей версии.
+
+Запуск:
+    python benchmark.py --scale 10k,100k
+    python benchmark.py --scale 10k --compare benchmark_old.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+import documents
+import queries
+import usage_ranking
+from database_manager import DatabaseManager
+
+CONCRETE_CLASSES = ["B7,5", "B10", "B12,5", "B15", "B20", "B22,5", "B25", "B27,5", "B30", "B35", "B40"]
+FROST = ["F50", "F75", "F100", "F150", "F200", "F300"]
+WATER = ["W2", "W4", "W6", "W8", "W10", "W12"]
+ELEMENTS = ["Фундаментная плита", "Колонны", "Перекрытие", "Стены", "Лестничный марш", "Ростверк", "Балки"]
+SLUMP = ["П1", "П2", "П3", "П4", "П5"]
+STREETS = ["Ленина", "Мира", "Советская", "Гагарина", "Садовая", "Лесная", "Заводская"]
+
+INSERT_CONSTRUCTION = """
+    INSERT INTO constructions (
+        object_id, pour_date, element, concrete_class, frost_resistance,
+        water_resistance, supplier, concrete_passport, volume_concrete, cubes_count,
+        cones_count, slump, temperature, temp_measurements,
+        executor, act_number, request_number, invoice
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Тот же запрос, что в ConcreteApp.load_constructions
+LOAD_CONSTRUCTIONS = queries.sql('constructions.by_object')
+
+
+def parse_scale(value: str) -> int:
+    """'10k' -> 10000, '1m' -> 1000000"""
+    value = value.strip().lower()
+    multiplier = {'k': 1000, 'm': 1000000}.get(value[-1:], 1)
+    return int(float(value.rstrip('km')) * multiplier)
+
+
+# ---------- генерация данных ----------
+def generate(db_path: str, constructions: int, seed: int = 42, batch_size: int = 5000) -> Dict[str, Any]:
+    """Создает базу со схемой приложения и заполняет ее синтетическими данными"""
+    rng = random.Random(seed)
+    org_count = max(5, constructions // 2000)
+    object_count = max(20, constructions // 100)
+
+    db = DatabaseManager(db_path)
+    conn = db.connection
+    start = time.perf_counter()
+    conn.executemany(
+        "INSERT INTO organizations (name, contact, phone) VALUES (?, ?, ?)",
+        [(f'ООО "Стройтрест-{i}"', f"Прораб {i}", f"+7 900 {i:07d}") for i in range(1, org_count + 1)]
+    )
+    conn.executemany(
+        "INSERT INTO objects (org_id, name, address) VALUES (?, ?, ?)",
+        [
+            (rng.randint(1, org_count), f"ЖК Объект {i}", f"ул. {rng.choice(STREETS)}, {rng.randint(1, 200)}")
+            for i in range(1, object_count + 1)
+        ]
+    )
+    conn.commit()
+
+    suppliers = [f"БСУ-{i}" for i in range(1, 31)]
+    executors = [f"Лаборант {i}" for i in range(1, 21)]
+    # Неравномерная нагрузка: на крупных объектах намного больше записей
+    object_weights = [1 / (i ** 0.8) for i in range(1, object_count + 1)]
+    first_day = date(2022, 1, 1)
+
+    inserted = 0
+    while inserted < constructions:
+        size = min(batch_size, constructions - inserted)
+        object_ids = rng.choices(range(1, object_count + 1), weights=object_weights, k=size)
+        rows = []
+        for object_id in object_ids:
+            number = inserted + len(rows) + 1
+            pour_date = first_day + timedelta(days=rng.randint(0, 3 * 365))
+            rows.append((
+                object_id,
+                pour_date.strftime("%d-%m-%Y"),
+                rng.choice(ELEMENTS),
+                rng.choice(CONCRETE_CLASSES),
+                rng.choice(FROST),
+                rng.choice(WATER),
+                rng.choice(suppliers),
+                f"П-{number}",
+                round(rng.uniform(2, 120), 1),
+                rng.choice((0, 6, 9, 12)),
+                rng.choice((0, 1, 2, 3)),
+                rng.choice(SLUMP),
+                str(rng.randint(-15, 30)),
+                rng.randint(0, 6),
+                rng.choice(executors),
+                f"А-{number}" if rng.random() < 0.7 else None,
+                f"З-{number}" if rng.random() < 0.5 else None,
+                f"С-{number}" if rng.random() < 0.3 else None,
+            ))
+        conn.executemany(INSERT_CONSTRUCTION, rows)
+        conn.commit()
+        inserted += size
+    elapsed = time.perf_counter() - start
+    db.close()
+    return {
+        'organizations': org_count,
+        'objects': object_count,
+        'constructions': constructions,
+        'generate_s': round(elapsed, 3),
+        'rows_per_s': round(constructions / elapsed) if elapsed else None,
+        'db_size_mb': round(os.path.getsize(db_path) / 1024 / 1024, 2),
+    }
+
+
+# ---------- замеры ----------
+class Skip(Exception):
+    """Замер невозможен в этом окружении (нет библиотеки, нет PostgreSQL)"""
+
+
+def measure(func: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return {
+        'runs': repeat,
+        'min_ms': round(times[0], 3),
+        'median_ms': round(statistics.median(times), 3),
+        'p95_ms': round(times[min(len(times) - 1, int(len(times) * 0.95))], 3),
+    }
+
+
+def _require(module: str):
+    try:
+        return __import__(module)
+    except ImportError:
+        raise Skip(f"не установлен {module}")
+
+
+def run_benchmarks(db_path: str, repeat: int = 5, only: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Замеры горячих путей на готовой базе"""
+    db = DatabaseManager(db_path)
+    conn = db.connection
+    busiest_org = conn.execute(
+        "SELECT org_id FROM objects GROUP BY org_id ORDER BY COUNT(*) DESC LIMIT 1").fetchone()[0]
+    busiest_object = conn.execute(
+        "SELECT object_id FROM constructions GROUP BY object_id ORDER BY COUNT(*) DESC LIMIT 1").fetchone()[0]
+    sample_id = conn.execute(
+        "SELECT id FROM constructions WHERE object_id = ? ORDER BY id DESC LIMIT 1", (busiest_object,)).fetchone()[0]
+    tmpdir = tempfile.mkdtemp(prefix='beton_bench_')
+
+    def load_constructions():
+        return conn.execute(LOAD_CONSTRUCTIONS, (busiest_object,)).fetchall()
+
+    def filter_constructions():
+        return conn.execute(
+            LOAD_CONSTRUCTIONS + " AND supplier LIKE ? AND element LIKE ?",
+            (busiest_object, '%БСУ-1%', '%Плит%')
+        ).fetchall()
+
+    def distinct_cold():
+        db.distinct_cache.invalidate()
+        return db.fetch_distinct('constructions', 'supplier')
+
+    def excel_export():
+        openpyxl = _require('openpyxl')
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        for row in load_constructions():
+            ws.append(row[1:])
+        wb.save(os.path.join(tmpdir, 'export.xlsx'))
+
+    def excel_import():
+        openpyxl = _require('openpyxl')
+        path = os.path.join(tmpdir, 'export.xlsx')
+        if not os.path.exists(path):
+            excel_export()
+        wb = openpyxl.load_workbook(path, read_only=True)
+        return sum(1 for _ in wb.active.iter_rows(values_only=True))
+
+    def docx_render():
+        _require('docxtpl')
+        data = documents.fetch_construction(conn, sample_id)
+        documents.render_document(documents.ACT_TEMPLATE, documents.build_context(data, 'Акт'),
+                                  os.path.join(tmpdir, 'act.docx'))
+
+    cases: Dict[str, Callable[[], Any]] = {
+        'load_organizations': lambda: conn.execute("SELECT id, name FROM organizations").fetchall(),
+        'load_objects': lambda: conn.execute(
+            "SELECT id, name, address FROM objects WHERE org_id = ?", (busiest_org,)).fetchall(),
+        'load_constructions': load_constructions,
+        'filter_constructions': filter_constructions,
+        'distinct_supplier_cached': lambda: db.fetch_distinct('constructions', 'supplier'),
+        'distinct_supplier_cold': distinct_cold,
+        'distinct_supplier_scan': lambda: conn.execute(
+            "SELECT DISTINCT supplier FROM constructions WHERE supplier IS NOT NULL AND supplier != '' "
+            "ORDER BY supplier").fetchall(),
+        'bot_records_page': lambda: conn.execute(
+            "SELECT id, pour_date, element, concrete_class FROM constructions WHERE object_id = ? "
+            "ORDER BY id DESC LIMIT 11", (busiest_object,)).fetchall(),
+        'bot_ranked_suppliers': lambda: usage_ranking.ranked_values(
+            conn, 'supplier', object_id=busiest_object, user_id=1),
+        'document_context': lambda: documents.build_context(
+            documents.fetch_construction(conn, sample_id), 'Акт'),
+        'docx_render': docx_render,
+        'excel_export': excel_export,
+        'excel_import': excel_import,
+    }
+
+    results: Dict[str, Any] = {}
+    try:
+        for name, func in cases.items():
+            if only and name not in only:
+                continue
+            try:
+                results[name] = measure(func, repeat)
+            except Skip as e:
+                results[name] = {'skipped': str(e)}
+            print(f"   {name:<26} {_format_result(results[name])}")
+    finally:
+        db.close()
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    return results
+
+
+def run_migration_benchmark(db_path: str, bulk: bool = False) -> Dict[str, Any]:
+    """Полная миграция DataMigrator в PostgreSQL (нужен DATABASE_URL на пустую базу)"""
+    if not os.getenv('DATABASE_URL'):
+        return {'skipped': 'не задан DATABASE_URL'}
+    try:
+        from migrate_to_railway import DataMigrator
+    except ImportError as e:
+        return {'skipped': f"не установлен {e.name}"}
+    migrator = DataMigrator(sqlite_path=db_path)
+    start = time.perf_counter()
+    ok = migrator.run_migration(bulk=bulk)
+    return {'ok': ok, 'bulk': bulk, 'total_ms': round((time.perf_counter() - start) * 1000, 1)}
+
+
+def _format_result(result: Dict[str, Any]) -> str:
+    if 'skipped' in result:
+        return f"пропущен ({result['skipped']})"
+    return f"min {result['min_ms']:.2f} мс, медиана {result['median_ms']:.2f} мс, p95 {result['p95_ms']:.2f} мс"
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Сравнение медиан с предыдущим отчетом (отношение новое/старое)"""
+    lines = []
+    for scale, data in report['scales'].items():
+        old = baseline.get('scales', {}).get(scale)
+        if not old:
+            continue
+        lines.append(f"Масштаб {scale}:")
+        for name, result in data['benchmarks'].items():
+            before = old['benchmarks'].get(name, {})
+            if 'median_ms' not in result or not before.get('median_ms'):
+                continue
+            ratio = result['median_ms'] / before['median_ms']
+            mark = "⚠️" if ratio > 1.2 else "✅"
+            lines.append(f"  {mark} {name:<26} {before['median_ms']:>10.2f} -> {result['median_ms']:>10.2f} мс"
+                         f"  (x{ratio:.2f})")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замеры производительности на синтетических данных")
+    parser.add_argument('--scale', default='10k', help="Размеры через запятую: 10k,100k,1m")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--only', help="Только указанные замеры через запятую")
+    parser.add_argument('--out', default='benchmark_report.json')
+    parser.add_argument('--compare', help="Отчет предыдущей версии для сравнения")
+    parser.add_argument('--migrate', action='store_true', help="Замерить DataMigrator (нужен DATABASE_URL)")
+    parser.add_argument('--migrate-bulk', action='store_true', help="То же в режиме COPY (--bulk)")
+    parser.add_argument('--keep-db', action='store_true', help="Не удалять сгенерированные базы")
+    args = parser.parse_args()
+
+    only = args.only.split(',') if args.only else None
+    report = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': sys.platform,
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'scales': {},
+    }
+    for scale in args.scale.split(','):
+        rows = parse_scale(scale)
+        db_path = f"bench_{scale.strip().lower()}.db"
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        print(f"\n📦 Генерация {rows} записей...")
+        try:
+            data = generate(db_path, rows, seed=args.seed)
+            print(f"   {data['generate_s']} с, {data['rows_per_s']} строк/с, {data['db_size_mb']} МБ")
+            print("⏱️ Замеры:")
+            data['benchmarks'] = run_benchmarks(db_path, repeat=args.repeat, only=only)
+            if args.migrate or args.migrate_bulk:
+                data['migration'] = run_migration_benchmark(db_path, bulk=args.migrate_bulk)
+            report['scales'][scale.strip().lower()] = data
+        finally:
+            if not args.keep_db and os.path.exists(db_path):
+                os.remove(db_path)
+
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n📄 Отчет: {args.out}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        print("\n".join(compare(report, baseline)) or "Нет общих масштабов для сравнения")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный тест Telegram-бота на локальной имитации Bot API
+
+N пользователей одновременно проходят настоящий диалог TelegramBotService:
+/start -> организация -> объект -> ... -> сохранение записи -> SEND:BOTH.
+Обновления подаются напрямую в Application.process_update, все ответы бота
+уходят на fake_telegram_api. Считаются пропускная способность, задержки
+(p50/p95/p99) по шагам, ошибки блокировки SQLite и неотправленные документы:
+если документов меньше, чем диалогов x документов на диалог, прогон
+завершается с кодом 1. Параллельные писатели
+(--writers) имитируют GUI и импорт Excel, пишущие в ту же базу.
+
+Запуск:
+    python bot_loadtest.py --users 50 --iterations 2
+    python bot_loadtest.py --users 20 --writers 2 --writer-hold-ms 200 --out load.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+from telegram import Update
+
+import benchmark
+from fake_telegram_api import FakeTelegramAPI
+from telegram_bot import TelegramBotService
+
+
+def conversation_steps(org_id: int, object_id: int, send: str, n: int) -> List[Tuple[str, str, str]]:
+    """Шаги диалога добавления контроля: (имя шага, тип, данные)"""
+    return [
+        ('start', 'text', '/start'),
+        ('action', 'callback', 'ACTION:ADD'),
+        ('org', 'callback', f'ORG:{org_id}'),
+        ('object', 'callback', f'OBJ:{object_id}'),
+        ('class', 'callback', 'CLASS:B25'),
+        ('frost', 'callback', 'FROST:F150'),
+        ('water', 'callback', 'WATER:W6'),
+        ('element', 'text', 'Плита перекрытия'),
+        ('supplier', 'callback', 'SUPPLIER:БСУ-1'),
+        ('passport', 'text', f'П-{n}'),
+        ('cubes', 'text', '6'),
+        ('cones', 'text', '2'),
+        ('slump', 'text', 'П4'),
+        ('volume', 'text', '12.5'),
+        ('temperature', 'text', '15'),
+        ('temp_measurements', 'text', '3'),
+        ('executor', 'callback', 'EXECUTOR:Лаборант 1'),
+        ('act', 'text', f'А-{n}'),
+        ('request', 'text', f'З-{n}'),
+        ('date', 'callback', 'DATE:TODAY'),
+        ('send', 'callback', f'SEND:{send}'),
+    ]
+
+
+# Документов на один диалог при выборе SEND:<...>
+DOCUMENTS_PER_SEND = {'ACT': 1, 'REQ': 1, 'BOTH': 2, 'NONE': 0}
+
+# Ответы бота, которыми он сообщает, что документы не сформированы или не отправлены
+DOCUMENT_FAILURES = (
+    'Ошибка при формировании акта', 'Не удалось отправить документы',
+    'Шаблон не найден', 'Запись не найдена для документов',
+)
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    return {
+        'count': len(values),
+        'p50_ms': round(percentile(values, 0.50), 2),
+        'p95_ms': round(percentile(values, 0.95), 2),
+        'p99_ms': round(percentile(values, 0.99), 2),
+        'max_ms': round(max(values), 2) if values else 0.0,
+    }
+
+
+def _is_lock_error(error: BaseException) -> bool:
+    return isinstance(error, sqlite3.OperationalError) and 'locked' in str(error)
+
+
+class BackgroundWriters:
+    """Потоки, пишущие в базу своими транзакциями (как GUI и импорт Excel)"""
+
+    def __init__(self, db_path: str, count: int, hold_ms: float, object_id: int):
+        self.db_path = db_path
+        self.count = count
+        self.hold = hold_ms / 1000
+        self.object_id = object_id
+        self.stop_event = threading.Event()
+        self.transactions = 0
+        self.lock_errors = 0
+        self._threads: List[threading.Thread] = []
+
+    def _work(self) -> None:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    conn.execute("BEGIN IMMEDIATE")
+                    conn.execute(
+                        "INSERT INTO constructions (object_id, pour_date, element) VALUES (?, '01-01-2024', 'Импорт')",
+                        (self.object_id,)
+                    )
+                    time.sleep(self.hold)
+                    conn.commit()
+                    self.transactions += 1
+                except sqlite3.OperationalError as e:
+                    if conn.in_transaction:
+                        conn.rollback()
+                    if 'locked' in str(e):
+                        self.lock_errors += 1
+                time.sleep(self.hold)
+        finally:
+            conn.close()
+
+    def start(self) -> None:
+        for _ in range(self.count):
+            thread = threading.Thread(target=self._work, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        self.stop_event.set()
+        for thread in self._threads:
+            thread.join()
+
+
+async def run_load(service: TelegramBotService, api: FakeTelegramAPI, users: int, iterations: int,
+                   send: str, think_ms: float, seed: int) -> Dict[str, Any]:
+    application = service.build_application()
+    if application is None:
+        raise RuntimeError("Не удалось собрать приложение бота")
+
+    errors: Dict[str, int] = {'lock': 0, 'other': 0}
+
+    async def on_error(update, context):
+        errors['lock' if _is_lock_error(context.error) else 'other'] += 1
+
+    application.add_error_handler(on_error)
+
+    conn = sqlite3.connect(service.db_path)
+    pairs = conn.execute("SELECT org_id, id FROM objects").fetchall()
+    conn.close()
+    rng = random.Random(seed)
+    step_times: Dict[str, List[float]] = {}
+    conversation_times: List[float] = []
+
+    async def simulate(user_id: int) -> None:
+        for i in range(iterations):
+            org_id, object_id = rng.choice(pairs)
+            started = time.perf_counter()
+            for name, kind, payload in conversation_steps(org_id, object_id, send, user_id * 1000 + i):
+                data = api.message_update(user_id, payload) if kind == 'text' else api.callback_update(user_id, payload)
+                update = Update.de_json(data, application.bot)
+                start = time.perf_counter()
+                await application.process_update(update)
+                step_times.setdefault(name, []).append((time.perf_counter() - start) * 1000)
+                if think_ms:
+                    await asyncio.sleep(rng.uniform(0, think_ms) / 1000)
+            conversation_times.append((time.perf_counter() - started) * 1000)
+
+    async with application:
+        await application.start()
+        wall_start = time.perf_counter()
+        await asyncio.gather(*(simulate(100000 + u) for u in range(users)))
+        wall = time.perf_counter() - wall_start
+        await application.stop()
+
+    all_steps = [t for times in step_times.values() for t in times]
+    # Ошибки сохранения и документов бот не пробрасывает, а пишет пользователю
+    replies = [
+        str(call['params'].get('text', '')) for call in api.calls
+        if call['method'] in ('sendMessage', 'editMessageText')
+    ]
+    failed_saves = sum(1 for text in replies if text.startswith('Ошибка сохранения'))
+    locked_saves = sum(1 for text in replies if 'locked' in text)
+    failed_documents = sum(1 for text in replies if text.startswith(DOCUMENT_FAILURES))
+    return {
+        'users': users,
+        'iterations': iterations,
+        'conversations': len(conversation_times),
+        'wall_s': round(wall, 3),
+        'updates_per_s': round(len(all_steps) / wall, 1) if wall else None,
+        'conversations_per_s': round(len(conversation_times) / wall, 2) if wall else None,
+        'step_latency': _summary(all_steps),
+        'conversation_latency': _summary(conversation_times),
+        'steps': {name: _summary(times) for name, times in step_times.items()},
+        'errors': {
+            'handler_lock_errors': errors['lock'] + locked_saves,
+            'handler_other_errors': errors['other'],
+            'failed_saves': failed_saves,
+            'failed_documents': failed_documents,
+        },
+        'documents_sent': len(api.calls_for('sendDocument')),
+        'documents_expected': len(conversation_times) * DOCUMENTS_PER_SEND[send],
+    }
+
+
+def problems(report: Dict[str, Any]) -> List[str]:
+    """Причины считать прогон неудачным (пустой список - все в порядке)"""
+    result = []
+    if report['documents_sent'] < report['documents_expected']:
+        result.append(
+            f"отправлено документов {report['documents_sent']} из {report['documents_expected']} "
+            f"(ошибок документов: {report['errors']['failed_documents']})"
+        )
+    if report['errors']['failed_saves']:
+        result.append(f"ошибок сохранения: {report['errors']['failed_saves']}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест Telegram-бота")
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--iterations', type=int, default=1, help="Записей на пользователя")
+    parser.add_argument('--send', default='BOTH', choices=['ACT', 'REQ', 'BOTH', 'NONE'])
+    parser.add_argument('--think-ms', type=float, default=0, help="Пауза пользователя между шагами")
+    parser.add_argument('--db', help="Готовая база (по умолчанию - синтетическая во временной папке)")
+    parser.add_argument('--records', default='10k', help="Размер синтетической базы")
+    parser.add_argument('--writers', type=int, default=0, help="Параллельные писатели в базу")
+    parser.add_argument('--writer-hold-ms', type=float, default=50, help="Длительность транзакции писателя")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--out', help="JSON-отчет")
+    args = parser.parse_args()
+
+    tmpdir = None
+    db_path = args.db
+    if not db_path:
+        tmpdir = tempfile.mkdtemp(prefix='beton_load_')
+        db_path = os.path.join(tmpdir, 'load.db')
+        print(f"📦 Синтетическая база: {args.records} записей")
+        benchmark.generate(db_path, benchmark.parse_scale(args.records), seed=args.seed)
+
+    conn = sqlite3.connect(db_path)
+    before = conn.execute("SELECT COUNT(*) FROM constructions").fetchone()[0]
+    first_object = conn.execute("SELECT MIN(id) FROM objects").fetchone()[0]
+    conn.close()
+
+    writers = BackgroundWriters(db_path, args.writers, args.writer_hold_ms, first_object)
+    with FakeTelegramAPI() as api:
+        service = TelegramBotService('123456:LOADTEST', db_path=db_path, base_url=api.base_url)
+        print(f"🤖 {args.users} пользователей x {args.iterations}, писателей: {args.writers}")
+        writers.start()
+        try:
+            report = asyncio.run(run_load(service, api, args.users, args.iterations, args.send,
+                                          args.think_ms, args.seed))
+        finally:
+            writers.stop()
+
+    conn = sqlite3.connect(db_path)
+    after = conn.execute("SELECT COUNT(*) FROM constructions").fetchone()[0]
+    conn.close()
+    report['saved_records'] = after - before - writers.transactions
+    report['writers'] = {
+        'count': args.writers,
+        'hold_ms': args.writer_hold_ms,
+        'transactions': writers.transactions,
+        'lock_errors': writers.lock_errors,
+    }
+
+    print(f"\n⏱️ {report['conversations']} диалогов за {report['wall_s']} с "
+          f"({report['conversations_per_s']} диалогов/с, {report['updates_per_s']} обновлений/с)")
+    print(f"   Шаг: p50 {report['step_latency']['p50_ms']} мс, p95 {report['step_latency']['p95_ms']} мс, "
+          f"p99 {report['step_latency']['p99_ms']} мс")
+    slowest = sorted(report['steps'].items(), key=lambda item: item[1]['p95_ms'], reverse=True)[:5]
+    for name, summary in slowest:
+        print(f"   {name:<18} p95 {summary['p95_ms']:>8.2f} мс")
+    print(f"   Сохранено записей: {report['saved_records']} из {report['conversations']}, "
+          f"документов: {report['documents_sent']} из {report['documents_expected']}")
+    print(f"   Ошибки блокировки: бот {report['errors']['handler_lock_errors']}, "
+          f"писатели {writers.lock_errors}; прочие ошибки: {report['errors']['handler_other_errors']}, "
+          f"документов: {report['errors']['failed_documents']}")
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📄 Отчет: {args.out}")
+
+    if tmpdir:
+        for name in os.listdir(tmpdir):
+            os.remove(os.path.join(tmpdir, name))
+        os.rmdir(tmpdir)
+
+    failures = problems(report)
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
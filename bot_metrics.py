@@ -0,0 +1,229 @@
+"""
+Метрики Telegram-бота в формате Prometheus
+
+Время обработчиков диалога, формирование и отправка документов, значения
+add_gauge (активные диалоги из хранилища состояния бота, очередь обновлений)
+и время SQL-запросов (query_stats) отдаются по HTTP на /metrics. Порт задается BOT_METRICS_PORT (без него
+сервер не запускается), адрес - BOT_METRICS_HOST (по умолчанию 127.0.0.1).
+"""
+
+import functools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+import query_stats
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин, секунды
+HANDLER_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+DOCUMENT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _labels(key: LabelKey, extra: str = '') -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in key]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != float('inf') else '+Inf'
+
+
+class Histogram:
+    """Гистограмма с метками"""
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...]):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets) + (float('inf'),)
+        self._lock = threading.Lock()
+        self._series: Dict[LabelKey, List] = {}
+
+    def observe(self, seconds: float, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += seconds
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        series = self._series.get(tuple(sorted(labels.items())))
+        return series[2] if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(key, list(s[0]), s[1], s[2]) for key, s in sorted(self._series.items())]
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(key)} {count}")
+        return lines
+
+
+class Counter:
+    """Счетчик с метками"""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._lock = threading.Lock()
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines.extend(f"{self.name}{_labels(key)} {_number(value)}" for key, value in items)
+        return lines
+
+
+class BotMetrics:
+    """Набор метрик бота и HTTP-сервер для их выдачи"""
+
+    def __init__(self):
+        self.handler_seconds = Histogram(
+            'beton_bot_handler_seconds', 'Время обработчиков диалога', HANDLER_BUCKETS)
+        self.handler_errors = Counter(
+            'beton_bot_handler_errors_total', 'Исключения в обработчиках диалога')
+        self.document_render_seconds = Histogram(
+            'beton_bot_document_render_seconds', 'Формирование документа по шаблону', DOCUMENT_BUCKETS)
+        self.document_send_seconds = Histogram(
+            'beton_bot_document_send_seconds', 'Отправка документа в Telegram', DOCUMENT_BUCKETS)
+        self._gauges: Dict[str, Tuple[str, Callable[[], float]]] = {}
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    # ---------- обработчики ----------
+    def instrument(self, callback):
+        """Оборачивает обработчик: время и ошибки"""
+        name = callback.__name__
+
+        @functools.wraps(callback)
+        async def wrapper(update, context):
+            start = time.perf_counter()
+            try:
+                return await callback(update, context)
+            except Exception:
+                self.handler_errors.inc(handler=name)
+                raise
+            finally:
+                self.handler_seconds.observe(time.perf_counter() - start, handler=name)
+
+        return wrapper
+
+    def instrument_conversation(self, conv) -> None:
+        """Подключает замеры ко всем обработчикам ConversationHandler"""
+        handlers = list(conv.entry_points) + list(conv.fallbacks)
+        for state_handlers in conv.states.values():
+            handlers.extend(state_handlers)
+        for handler in handlers:
+            handler.callback = self.instrument(handler.callback)
+
+    def add_gauge(self, name: str, help_text: str, func: Callable[[], float]) -> None:
+        """Метрика, значение которой вычисляется при каждом запросе /metrics"""
+        self._gauges[name] = (help_text, func)
+
+    # ---------- выдача ----------
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in (self.handler_seconds, self.handler_errors,
+                       self.document_render_seconds, self.document_send_seconds):
+            lines.extend(metric.render())
+        for name, (help_text, func) in sorted(self._gauges.items()):
+            try:
+                value = func()
+            except Exception as e:
+                logger.warning(f"Не удалось вычислить {name}: {e}")
+                continue
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {_number(value)}"]
+        lines.extend(self._render_queries())
+        return "\n".join(lines) + "\n"
+
+    def _render_queries(self) -> List[str]:
+        rows = query_stats.stats.snapshot()
+        lines = [
+            "# HELP beton_sql_query_seconds_total Суммарное время SQL-запросов",
+            "# TYPE beton_sql_query_seconds_total counter",
+        ]
+        lines += [
+            f"beton_sql_query_seconds_total{_labels((('query', row['query']),))} {_number(row['total_ms'] / 1000)}"
+            for row in rows
+        ]
+        lines += [
+            "# HELP beton_sql_queries_total Число SQL-запросов",
+            "# TYPE beton_sql_queries_total counter",
+        ]
+        lines += [f"beton_sql_queries_total{_labels((('query', row['query']),))} {row['count']}" for row in rows]
+        return lines
+
+    def serve(self, port: Optional[int] = None, host: Optional[str] = None) -> Optional[int]:
+        """Запускает HTTP-сервер /metrics в фоновом потоке, возвращает порт"""
+        if port is None:
+            port_env = os.getenv('BOT_METRICS_PORT')
+            if not port_env:
+                return None
+            port = int(port_env)
+        host = host or os.getenv('BOT_METRICS_HOST', '127.0.0.1')
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                data = metrics.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server.server_address[1]
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,223 @@
+"""
+Хранение состояния диалогов Telegram-бота в SQLite
+
+Прогресс мастера добавления контроля (состояние ConversationHandler и
+context.user_data) сохраняется в таблицы bot_conversations и bot_user_data,
+поэтому перезапуск бота не теряет наполовину заполненные записи.
+
+Запись отложенная: изменения, которые Application передает пачкой раз в
+update_interval секунд, копятся в памяти и сбрасываются на диск одной
+транзакцией.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+import query_stats
+
+logger = logging.getLogger(__name__)
+
+# Незавершенные диалоги и данные пользователей старше этого срока при
+# загрузке не восстанавливаются
+CONVERSATION_TTL_DAYS = 7
+
+_DELETED = object()
+
+
+class SQLitePersistence(BasePersistence):
+    """Persistence для python-telegram-bot поверх SQLite с пакетной записью"""
+
+    def __init__(self, db_path: str = 'concrete.db', update_interval: Optional[float] = None,
+                 flush_delay: float = 0.5):
+        if update_interval is None:
+            update_interval = float(os.getenv('TELEGRAM_PERSISTENCE_INTERVAL', '5'))
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval,
+        )
+        self.db_path = db_path
+        self.flush_delay = flush_delay
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pending_conversations: Dict[Tuple[str, str], Any] = {}
+        self._pending_user_data: Dict[int, Any] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+    # ---------- работа с базой ----------
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = query_stats.connect(self.db_path)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS bot_conversations (
+                    name TEXT NOT NULL,
+                    conv_key TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (name, conv_key)
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS bot_user_data (
+                    user_id INTEGER PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            self._conn.commit()
+        return self._conn
+
+    def _write_pending(self) -> None:
+        """Записывает накопленные изменения одной транзакцией"""
+        if not self._pending_conversations and not self._pending_user_data:
+            return
+        conversations, self._pending_conversations = self._pending_conversations, {}
+        user_data, self._pending_user_data = self._pending_user_data, {}
+        now = time.time()
+        conn = self._connection()
+        try:
+            with conn:
+                for (name, key), state in conversations.items():
+                    if state is _DELETED:
+                        conn.execute("DELETE FROM bot_conversations WHERE name = ? AND conv_key = ?", (name, key))
+                    else:
+                        conn.execute(
+                            "INSERT OR REPLACE INTO bot_conversations (name, conv_key, state, updated_at) "
+                            "VALUES (?, ?, ?, ?)",
+                            (name, key, state, now)
+                        )
+                for user_id, data in user_data.items():
+                    if data is _DELETED:
+                        conn.execute("DELETE FROM bot_user_data WHERE user_id = ?", (user_id,))
+                    else:
+                        conn.execute(
+                            "INSERT OR REPLACE INTO bot_user_data (user_id, data, updated_at) VALUES (?, ?, ?)",
+                            (user_id, data, now)
+                        )
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка сохранения состояния бота: {e}")
+            # Не теряем изменения: вернем их в очередь, если их не перезаписали новые
+            for key, value in conversations.items():
+                self._pending_conversations.setdefault(key, value)
+            for key, value in user_data.items():
+                self._pending_user_data.setdefault(key, value)
+
+    def _schedule_write(self) -> None:
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(self._delayed_write())
+
+    async def _delayed_write(self) -> None:
+        # Ждем, пока Application передаст всю пачку изменений
+        await asyncio.sleep(self.flush_delay)
+        self._write_pending()
+
+    # ---------- загрузка ----------
+    def _expired_before(self) -> float:
+        return time.time() - CONVERSATION_TTL_DAYS * 86400
+
+    async def get_user_data(self) -> Dict[int, Dict[Any, Any]]:
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM bot_user_data WHERE updated_at < ?", (self._expired_before(),))
+        rows = conn.execute("SELECT user_id, data FROM bot_user_data").fetchall()
+        return {user_id: json.loads(data) for user_id, data in rows}
+
+    async def get_chat_data(self) -> Dict[int, Any]:
+        return {}
+
+    async def get_bot_data(self) -> Dict[Any, Any]:
+        return {}
+
+    async def get_callback_data(self) -> None:
+        return None
+
+    def active_conversations(self, name: str) -> int:
+        """Незавершенные диалоги name, которые будут восстановлены (не старше срока).
+
+        Вызывается из потока /metrics, поэтому читает базу своим соединением;
+        еще не записанные изменения учитываются поверх базы.
+        """
+        keys = set()
+        if os.path.exists(self.db_path):
+            conn = sqlite3.connect(self.db_path)
+            try:
+                keys = {key for key, in conn.execute(
+                    "SELECT conv_key FROM bot_conversations WHERE name = ? AND updated_at >= ?",
+                    (name, self._expired_before())
+                )}
+            except sqlite3.OperationalError:
+                # Таблица еще не создана
+                pass
+            finally:
+                conn.close()
+        for (conv_name, key), state in list(self._pending_conversations.items()):
+            if conv_name != name:
+                continue
+            if state is _DELETED:
+                keys.discard(key)
+            else:
+                keys.add(key)
+        return len(keys)
+
+    async def get_conversations(self, name: str) -> Dict[Tuple, object]:
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "DELETE FROM bot_conversations WHERE name = ? AND updated_at < ?",
+                (name, self._expired_before())
+            )
+        rows = conn.execute(
+            "SELECT conv_key, state FROM bot_conversations WHERE name = ?", (name,)
+        ).fetchall()
+        return {tuple(json.loads(key)): json.loads(state) for key, state in rows}
+
+    # ---------- изменения ----------
+    async def update_conversation(self, name: str, key: Tuple, new_state: Optional[object]) -> None:
+        conv_key = json.dumps(list(key))
+        self._pending_conversations[(name, conv_key)] = (
+            _DELETED if new_state is None else json.dumps(new_state)
+        )
+        self._schedule_write()
+
+    async def update_user_data(self, user_id: int, data: Dict[Any, Any]) -> None:
+        self._pending_user_data[user_id] = json.dumps(data, ensure_ascii=False) if data else _DELETED
+        self._schedule_write()
+
+    async def update_chat_data(self, chat_id: int, data: Any) -> None:
+        pass
+
+    async def update_bot_data(self, data: Any) -> None:
+        pass
+
+    async def update_callback_data(self, data: Any) -> None:
+        pass
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        pass
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._pending_user_data[user_id] = _DELETED
+        self._schedule_write()
+
+    async def refresh_user_data(self, user_id: int, user_data: Dict[Any, Any]) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: Any) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: Any) -> None:
+        pass
+
+    async def flush(self) -> None:
+        """Вызывается при остановке бота: сбрасывает все несохраненное"""
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+        self._write_pending()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
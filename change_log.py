@@ -0,0 +1,187 @@
+"""
+Журнал изменений SQLite для инкрементальной синхронизации с PostgreSQL
+
+Триггеры на organizations, objects и constructions записывают в change_log
+каждую вставку, изменение и удаление (таблица, id строки, операция).
+sync_to_postgres.py читает журнал после последнего отправленного seq и
+переносит только затронутые строки, после чего журнал обрезается и
+отмечает себя в change_log_consumers. Если синхронизация на этой машине не
+запускалась ни разу (только GUI), журнал обрезает обслуживание
+(maintenance.py): остаются записи за BETON_CHANGE_LOG_DAYS дней, но не
+больше BETON_CHANGE_LOG_KEEP последних.
+ChangeFeed по тому же журналу сообщает GUI об изменениях, сделанных другими
+соединениями (ботом, другим окном), чтобы обновлять таблицы точечно.
+"""
+
+import os
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+
+# Таблицы, изменения которых попадают в журнал
+TRACKED_TABLES = ('organizations', 'objects', 'constructions')
+
+_OPERATIONS = (('INSERT', 'I', 'NEW'), ('UPDATE', 'U', 'NEW'), ('DELETE', 'D', 'OLD'))
+
+# Журнал без синхронизации нужен только ленте изменений GUI
+DEFAULT_RETENTION_DAYS = 7
+DEFAULT_RETENTION_ROWS = 10000
+
+
+def _trigger_name(table: str, op: str) -> str:
+    return f"trg_change_log_{table}_{op.lower()}"
+
+
+def ensure_schema(conn: sqlite3.Connection) -> None:
+    """Создает таблицу журнала и триггеры (повторный вызов ничего не меняет)"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            op TEXT NOT NULL,
+            changed_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    # Кто читает журнал и обрезает его сам (источники sync_to_postgres.py)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS change_log_consumers (
+            source TEXT PRIMARY KEY,
+            last_seq INTEGER NOT NULL,
+            synced_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    for table in TRACKED_TABLES:
+        for event, op, alias in _OPERATIONS:
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {_trigger_name(table, op)} AFTER {event} ON {table}
+                BEGIN
+                INSERT INTO change_log (table_name, row_id, op) VALUES ('{table}', {alias}.id, '{op}');
+                END
+            """)
+
+
+def read_changes(conn: sqlite3.Connection, after_seq: int, limit: int) -> Tuple[int, Dict[str, Dict[int, str]]]:
+    """Изменения с seq > after_seq (не больше limit записей журнала).
+
+    Возвращает последний прочитанный seq и последнюю операцию по каждой строке:
+    {таблица: {id: 'I' | 'U' | 'D'}}. Если записей нет, seq равен after_seq.
+    """
+    rows = conn.execute(
+        "SELECT seq, table_name, row_id, op FROM change_log WHERE seq > ? ORDER BY seq LIMIT ?",
+        (after_seq, limit)
+    ).fetchall()
+    return (rows[-1][0] if rows else after_seq), _collapse(row[1:] for row in rows)
+
+
+def _collapse(rows) -> Dict[str, Dict[int, str]]:
+    """Последняя операция по каждой строке из записей (таблица, id, операция)"""
+    changes: Dict[str, Dict[int, str]] = {table: {} for table in TRACKED_TABLES}
+    for table, row_id, op in rows:
+        changes.setdefault(table, {})[row_id] = op
+    return changes
+
+
+def prune(conn: sqlite3.Connection, upto_seq: int) -> int:
+    """Удаляет из журнала уже отправленные записи, возвращает их число"""
+    cursor = conn.execute("DELETE FROM change_log WHERE seq <= ?", (upto_seq,))
+    conn.commit()
+    return cursor.rowcount
+
+
+def mark_consumer(conn: sqlite3.Connection, source: str, seq: int) -> None:
+    """Отмечает, что источник source отправил журнал до seq"""
+    conn.execute("""
+        INSERT INTO change_log_consumers (source, last_seq) VALUES (?, ?)
+        ON CONFLICT(source) DO UPDATE SET last_seq = excluded.last_seq, synced_at = CURRENT_TIMESTAMP
+    """, (source, seq))
+    conn.commit()
+
+
+def trim(conn: sqlite3.Connection, days: Optional[float] = None, keep: Optional[int] = None) -> int:
+    """Обрезает журнал, который никто не синхронизирует; возвращает число удаленных записей.
+
+    Пока есть источник синхронизации, журнал не трогается: неотправленные
+    записи нужны ему, а отправленные он удаляет сам (prune).
+    """
+    tables = {row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('change_log', 'change_log_consumers')"
+    )}
+    if 'change_log' not in tables:
+        return 0
+    if 'change_log_consumers' in tables and conn.execute("SELECT 1 FROM change_log_consumers LIMIT 1").fetchone():
+        return 0
+    days = days if days is not None else float(os.getenv('BETON_CHANGE_LOG_DAYS', DEFAULT_RETENTION_DAYS))
+    keep = keep if keep is not None else int(os.getenv('BETON_CHANGE_LOG_KEEP', DEFAULT_RETENTION_ROWS))
+    cursor = conn.execute(
+        "DELETE FROM change_log WHERE changed_at < datetime('now', ?) OR seq <= ?",
+        (f"-{days:g} days", last_seq(conn) - keep)
+    )
+    conn.commit()
+    return cursor.rowcount
+
+
+def pending_count(conn: sqlite3.Connection, after_seq: int = 0) -> int:
+    return conn.execute("SELECT COUNT(*) FROM change_log WHERE seq > ?", (after_seq,)).fetchone()[0]
+
+
+def fetch_rows(conn: sqlite3.Connection, table: str, columns: List[str], ids: List[int],
+               source: Optional[str] = None) -> List[tuple]:
+    """Текущие строки таблицы по списку id (удаленных строк в результате нет).
+
+    source - таблица или представление, откуда читать (по умолчанию table).
+    """
+    result = []
+    # Ограничение SQLite на число параметров
+    for i in range(0, len(ids), 500):
+        part = ids[i:i + 500]
+        placeholders = ', '.join('?' for _ in part)
+        result.extend(conn.execute(
+            f"SELECT {', '.join(columns)} FROM {source or table} WHERE id IN ({placeholders}) ORDER BY id", part
+        ).fetchall())
+    return result
+
+
+def last_seq(conn: sqlite3.Connection) -> int:
+    """Последний выданный seq журнала (не уменьшается после обрезки)"""
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'").fetchone()
+    return row[0] if row else 0
+
+
+class ChangeFeed:
+    """Лента изменений, сделанных другими соединениями.
+
+    PRAGMA data_version меняется только при коммитах чужих соединений, поэтому
+    пустой опрос стоит одного PRAGMA. Если часть журнала уже обрезана
+    синхронизацией или изменений слишком много, poll возвращает None -
+    тогда нужна полная перезагрузка.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, limit: int = 500):
+        self.conn = conn
+        self.limit = limit
+        self.data_version = self._data_version()
+        self.seq = last_seq(conn)
+
+    def _data_version(self) -> int:
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def poll(self) -> Optional[Dict[str, Dict[int, str]]]:
+        """Изменения с прошлого опроса: {таблица: {id: операция}} или None"""
+        version = self._data_version()
+        if version == self.data_version:
+            return {}
+        self.data_version = version
+        after, upto = self.seq, last_seq(self.conn)
+        if upto <= after:
+            return {}
+        self.seq = upto
+        present = self.conn.execute(
+            "SELECT COUNT(*) FROM change_log WHERE seq > ? AND seq <= ?", (after, upto)
+        ).fetchone()[0]
+        if present < upto - after or present > self.limit:
+            return None
+        return _collapse(self.conn.execute(
+            "SELECT table_name, row_id, op FROM change_log WHERE seq > ? AND seq <= ? ORDER BY seq",
+            (after, upto)
+        ))
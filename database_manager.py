@@ -1,9 +1,17 @@
-import sqlite3
 import os
 import logging
-from typing import Optional, Union, Dict, Any, List
+import itertools
+from typing import Optional, Dict, Any, Iterator, List
 from contextlib import contextmanager
 
+import change_log
+import distinct_cache
+import models
+import queries
+import query_stats
+import usage_ranking
+from distinct_cache import DistinctValueCache
+
 # Пытаемся загрузить dotenv для Railway
 try:
     from dotenv import load_dotenv
@@ -12,18 +20,94 @@ try:
 except ImportError:
     print("⚠️ python-dotenv не установлен, используем системные переменные")
 
+# Схема PostgreSQL (общая для DatabaseManager и migrate_to_railway.py)
+POSTGRES_TABLES = [
+    """CREATE TABLE IF NOT EXISTS organizations (
+        id SERIAL PRIMARY KEY,
+        name VARCHAR(255) NOT NULL UNIQUE,
+        contact VARCHAR(255),
+        phone VARCHAR(50)
+    )""",
+    """CREATE TABLE IF NOT EXISTS objects (
+        id SERIAL PRIMARY KEY,
+        org_id INTEGER NOT NULL REFERENCES organizations(id) ON DELETE CASCADE,
+        name VARCHAR(255) NOT NULL,
+        address TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS constructions (
+        id SERIAL PRIMARY KEY,
+        object_id INTEGER NOT NULL REFERENCES objects(id) ON DELETE CASCADE,
+        pour_date VARCHAR(20),
+        element TEXT,
+        concrete_class VARCHAR(50),
+        frost_resistance VARCHAR(20),
+        water_resistance VARCHAR(20),
+        supplier VARCHAR(255),
+        concrete_passport VARCHAR(255),
+        volume_concrete DECIMAL(10,2),
+        cubes_count INTEGER,
+        cones_count INTEGER,
+        slump VARCHAR(50),
+        temperature VARCHAR(50),
+        temp_measurements INTEGER,
+        executor VARCHAR(255),
+        act_number VARCHAR(100),
+        request_number VARCHAR(100),
+        invoice VARCHAR(100)
+    )""",
+    "ALTER TABLE constructions ADD COLUMN IF NOT EXISTS invoice VARCHAR(100)",
+    "CREATE INDEX IF NOT EXISTS idx_objects_org_id ON objects(org_id, name)",
+    "CREATE INDEX IF NOT EXISTS idx_constructions_object_id ON constructions(object_id)",
+]
+
+# Строк за один запрос к серверу при потоковом чтении
+STREAM_BATCH_SIZE = 1000
+
+
+def _dict_factory(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
 class DatabaseManager:
-    """Простой менеджер базы данных SQLite для Beton_control с поддержкой Railway"""
+    """Менеджер базы данных Beton_control: SQLite или PostgreSQL Railway.
+
+    db_type - 'sqlite' или 'postgresql'; по умолчанию берется из DB_TYPE, но
+    явно переданный db_path всегда означает SQLite. row_factory - 'tuple'
+    или 'dict' (по умолчанию кортежи для SQLite и словари для PostgreSQL).
+    """
     
-    def __init__(self, db_path: str = None):
+    def __init__(self, db_path: str = None, db_type: str = None, row_factory: str = None):
         # Используем Railway путь или локальный
         self.db_path = db_path or os.getenv('RAILWAY_DB_PATH', 'concrete.db')
+        self.db_type = (db_type or ('sqlite' if db_path else os.getenv('DB_TYPE', 'sqlite'))).lower()
+        self.row_factory = row_factory
         self.connection = None
         self.cursor = None
-        self.db_type = 'sqlite'
+        self.pool = None
+        self.distinct_cache = None
+        self._stream_ids = itertools.count(1)
         self.setup_logging()
+        if self.db_type == 'postgresql':
+            try:
+                self.init_postgresql()
+                return
+            except Exception as e:
+                if os.getenv('USE_SQLITE_FALLBACK', 'true').lower() != 'true':
+                    raise
+                self.logger.warning(f"PostgreSQL недоступен ({e}), переключаемся на SQLite")
+                self.db_type = 'sqlite'
+                self.pool = None
         self.init_database()
     
+    @property
+    def conn(self):
+        """Соединение SQLite (старое имя, которым пользуются GUI)"""
+        return self.connection
+    
+    @property
+    def placeholder(self) -> str:
+        return '%s' if self.db_type == 'postgresql' else '?'
+    
     def setup_logging(self):
         """Настройка логирования"""
         logging.basicConfig(
@@ -31,7 +115,7 @@ class DatabaseManager:
             format='%(asctime)s - %(levelname)s - %(message)s'
         )
         self.logger = logging.getLogger(__name__)
-        self.logger.info(f"Инициализация базы данных: {self.db_path}")
+        self.logger.info(f"Инициализация базы данных: {self.db_path if self.db_type == 'sqlite' else self.db_type}")
     
     def init_database(self):
         """Инициализация базы данных"""
@@ -42,14 +126,48 @@ class DatabaseManager:
                 os.makedirs(db_dir)
                 self.logger.info(f"Создана директория: {db_dir}")
             
-            self.connection = sqlite3.connect(self.db_path)
+            # Все запросы замеряются (см. query_stats)
+            self.connection = query_stats.connect(self.db_path)
             self.cursor = self.connection.cursor()
             self.create_tables()
+            # Словари только у курсора запросов: служебный код ждет кортежи
+            if self.row_factory == 'dict':
+                self.cursor.row_factory = _dict_factory
+            self.distinct_cache = DistinctValueCache(self.connection)
             self.logger.info(f"База данных SQLite инициализирована: {self.db_path}")
         except Exception as e:
             self.logger.error(f"Ошибка инициализации базы данных: {e}")
             raise
     
+    def init_postgresql(self):
+        """Пул соединений с PostgreSQL (DATABASE_URL или RAILWAY_DB_*)"""
+        import psycopg2.extensions
+        import psycopg2.extras
+        import psycopg2.pool
+
+        base = psycopg2.extras.RealDictCursor if (self.row_factory or 'dict') == 'dict' else None
+        self.row_factory = self.row_factory or 'dict'
+        self._pg_cursor_factory = (
+            query_stats.pg_cursor_factory(base) if query_stats.enabled() else (base or psycopg2.extensions.cursor)
+        )
+        max_connections = int(os.getenv('BETON_PG_POOL_MAX', '5'))
+        database_url = os.getenv('DATABASE_URL')
+        if database_url:
+            self.pool = psycopg2.pool.ThreadedConnectionPool(1, max_connections, database_url)
+        else:
+            self.pool = psycopg2.pool.ThreadedConnectionPool(
+                1, max_connections,
+                host=os.getenv('RAILWAY_DB_HOST'),
+                port=os.getenv('RAILWAY_DB_PORT', 5432),
+                database=os.getenv('RAILWAY_DB_NAME'),
+                user=os.getenv('RAILWAY_DB_USER'),
+                password=os.getenv('RAILWAY_DB_PASSWORD'),
+            )
+        with self.get_cursor() as cursor:
+            for script in POSTGRES_TABLES:
+                cursor.execute(script)
+        self.logger.info(f"Пул соединений PostgreSQL создан (до {max_connections} соединений)")
+    
     def create_tables(self):
         """Создание таблиц если они не существуют"""
         try:
@@ -107,6 +225,17 @@ class DatabaseManager:
                 self.cursor.execute("ALTER TABLE constructions ADD COLUMN invoice TEXT")
                 self.logger.info("Добавлена колонка 'invoice' в таблицу constructions")
             
+            # Индексы для постраничного вывода объектов и записей контроля
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_objects_org_id ON objects(org_id, name)")
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_constructions_object_id ON constructions(object_id)")
+            
+            # Справочник уникальных значений для выпадающих списков
+            distinct_cache.ensure_schema(self.connection)
+            # Счетчики использования значений для подсказок бота
+            usage_ranking.ensure_schema(self.connection)
+            # Журнал изменений для синхронизации с PostgreSQL
+            change_log.ensure_schema(self.connection)
+            
             self.connection.commit()
             self.logger.info("Таблицы созданы успешно")
         except Exception as e:
@@ -116,6 +245,21 @@ class DatabaseManager:
     @contextmanager
     def get_cursor(self):
         """Контекстный менеджер для работы с курсором"""
+        if self.db_type == 'postgresql':
+            # Соединение берется из пула на время одной транзакции
+            connection = self.pool.getconn()
+            cursor = connection.cursor(cursor_factory=self._pg_cursor_factory)
+            try:
+                yield cursor
+                connection.commit()
+            except Exception as e:
+                connection.rollback()
+                self.logger.error(f"Ошибка в транзакции: {e}")
+                raise
+            finally:
+                cursor.close()
+                self.pool.putconn(connection)
+            return
         try:
             yield self.cursor
             self.connection.commit()
@@ -144,14 +288,75 @@ class DatabaseManager:
             self.logger.error(f"Ошибка выполнения запроса: {e}")
             raise
     
+    def execute_named(self, name: str, params: tuple = (), record=None) -> List:
+        """Выполнение запроса из реестра queries (подготовленное выражение).
+
+        record - класс записи из models: строки возвращаются записями.
+        """
+        try:
+            with self.get_cursor() as cursor:
+                if record is not None and self.db_type != 'postgresql':
+                    # Отдельный курсор: фабрика записей не должна остаться на общем self.cursor
+                    return models.fetchall(self.connection, name, record, params)
+                if record is not None:
+                    return models.fetchall(cursor, name, record, params)
+                return queries.execute(cursor, name, params).fetchall()
+        except Exception as e:
+            self.logger.error(f"Ошибка выполнения запроса {name}: {e}")
+            raise
+    
+    def iter_query(self, query: str, params: tuple = (), batch_size: int = STREAM_BATCH_SIZE,
+                   record=None) -> Iterator:
+        """Потоковое чтение большого результата порциями по batch_size строк.
+
+        В PostgreSQL используется именованный (серверный) курсор, поэтому
+        результат не загружается в память целиком. Генератор нужно дочитать
+        или закрыть, пока он держит соединение из пула. record - класс записи
+        из models, как в execute_named.
+        """
+        if self.db_type != 'postgresql':
+            cursor = self.connection.cursor()
+            cursor.row_factory = models.row_factory(record) if record is not None else self.cursor.row_factory
+            try:
+                cursor.execute(query, params)
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield from rows
+            finally:
+                cursor.close()
+            return
+        connection = self.pool.getconn()
+        cursor = connection.cursor(f"beton_stream_{next(self._stream_ids)}", cursor_factory=self._pg_cursor_factory)
+        cursor.itersize = batch_size
+        try:
+            cursor.execute(query, params)
+            if record is None:
+                yield from cursor
+            else:
+                factory = models.row_factory(record)
+                for row in cursor:
+                    yield factory(cursor, row)
+        finally:
+            try:
+                cursor.close()
+                connection.rollback()
+            finally:
+                self.pool.putconn(connection)
+    
     def insert_data(self, table: str, data: Dict[str, Any]) -> int:
         """Вставка данных в таблицу"""
         try:
             columns = ', '.join(data.keys())
-            placeholders = ', '.join(['?' for _ in data])
+            placeholders = ', '.join([self.placeholder for _ in data])
             query = f"INSERT INTO {table} ({columns}) VALUES ({placeholders})"
             
             with self.get_cursor() as cursor:
+                if self.db_type == 'postgresql':
+                    cursor.execute(query + " RETURNING id", tuple(data.values()))
+                    row = cursor.fetchone()
+                    return row['id'] if isinstance(row, dict) else row[0]
                 cursor.execute(query, tuple(data.values()))
                 return cursor.lastrowid
         except Exception as e:
@@ -161,7 +366,7 @@ class DatabaseManager:
     def update_data(self, table: str, data: Dict[str, Any], condition: str, params: tuple) -> bool:
         """Обновление данных в таблице"""
         try:
-            set_clause = ', '.join([f"{k} = ?" for k in data.keys()])
+            set_clause = ', '.join([f"{k} = {self.placeholder}" for k in data.keys()])
             query = f"UPDATE {table} SET {set_clause} WHERE {condition}"
             
             with self.get_cursor() as cursor:
@@ -195,15 +400,48 @@ class DatabaseManager:
     def fetch_distinct(self, table: str, column: str) -> List[str]:
         """Получение уникальных значений колонки"""
         try:
+            if table == 'constructions' and column in distinct_cache.CACHED_COLUMNS and self.distinct_cache:
+                return self.distinct_cache.get(column)
             query = f"SELECT DISTINCT {column} FROM {table} WHERE {column} IS NOT NULL AND {column} != '' ORDER BY {column}"
             rows = self.execute_query(query)
-            return [r[0] for r in rows]
+            return [r[column] if isinstance(r, dict) else r[0] for r in rows]
         except Exception as e:
             self.logger.error(f"Ошибка получения уникальных значений: {e}")
             raise
     
+    def get_query_stats(self) -> List[Dict[str, Any]]:
+        """Статистика времени выполнения запросов процесса"""
+        return query_stats.stats.snapshot()
+    
+    def get_connection_info(self) -> Dict[str, Any]:
+        """Тип базы данных и параметры подключения (без пароля)"""
+        if self.db_type == 'postgresql':
+            info = {'type': 'PostgreSQL', 'status': 'Connected' if self.pool and not self.pool.closed else 'Closed'}
+            if os.getenv('DATABASE_URL'):
+                info['database'] = os.getenv('DATABASE_URL').rsplit('/', 1)[-1]
+            else:
+                info['host'] = os.getenv('RAILWAY_DB_HOST')
+                info['database'] = os.getenv('RAILWAY_DB_NAME')
+            return info
+        return {
+            'type': 'SQLite',
+            'database': self.db_path,
+            'status': 'Connected' if self.connection else 'Closed',
+        }
+    
+    def test_connection(self) -> bool:
+        """Проверка соединения запросом SELECT 1"""
+        try:
+            return self.execute_single("SELECT 1") is not None
+        except Exception:
+            return False
+    
     def close(self):
         """Закрытие соединения с базой данных"""
+        if self.pool is not None:
+            self.pool.closeall()
+            self.pool = None
+            self.logger.info("Пул соединений PostgreSQL закрыт")
         if self.connection:
             self.connection.close()
             self.logger.info("Соединение с базой данных закрыто")
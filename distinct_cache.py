@@ -0,0 +1,147 @@
+"""
+Кэш уникальных значений справочных колонок конструктивов
+(классы бетона, поставщики, исполнители и т.п.)
+
+Уникальные значения хранятся в небольшой таблице distinct_values со счетчиком
+ссылок и поддерживаются триггерами на constructions при вставке, изменении и
+удалении записей. Поэтому выпадающие списки GUI и клавиатуры бота строятся без
+SELECT DISTINCT по всей таблице конструктивов.
+"""
+
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+
+# Колонки constructions, для которых ведется справочник уникальных значений
+CACHED_COLUMNS = (
+    'concrete_class',
+    'frost_resistance',
+    'water_resistance',
+    'supplier',
+    'executor',
+)
+
+_TRIGGER_INSERT = 'trg_distinct_values_ai'
+_TRIGGER_UPDATE = 'trg_distinct_values_au'
+_TRIGGER_DELETE = 'trg_distinct_values_ad'
+
+
+def _increment_sql(column: str, alias: str) -> str:
+    return (
+        f"INSERT INTO distinct_values (column_name, value, ref_count) "
+        f"SELECT '{column}', {alias}.{column}, 1 "
+        f"WHERE {alias}.{column} IS NOT NULL AND {alias}.{column} != '' "
+        f"ON CONFLICT(column_name, value) DO UPDATE SET ref_count = ref_count + 1;"
+    )
+
+
+def _decrement_sql(column: str, alias: str) -> str:
+    return (
+        f"UPDATE distinct_values SET ref_count = ref_count - 1 "
+        f"WHERE column_name = '{column}' AND value = {alias}.{column};"
+    )
+
+
+_CLEANUP_SQL = "DELETE FROM distinct_values WHERE ref_count <= 0;"
+
+
+def ensure_schema(conn: sqlite3.Connection) -> None:
+    """Создает таблицу справочника и триггеры; при первой установке заполняет справочник"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS distinct_values (
+            column_name TEXT NOT NULL,
+            value TEXT NOT NULL,
+            ref_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (column_name, value)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name = ?",
+        (_TRIGGER_INSERT,)
+    )
+    if cursor.fetchone():
+        return
+
+    # Триггеры создаются вместе с первичным заполнением справочника
+    insert_body = "\n".join(_increment_sql(col, 'NEW') for col in CACHED_COLUMNS)
+    delete_body = "\n".join(_decrement_sql(col, 'OLD') for col in CACHED_COLUMNS)
+    update_body = "\n".join(
+        _decrement_sql(col, 'OLD') + "\n" + _increment_sql(col, 'NEW') for col in CACHED_COLUMNS
+    )
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {_TRIGGER_INSERT} AFTER INSERT ON constructions
+        BEGIN
+        {insert_body}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {_TRIGGER_UPDATE}
+        AFTER UPDATE OF {', '.join(CACHED_COLUMNS)} ON constructions
+        BEGIN
+        {update_body}
+        {_CLEANUP_SQL}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {_TRIGGER_DELETE} AFTER DELETE ON constructions
+        BEGIN
+        {delete_body}
+        {_CLEANUP_SQL}
+        END
+    """)
+    rebuild(conn)
+
+
+def rebuild(conn: sqlite3.Connection) -> None:
+    """Полностью пересчитывает справочник по таблице constructions"""
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM distinct_values")
+    for column in CACHED_COLUMNS:
+        cursor.execute(f"""
+            INSERT INTO distinct_values (column_name, value, ref_count)
+            SELECT '{column}', {column}, COUNT(*) FROM constructions
+            WHERE {column} IS NOT NULL AND {column} != ''
+            GROUP BY {column}
+        """)
+
+
+class DistinctValueCache:
+    """Словарь уникальных значений по колонкам поверх таблицы distinct_values.
+
+    Значения держатся в памяти и сбрасываются, как только в базе что-то
+    изменилось (через это же соединение или из другого процесса/потока).
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self._values: Dict[str, List[str]] = {}
+        self._version: Optional[Tuple[int, int]] = None
+
+    def _current_version(self) -> Tuple[int, int]:
+        # data_version меняется при коммитах других соединений,
+        # total_changes - при изменениях через собственное соединение
+        data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        return self.conn.total_changes, data_version
+
+    def get(self, column: str) -> List[str]:
+        """Возвращает отсортированный список уникальных непустых значений колонки"""
+        if column not in CACHED_COLUMNS:
+            raise ValueError(f"Колонка {column} не входит в справочник уникальных значений")
+        version = self._current_version()
+        if version != self._version:
+            self._values.clear()
+            self._version = version
+        values = self._values.get(column)
+        if values is None:
+            rows = self.conn.execute(
+                "SELECT value FROM distinct_values WHERE column_name = ? ORDER BY value",
+                (column,)
+            ).fetchall()
+            values = [r[0] for r in rows]
+            self._values[column] = values
+        return list(values)
+
+    def invalidate(self) -> None:
+        """Сбрасывает значения в памяти"""
+        self._values.clear()
+        self._version = None
@@ -0,0 +1,73 @@
+"""
+Формирование документов (акт, заявка) по шаблонам Word
+
+Используется и настольным приложением, и Telegram-ботом, и не зависит от GUI.
+"""
+
+import os
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import models
+from lazy_imports import lazy_import
+
+# Шаблоны лежат рядом с кодом приложения
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+ACT_TEMPLATE = 'act_template.docx'
+REQUEST_TEMPLATE = 'request_template.docx'
+
+
+def template_path(template_name: str) -> str:
+    """Полный путь к шаблону документа"""
+    return os.path.join(BASE_DIR, template_name)
+
+
+def fetch_construction(conn, constr_id: int) -> Optional[models.ConstructionDetails]:
+    """Запись контроля вместе с объектом и организацией (None, если не найдена)"""
+    return models.fetchone(conn, 'constructions.document', models.ConstructionDetails, (constr_id,))
+
+
+def build_context(construction_data, doc_type: str) -> Dict[str, Any]:
+    """Контекст шаблона по данным записи контроля (с объектом и организацией)"""
+    def value(key):
+        return construction_data.get(key, '') or ''
+
+    return {
+        'doc_type': doc_type,
+        'current_date': datetime.now().strftime("%d.%m.%Y"),
+        'construction': {
+            'object': value('object_name'),
+            'address': value('address'),
+            'date': value('pour_date'),
+            'element': value('element'),
+            'concrete': value('concrete_class'),
+            'frost': value('frost_resistance'),
+            'water': value('water_resistance'),
+            'supplier': value('supplier'),
+            'passport': value('concrete_passport'),
+            'volume': value('volume_concrete'),
+            'cubes': value('cubes_count'),
+            'cones': value('cones_count'),
+            'slump': value('slump'),
+            'temp': value('temperature'),
+            'temp_measurements': value('temp_measurements'),
+            'act': value('act_number'),
+            'request': value('request_number'),
+            'invoice': value('invoice')
+        },
+        'organization': {
+            'name': value('org_name'),
+            'contact': value('contact'),
+            'phone': value('phone')
+        }
+    }
+
+
+def render_document(template_name: str, context: Dict[str, Any], out_path: str) -> None:
+    """Заполняет шаблон и сохраняет документ в out_path"""
+    # docxtpl тянет lxml и python-docx, грузим только при формировании документа
+    docxtpl = lazy_import('docxtpl')
+    doc = docxtpl.DocxTemplate(template_path(template_name))
+    doc.render(context)
+    doc.save(out_path)
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Локальная имитация Telegram Bot API для проверки бота без интернета
+
+Сервер принимает запросы вида /bot<token>/<method>, запоминает все вызовы
+и отвечает правдоподобными объектами Bot API. Обновления можно отдавать
+боту через getUpdates (режим polling) или отправлять на зарегистрированный
+webhook (режим webhook).
+
+Запуск:
+    python fake_telegram_api.py --port 8081
+    TELEGRAM_API_BASE_URL=http://127.0.0.1:8081/bot python run_service.py
+"""
+
+import argparse
+import email
+import email.policy
+import itertools
+import json
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qsl
+
+BOT_USER = {'id': 1000000001, 'is_bot': True, 'first_name': 'Beton', 'username': 'beton_control_bot'}
+
+
+def _parse_params(content_type: str, body: bytes) -> Dict[str, Any]:
+    """Разбирает параметры запроса (JSON, urlencoded или multipart)"""
+    if not body:
+        return {}
+    if content_type.startswith('application/json'):
+        return json.loads(body)
+    if content_type.startswith('multipart/form-data'):
+        message = email.message_from_bytes(
+            b'Content-Type: ' + content_type.encode() + b'\r\n\r\n' + body,
+            policy=email.policy.HTTP
+        )
+        params = {}
+        for part in message.iter_parts():
+            name = part.get_param('name', header='content-disposition')
+            filename = part.get_filename()
+            payload = part.get_payload(decode=True) or b''
+            params[name] = {'filename': filename, 'size': len(payload)} if filename else payload.decode()
+        return params
+    return dict(parse_qsl(body.decode()))
+
+
+def _json_param(value: Any) -> Any:
+    # PTB передает вложенные объекты (reply_markup и т.п.) JSON-строкой
+    if isinstance(value, str) and value[:1] in ('{', '['):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+
+class FakeTelegramAPI:
+    """HTTP-сервер, изображающий Bot API"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        self.calls: List[Dict[str, Any]] = []
+        self.webhook: Optional[Dict[str, Any]] = None
+        self._updates: List[Dict[str, Any]] = []
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self._callback_ids = itertools.count(1)
+        self._cond = threading.Condition()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------- запуск ----------
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    @property
+    def base_url(self) -> str:
+        """Значение для TELEGRAM_API_BASE_URL / ApplicationBuilder.base_url"""
+        return f"http://{self._server.server_address[0]}:{self.port}/bot"
+
+    def start(self) -> 'FakeTelegramAPI':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        with self._cond:
+            self._cond.notify_all()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    # ---------- обновления для бота ----------
+    def _chat(self, user_id: int) -> Dict[str, Any]:
+        return {'id': user_id, 'type': 'private', 'first_name': f'user{user_id}'}
+
+    def _user(self, user_id: int) -> Dict[str, Any]:
+        return {'id': user_id, 'is_bot': False, 'first_name': f'user{user_id}'}
+
+    def message_update(self, user_id: int, text: str) -> Dict[str, Any]:
+        """Обновление с текстовым сообщением (команды размечаются как bot_command)"""
+        message = {
+            'message_id': next(self._message_ids),
+            'date': int(time.time()),
+            'chat': self._chat(user_id),
+            'from': self._user(user_id),
+            'text': text,
+        }
+        if text.startswith('/'):
+            message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}]
+        return {'update_id': next(self._update_ids), 'message': message}
+
+    def callback_update(self, user_id: int, data: str, message_id: int = 1) -> Dict[str, Any]:
+        """Обновление с нажатием inline-кнопки"""
+        return {
+            'update_id': next(self._update_ids),
+            'callback_query': {
+                'id': str(next(self._callback_ids)),
+                'from': self._user(user_id),
+                'chat_instance': str(user_id),
+                'data': data,
+                'message': {
+                    'message_id': message_id,
+                    'date': int(time.time()),
+                    'chat': self._chat(user_id),
+                    'from': BOT_USER,
+                    'text': '...',
+                },
+            },
+        }
+
+    def push_update(self, update: Dict[str, Any]) -> None:
+        """Кладет обновление в очередь getUpdates"""
+        with self._cond:
+            self._updates.append(update)
+            self._cond.notify_all()
+
+    def deliver_webhook(self, update: Dict[str, Any], timeout: float = 10) -> int:
+        """Отправляет обновление на зарегистрированный webhook, возвращает HTTP-статус"""
+        if not self.webhook:
+            raise RuntimeError("Webhook не зарегистрирован")
+        request = urllib.request.Request(
+            self.webhook['url'],
+            data=json.dumps(update).encode(),
+            headers={'Content-Type': 'application/json'},
+        )
+        if self.webhook.get('secret_token'):
+            request.add_header('X-Telegram-Bot-Api-Secret-Token', self.webhook['secret_token'])
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status
+
+    def calls_for(self, method: str, chat_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Вызовы метода Bot API (при необходимости - только для одного чата)"""
+        with self._cond:
+            calls = list(self.calls)
+        return [
+            c for c in calls
+            if c['method'] == method and (chat_id is None or str(c['params'].get('chat_id')) == str(chat_id))
+        ]
+
+    # ---------- методы Bot API ----------
+    def _sent_message(self, params: Dict[str, Any], **extra) -> Dict[str, Any]:
+        chat_id = int(params.get('chat_id', 0))
+        message = {
+            'message_id': next(self._message_ids),
+            'date': int(time.time()),
+            'chat': self._chat(chat_id),
+            'from': BOT_USER,
+        }
+        message.update(extra)
+        return message
+
+    def _get_updates(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        offset = int(params.get('offset') or 0)
+        timeout = min(float(params.get('timeout') or 0), 5.0)
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            # Подтвержденные (offset) обновления больше не отдаем
+            self._updates = [u for u in self._updates if u['update_id'] >= offset]
+            while not self._updates and time.monotonic() < deadline:
+                self._cond.wait(deadline - time.monotonic())
+            return list(self._updates[:100])
+
+    def dispatch(self, method: str, params: Dict[str, Any]) -> Any:
+        with self._cond:
+            self.calls.append({'method': method, 'params': params, 'time': time.time()})
+        if method == 'getMe':
+            return BOT_USER
+        if method == 'getUpdates':
+            return self._get_updates(params)
+        if method == 'setWebhook':
+            self.webhook = {'url': params.get('url'), 'secret_token': params.get('secret_token')}
+            return True
+        if method == 'deleteWebhook':
+            self.webhook = None
+            return True
+        if method == 'getWebhookInfo':
+            return {'url': (self.webhook or {}).get('url', ''), 'has_custom_certificate': False,
+                    'pending_update_count': 0}
+        if method in ('sendMessage', 'editMessageText'):
+            if method == 'editMessageText' and 'inline_message_id' in params:
+                return True
+            return self._sent_message(params, text=params.get('text', ''),
+                                      **({'reply_markup': params['reply_markup']} if 'reply_markup' in params else {}))
+        if method == 'sendDocument':
+            document = params.get('document') or {}
+            filename = document.get('filename') if isinstance(document, dict) else None
+            return self._sent_message(params, document={
+                'file_id': f'doc{next(self._message_ids)}', 'file_unique_id': 'u', 'file_name': filename or 'file'
+            })
+        return True
+
+    def _handler_class(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self._handle()
+
+            def do_GET(self):
+                self._handle()
+
+            def _handle(self):
+                # Путь: /bot<token>/<method>
+                parts = self.path.split('?')[0].strip('/').split('/')
+                if len(parts) != 2 or not parts[0].startswith('bot'):
+                    self.send_error(404)
+                    return
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                try:
+                    raw = _parse_params(self.headers.get('Content-Type', ''), body)
+                    params = {k: _json_param(v) for k, v in raw.items()}
+                    payload = {'ok': True, 'result': api.dispatch(parts[1], params)}
+                except Exception as e:
+                    payload = {'ok': False, 'error_code': 400, 'description': f'Bad Request: {e}'}
+                data = json.dumps(payload, ensure_ascii=False).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    """Запуск имитации Bot API из командной строки"""
+    parser = argparse.ArgumentParser(description="Локальная имитация Telegram Bot API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    args = parser.parse_args()
+
+    api = FakeTelegramAPI(args.host, args.port)
+    print(f"🧪 Fake Bot API: {api.base_url}")
+    print("   Укажите TELEGRAM_API_BASE_URL с этим адресом и запустите бота")
+    try:
+        api._server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n⚠️ Остановлено пользователем")
+    finally:
+        api._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
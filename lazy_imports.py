@@ -0,0 +1,45 @@
+"""
+Отложенный импорт тяжелых модулей
+
+telegram, docxtpl и openpyxl нужны только по нажатию кнопок, поэтому
+загружаются при первом обращении, а не при старте окна. Время каждого
+такого импорта запоминается; при BETON_IMPORT_REPORT=1 оно печатается
+сразу и сводкой при выходе из приложения.
+"""
+
+import importlib
+import os
+import sys
+import time
+from types import ModuleType
+from typing import Dict
+
+# Имя модуля -> время первого импорта в секундах
+IMPORT_TIMES: Dict[str, float] = {}
+
+
+def report_enabled() -> bool:
+    return os.getenv('BETON_IMPORT_REPORT', '') not in ('', '0')
+
+
+def lazy_import(name: str) -> ModuleType:
+    """Импортирует модуль при первом обращении и запоминает время импорта"""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    IMPORT_TIMES[name] = time.perf_counter() - start
+    if report_enabled():
+        print(f"⏱️ Импорт {name}: {IMPORT_TIMES[name] * 1000:.0f} мс")
+    return module
+
+
+def import_report() -> str:
+    """Сводка по отложенным импортам, от самого долгого"""
+    if not IMPORT_TIMES:
+        return "Отложенные модули не загружались"
+    lines = ["Отложенные импорты:"]
+    for name, seconds in sorted(IMPORT_TIMES.items(), key=lambda item: item[1], reverse=True):
+        lines.append(f"  {name:<20} {seconds * 1000:8.0f} мс")
+    return "\n".join(lines)
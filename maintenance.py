@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Обслуживание базы SQLite: статистика планировщика, освобождение места,
+проверка целостности
+
+Запускается по расписанию (scheduler.py, BETON_MAINTENANCE_HOURS) и только
+в простое: если файл базы менялся последние BETON_MAINTENANCE_IDLE секунд,
+обслуживание откладывается до следующего запуска. Шаги:
+
+- обрезка журнала изменений, если его не забирает синхронизация
+  (change_log.trim);
+- ANALYZE с analysis_limit (свежая статистика планировщика);
+- incremental_vacuum: возвращает системе страницы, освободившиеся после
+  удалений (один раз база переводится в auto_vacuum=INCREMENTAL полным VACUUM);
+- PRAGMA quick_check.
+
+Время каждого шага пишется в лог. Вручную: python maintenance.py [--db ...]
+"""
+
+import argparse
+import logging
+import os
+import sqlite3
+import time
+from typing import Dict, Optional
+
+import change_log
+
+# Сколько секунд без записей считается простоем
+DEFAULT_IDLE_SECONDS = 600
+# Ожидание блокировки: в простое ее быть не должно, долго не ждем
+BUSY_TIMEOUT = 5
+# Строк на индекс, которые ANALYZE просматривает для статистики
+ANALYSIS_LIMIT = 1000
+
+# auto_vacuum: 0 - NONE, 1 - FULL, 2 - INCREMENTAL
+_AUTO_VACUUM_INCREMENTAL = 2
+
+logger = logging.getLogger(__name__)
+
+
+def last_write_age(db_path: str) -> float:
+    """Секунд с последней записи в файл базы (или в его WAL)"""
+    mtimes = [os.path.getmtime(path) for path in (db_path, db_path + '-wal') if os.path.exists(path)]
+    return time.time() - max(mtimes) if mtimes else float('inf')
+
+
+def is_idle(db_path: str, idle_seconds: Optional[float] = None) -> bool:
+    idle_seconds = idle_seconds if idle_seconds is not None else float(
+        os.getenv('BETON_MAINTENANCE_IDLE', DEFAULT_IDLE_SECONDS))
+    return last_write_age(db_path) >= idle_seconds
+
+
+def optimize(conn: sqlite3.Connection) -> None:
+    """Статистика для планировщика запросов"""
+    # PRAGMA optimize анализирует только таблицы, которые читало это же
+    # соединение, а обслуживание всегда открывает новое. Поэтому каждый раз
+    # ANALYZE, но с analysis_limit: проход по индексам ограничен и быстрый.
+    conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+    conn.execute("ANALYZE")
+
+
+def incremental_vacuum(conn: sqlite3.Connection) -> int:
+    """Освобождает пустые страницы, возвращает их число"""
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != _AUTO_VACUUM_INCREMENTAL:
+        # Режим auto_vacuum меняется только полным VACUUM (один раз)
+        logger.info("Перевод базы в auto_vacuum=INCREMENTAL (полный VACUUM)")
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        return 0
+    free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    if free_pages:
+        # execute освобождает одну страницу за шаг и останавливается, executescript - все
+        conn.executescript("PRAGMA incremental_vacuum")
+    return free_pages
+
+
+def quick_check(conn: sqlite3.Connection) -> bool:
+    """Быстрая проверка целостности; ошибки пишутся в лог"""
+    rows = [row[0] for row in conn.execute("PRAGMA quick_check").fetchall()]
+    if rows == ['ok']:
+        return True
+    for problem in rows:
+        logger.error(f"quick_check: {problem}")
+    return False
+
+
+def run_maintenance(db_path: str, force: bool = False, idle_seconds: Optional[float] = None) -> Dict[str, float]:
+    """Выполняет обслуживание в простое; возвращает время шагов в секундах.
+
+    Пустой словарь - база не простаивает или обслуживание прервано
+    блокировкой (даже если часть шагов успела выполниться): его надо повторить.
+    """
+    if not force and not is_idle(db_path, idle_seconds):
+        logger.info(f"Обслуживание {db_path} отложено: база не простаивает")
+        return {}
+    timings: Dict[str, float] = {}
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT, isolation_level=None)
+    try:
+        # Журнал обрезается первым: освободившееся место вернет incremental_vacuum
+        for name, step in (('change_log', change_log.trim), ('optimize', optimize),
+                           ('incremental_vacuum', incremental_vacuum), ('quick_check', quick_check)):
+            started = time.perf_counter()
+            result = step(conn)
+            timings[name] = time.perf_counter() - started
+            logger.info(f"Обслуживание {db_path}: {name} за {timings[name] * 1000:.0f} мс"
+                        + (f" ({result})" if result is not None else ""))
+    except sqlite3.OperationalError as e:
+        # Кто-то начал писать: доделаем в следующий раз
+        logger.warning(f"Обслуживание {db_path} прервано: {e}")
+        return {}
+    finally:
+        conn.close()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Обслуживание базы SQLite")
+    parser.add_argument('--db', default=os.getenv('RAILWAY_DB_PATH', 'concrete.db'), help="Файл базы")
+    parser.add_argument('--force', action='store_true', help="Не ждать простоя")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    timings = run_maintenance(args.db, force=args.force)
+    if not timings:
+        print("⚠️ База не простаивает, обслуживание отложено (--force - выполнить сейчас)")
+        return
+    print(f"✅ Обслуживание выполнено за {sum(timings.values()):.2f} с")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,23 +3,208 @@
 Скрипт миграции данных из SQLite в PostgreSQL Railway
 """
 
+import argparse
+import hashlib
 import os
-import sqlite3
+import queue
+import threading
+from collections import OrderedDict
+from decimal import Decimal, ROUND_HALF_UP
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import execute_values
 from dotenv import load_dotenv
 import logging
-from typing import List, Dict, Any
-import sys
+from typing import List, Dict, Optional, Tuple
+import time
+
+import query_stats
+from database_manager import POSTGRES_TABLES
 
 # Загружаем переменные окружения
 load_dotenv()
 
+# Переносимые таблицы: имя, колонки (id сохраняется), условие отбора строк с существующим родителем
+TABLES = [
+    ('organizations', ['id', 'name', 'contact', 'phone'], None),
+    ('objects', ['id', 'org_id', 'name', 'address'], "org_id IN (SELECT id FROM organizations)"),
+    ('constructions', [
+        'id', 'object_id', 'pour_date', 'element', 'concrete_class', 'frost_resistance',
+        'water_resistance', 'supplier', 'concrete_passport', 'volume_concrete',
+        'cubes_count', 'cones_count', 'slump', 'temperature', 'temp_measurements',
+        'executor', 'act_number', 'request_number', 'invoice'
+    ], "object_id IN (SELECT o.id FROM objects o JOIN organizations org ON org.id = o.org_id)"),
+]
+
+TABLE_COLUMNS = {table: columns for table, columns, _ in TABLES}
+
+# Ссылка на родителя при построчном переносе (id родителя берется из migration_id_map)
+PARENTS = {'objects': 'org_id', 'constructions': 'object_id'}
+PARENT_TABLES = {'objects': 'organizations', 'constructions': 'objects'}
+
+# Состояние возобновляемой миграции в PostgreSQL
+MIGRATION_STATE_SCRIPTS = [
+    """CREATE TABLE IF NOT EXISTS migration_checkpoint (
+        table_name VARCHAR(64) PRIMARY KEY,
+        last_source_id INTEGER NOT NULL DEFAULT 0,
+        migrated_rows BIGINT NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP NOT NULL DEFAULT now()
+    )""",
+    """CREATE TABLE IF NOT EXISTS migration_id_map (
+        table_name VARCHAR(64) NOT NULL,
+        source_id INTEGER NOT NULL,
+        target_id INTEGER NOT NULL,
+        PRIMARY KEY (table_name, source_id)
+    )""",
+]
+
+DEFAULT_CHUNK_SIZE = 5000
+DEFAULT_WORKERS = 2
+PAGE_SIZE = 1000
+
+# Сверка контрольных сумм: ширина диапазона id и размер диапазона, сверяемого построчно
+VERIFY_RANGE = 10000
+VERIFY_LEAF = 32
+
+# Числовые колонки: в SQLite в них бывают пустые строки из GUI
+NUMERIC_COLUMNS = {'volume_concrete': float, 'cubes_count': int, 'cones_count': int, 'temp_measurements': int}
+
+_COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def _copy_value(value) -> str:
+    """Значение в текстовом формате COPY (NULL - \\N)"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, str):
+        return value.translate(_COPY_ESCAPES)
+    return str(value)
+
+
+def _numeric(value, kind):
+    if value is None or isinstance(value, (int, float)):
+        return value
+    text = str(value).strip().replace(',', '.')
+    if not text:
+        return None
+    try:
+        return kind(float(text))
+    except ValueError:
+        return None
+
+
+def _normalize(value, kind=None) -> str:
+    """Значение в том виде, в каком его вернет ::text в PostgreSQL"""
+    if kind is not None:
+        value = _numeric(value, kind)
+    if value is None:
+        return '\\N'
+    if kind is float:
+        # DECIMAL(10,2) округляет половину от нуля
+        return str(Decimal(repr(float(value))).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP))
+    if kind is int:
+        return str(int(value))
+    return str(value)
+
+
+def _digest(row_texts: List[str]) -> Optional[str]:
+    """md5 от склеенных md5 строк, как md5(string_agg(md5(...), '')) в PostgreSQL"""
+    if not row_texts:
+        return None
+    joined = ''.join(hashlib.md5(text.encode('utf-8')).hexdigest() for text in row_texts)
+    return hashlib.md5(joined.encode('utf-8')).hexdigest()
+
+
+class CopyStream:
+    """Файлоподобный поток строк для COPY FROM STDIN, читающий SQLite порциями"""
+
+    def __init__(self, cursor, columns: List[str], fetch_size: int = 10000):
+        self.cursor = cursor
+        self.fetch_size = fetch_size
+        self.converters = [
+            (i, NUMERIC_COLUMNS[col]) for i, col in enumerate(columns) if col in NUMERIC_COLUMNS
+        ]
+        self.rows = 0
+        self._buffer = ''
+        self._done = False
+
+    def _fill(self) -> None:
+        batch = self.cursor.fetchmany(self.fetch_size)
+        if not batch:
+            self._done = True
+            return
+        lines = []
+        for row in batch:
+            if self.converters:
+                row = list(row)
+                for i, kind in self.converters:
+                    row[i] = _numeric(row[i], kind)
+            lines.append('\t'.join(_copy_value(v) for v in row))
+        self.rows += len(batch)
+        self._buffer += '\n'.join(lines) + '\n'
+
+    def read(self, size: int = -1) -> str:
+        while not self._done and (size < 0 or len(self._buffer) < size):
+            self._fill()
+        if size < 0:
+            size = len(self._buffer)
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+    def readline(self, size: int = -1) -> str:
+        return self.read(size)
+
+
+class _TableProgress:
+    """Порции таблицы в конвейере: контрольная точка и признак завершения.
+
+    Порции фиксируются в произвольном порядке, поэтому контрольной точкой
+    служит последний id самой длинной фиксированной подряд последовательности.
+    """
+
+    def __init__(self, start_id: int):
+        self.lock = threading.Lock()
+        self.low_water = start_id
+        self.rows = 0
+        self.skipped = 0
+        self.done = threading.Event()
+        self._chunks: 'OrderedDict[int, bool]' = OrderedDict()
+        self._read_done = False
+
+    def add(self, last_id: int) -> None:
+        with self.lock:
+            self._chunks[last_id] = False
+
+    def finish_reading(self) -> None:
+        with self.lock:
+            self._read_done = True
+            self._check_done()
+
+    def commit(self, last_id: int, rows: int, skipped: int) -> int:
+        with self.lock:
+            self._chunks[last_id] = True
+            while self._chunks and next(iter(self._chunks.values())):
+                self.low_water = self._chunks.popitem(last=False)[0]
+            self.rows += rows
+            self.skipped += skipped
+            self._check_done()
+            return self.low_water
+
+    def _check_done(self) -> None:
+        if self._read_done and not self._chunks:
+            self.done.set()
+
+
 class DataMigrator:
     """Класс для миграции данных из SQLite в PostgreSQL"""
     
-    def __init__(self):
+    def __init__(self, sqlite_path: str = 'concrete.db', chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 max_retries: int = 5, workers: int = DEFAULT_WORKERS):
         self.setup_logging()
+        self.sqlite_path = sqlite_path
+        self.chunk_size = chunk_size
+        self.max_retries = max_retries
+        # Потоки записи конвейерной миграции (0 - последовательный перенос)
+        self.workers = workers
         self.sqlite_conn = None
         self.postgres_conn = None
         
@@ -34,34 +219,38 @@ class DataMigrator:
     def connect_sqlite(self):
         """Подключение к SQLite базе данных"""
         try:
-            if not os.path.exists('concrete.db'):
-                self.logger.error("Файл concrete.db не найден")
+            if not os.path.exists(self.sqlite_path):
+                self.logger.error(f"Файл {self.sqlite_path} не найден")
                 return False
             
-            self.sqlite_conn = sqlite3.connect('concrete.db')
+            self.sqlite_conn = query_stats.connect(self.sqlite_path)
             self.logger.info("Подключение к SQLite успешно")
             return True
         except Exception as e:
             self.logger.error(f"Ошибка подключения к SQLite: {e}")
             return False
     
+    def open_postgresql(self):
+        """Новое соединение с PostgreSQL (DATABASE_URL или отдельные параметры)"""
+        database_url = os.getenv('DATABASE_URL')
+        if database_url:
+            return psycopg2.connect(database_url, **query_stats.pg_connect_kwargs())
+        return psycopg2.connect(
+            host=os.getenv('RAILWAY_DB_HOST'),
+            port=os.getenv('RAILWAY_DB_PORT', 5432),
+            database=os.getenv('RAILWAY_DB_NAME'),
+            user=os.getenv('RAILWAY_DB_USER'),
+            password=os.getenv('RAILWAY_DB_PASSWORD'),
+            **query_stats.pg_connect_kwargs()
+        )
+
     def connect_postgresql(self):
         """Подключение к PostgreSQL Railway"""
         try:
-            # Пробуем подключиться через DATABASE_URL
-            database_url = os.getenv('DATABASE_URL')
-            if database_url:
-                self.postgres_conn = psycopg2.connect(database_url)
+            self.postgres_conn = self.open_postgresql()
+            if os.getenv('DATABASE_URL'):
                 self.logger.info("Подключение к PostgreSQL через DATABASE_URL успешно")
             else:
-                # Пробуем подключиться через отдельные параметры
-                self.postgres_conn = psycopg2.connect(
-                    host=os.getenv('RAILWAY_DB_HOST'),
-                    port=os.getenv('RAILWAY_DB_PORT', 5432),
-                    database=os.getenv('RAILWAY_DB_NAME'),
-                    user=os.getenv('RAILWAY_DB_USER'),
-                    password=os.getenv('RAILWAY_DB_PASSWORD')
-                )
                 self.logger.info("Подключение к PostgreSQL через параметры успешно")
             
             return True
@@ -71,44 +260,8 @@ class DataMigrator:
     
     def create_tables_postgresql(self):
         """Создание таблиц в PostgreSQL"""
-        scripts = [
-            """CREATE TABLE IF NOT EXISTS organizations (
-                id SERIAL PRIMARY KEY,
-                name VARCHAR(255) NOT NULL UNIQUE,
-                contact VARCHAR(255),
-                phone VARCHAR(50)
-            )""",
-            """CREATE TABLE IF NOT EXISTS objects (
-                id SERIAL PRIMARY KEY,
-                org_id INTEGER NOT NULL REFERENCES organizations(id) ON DELETE CASCADE,
-                name VARCHAR(255) NOT NULL,
-                address TEXT
-            )""",
-            """CREATE TABLE IF NOT EXISTS constructions (
-                id SERIAL PRIMARY KEY,
-                object_id INTEGER NOT NULL REFERENCES objects(id) ON DELETE CASCADE,
-                pour_date VARCHAR(20),
-                element TEXT,
-                concrete_class VARCHAR(50),
-                frost_resistance VARCHAR(20),
-                water_resistance VARCHAR(20),
-                supplier VARCHAR(255),
-                concrete_passport VARCHAR(255),
-                volume_concrete DECIMAL(10,2),
-                cubes_count INTEGER,
-                cones_count INTEGER,
-                slump VARCHAR(50),
-                temperature VARCHAR(50),
-                temp_measurements INTEGER,
-                executor VARCHAR(255),
-                act_number VARCHAR(100),
-                request_number VARCHAR(100),
-                invoice VARCHAR(100)
-            )"""
-        ]
-        
         cursor = self.postgres_conn.cursor()
-        for script in scripts:
+        for script in POSTGRES_TABLES:
             try:
                 cursor.execute(script)
                 self.logger.info("Таблица создана успешно")
@@ -130,128 +283,393 @@ class DataMigrator:
         self.postgres_conn.commit()
         cursor.close()
     
-    def migrate_organizations(self) -> Dict[int, int]:
-        """Миграция организаций"""
-        self.logger.info("Начинаем миграцию организаций...")
-        
-        cursor_sqlite = self.sqlite_conn.cursor()
-        cursor_postgres = self.postgres_conn.cursor()
-        
-        # Получаем данные из SQLite
-        cursor_sqlite.execute("SELECT id, name, contact, phone FROM organizations")
-        organizations = cursor_sqlite.fetchall()
-        
-        id_mapping = {}  # Старый ID -> Новый ID
-        
-        for old_id, name, contact, phone in organizations:
-            try:
-                cursor_postgres.execute(
-                    "INSERT INTO organizations (name, contact, phone) VALUES (%s, %s, %s) RETURNING id",
-                    (name, contact, phone)
-                )
-                new_id = cursor_postgres.fetchone()[0]
-                id_mapping[old_id] = new_id
-                self.logger.info(f"Организация '{name}' мигрирована (ID: {old_id} -> {new_id})")
-            except Exception as e:
-                self.logger.error(f"Ошибка миграции организации '{name}': {e}")
-        
+    def create_migration_state(self):
+        """Таблицы контрольных точек и соответствия id для возобновляемой миграции"""
+        cursor = self.postgres_conn.cursor()
+        for script in MIGRATION_STATE_SCRIPTS:
+            cursor.execute(script)
         self.postgres_conn.commit()
-        cursor_sqlite.close()
+        cursor.close()
+
+    def _load_checkpoint(self, cursor_postgres, table: str) -> int:
+        cursor_postgres.execute(
+            "SELECT last_source_id FROM migration_checkpoint WHERE table_name = %s", (table,)
+        )
+        row = cursor_postgres.fetchone()
+        return row[0] if row else 0
+
+    def _save_checkpoint(self, cursor_postgres, table: str, last_id: int, rows: int):
+        cursor_postgres.execute("""
+            INSERT INTO migration_checkpoint (table_name, last_source_id, migrated_rows, updated_at)
+            VALUES (%s, %s, %s, now())
+            ON CONFLICT (table_name) DO UPDATE SET
+                last_source_id = GREATEST(migration_checkpoint.last_source_id, EXCLUDED.last_source_id),
+                migrated_rows = migration_checkpoint.migrated_rows + EXCLUDED.migrated_rows,
+                updated_at = now()
+        """, (table, last_id, rows))
+
+    def load_id_mapping(self, table: str) -> Dict[int, int]:
+        """Соответствие id SQLite -> id PostgreSQL из migration_id_map"""
+        cursor_postgres = self.postgres_conn.cursor()
+        cursor_postgres.execute(
+            "SELECT source_id, target_id FROM migration_id_map WHERE table_name = %s", (table,)
+        )
+        mapping = dict(cursor_postgres.fetchall())
         cursor_postgres.close()
-        
-        self.logger.info(f"Мигрировано организаций: {len(id_mapping)}")
-        return id_mapping
+        return mapping
+
+    def migrate_organizations(self) -> Dict[int, int]:
+        """Миграция организаций"""
+        self._migrate_chunked('organizations')
+        return self.load_id_mapping('organizations')
     
     def migrate_objects(self, org_id_mapping: Dict[int, int]) -> Dict[int, int]:
         """Миграция объектов"""
-        self.logger.info("Начинаем миграцию объектов...")
-        
-        cursor_sqlite = self.sqlite_conn.cursor()
-        cursor_postgres = self.postgres_conn.cursor()
-        
-        # Получаем данные из SQLite
-        cursor_sqlite.execute("SELECT id, org_id, name, address FROM objects")
-        objects = cursor_sqlite.fetchall()
-        
-        id_mapping = {}  # Старый ID -> Новый ID
-        
-        for old_id, old_org_id, name, address in objects:
-            if old_org_id in org_id_mapping:
-                new_org_id = org_id_mapping[old_org_id]
-                try:
-                    cursor_postgres.execute(
-                        "INSERT INTO objects (org_id, name, address) VALUES (%s, %s, %s) RETURNING id",
-                        (new_org_id, name, address)
-                    )
-                    new_id = cursor_postgres.fetchone()[0]
-                    id_mapping[old_id] = new_id
-                    self.logger.info(f"Объект '{name}' мигрирован (ID: {old_id} -> {new_id})")
-                except Exception as e:
-                    self.logger.error(f"Ошибка миграции объекта '{name}': {e}")
-            else:
-                self.logger.warning(f"Пропускаем объект '{name}' - организация не найдена")
-        
-        self.postgres_conn.commit()
-        cursor_sqlite.close()
-        cursor_postgres.close()
-        
-        self.logger.info(f"Мигрировано объектов: {len(id_mapping)}")
-        return id_mapping
+        self._migrate_chunked('objects', org_id_mapping)
+        return self.load_id_mapping('objects')
     
     def migrate_constructions(self, obj_id_mapping: Dict[int, int]):
         """Миграция конструктивов"""
-        self.logger.info("Начинаем миграцию конструктивов...")
-        
+        self._migrate_chunked('constructions', obj_id_mapping)
+
+    def _migrate_chunked(self, table: str, parent_mapping: Optional[Dict[int, int]] = None) -> int:
+        """Перенос таблицы порциями по возрастанию id.
+
+        Каждая порция (строки, их id в migration_id_map и контрольная точка)
+        фиксируется одной транзакцией, поэтому после обрыва перенос
+        продолжается с последней зафиксированной порции, а повторный запуск
+        переносит только новые строки.
+        """
+        columns = TABLE_COLUMNS[table]
+        parent_index = columns.index(PARENTS[table]) if table in PARENTS else None
+        converters = [(i, NUMERIC_COLUMNS[col]) for i, col in enumerate(columns) if col in NUMERIC_COLUMNS]
+
         cursor_sqlite = self.sqlite_conn.cursor()
         cursor_postgres = self.postgres_conn.cursor()
-        
-        # Получаем данные из SQLite
-        cursor_sqlite.execute("""
-            SELECT object_id, pour_date, element, concrete_class, frost_resistance, 
-                   water_resistance, supplier, concrete_passport, volume_concrete, 
-                   cubes_count, cones_count, slump, temperature, temp_measurements, 
-                   executor, act_number, request_number, invoice
-            FROM constructions
-        """)
-        constructions = cursor_sqlite.fetchall()
-        
-        migrated_count = 0
-        
-        for (old_obj_id, pour_date, element, concrete_class, frost_resistance,
-             water_resistance, supplier, concrete_passport, volume_concrete,
-             cubes_count, cones_count, slump, temperature, temp_measurements,
-             executor, act_number, request_number, invoice) in constructions:
-            
-            if old_obj_id in obj_id_mapping:
-                new_obj_id = obj_id_mapping[old_obj_id]
+        last_id = self._load_checkpoint(cursor_postgres, table)
+        if last_id:
+            self.logger.info(f"{table}: продолжаем с id > {last_id}")
+        else:
+            self.logger.info(f"Начинаем миграцию {table}...")
+
+        migrated = skipped = 0
+        start = time.perf_counter()
+        query = f"SELECT {', '.join(columns)} FROM {table} WHERE id > ? ORDER BY id LIMIT ?"
+        try:
+            while True:
+                cursor_sqlite.execute(query, (last_id, self.chunk_size))
+                rows = cursor_sqlite.fetchall()
+                if not rows:
+                    break
+                source_ids, values = [], []
+                for row in rows:
+                    row = list(row)
+                    if parent_index is not None:
+                        row[parent_index] = parent_mapping.get(row[parent_index])
+                        if row[parent_index] is None:
+                            skipped += 1
+                            continue
+                    for i, kind in converters:
+                        row[i] = _numeric(row[i], kind)
+                    source_ids.append(row[0])
+                    values.append(row[1:])
+
+                if values:
+                    target_ids = self._insert_chunk(cursor_postgres, table, columns[1:], values)
+                    execute_values(cursor_postgres, """
+                        INSERT INTO migration_id_map (table_name, source_id, target_id) VALUES %s
+                        ON CONFLICT (table_name, source_id) DO UPDATE SET target_id = EXCLUDED.target_id
+                    """, [(table, s, t) for s, t in zip(source_ids, target_ids)], page_size=PAGE_SIZE)
+                last_id = rows[-1][0]
+                self._save_checkpoint(cursor_postgres, table, last_id, len(values))
+                self.postgres_conn.commit()
+                migrated += len(values)
+                self.logger.info(f"{table}: перенесено {migrated} строк (id <= {last_id})")
+        except Exception:
+            self.postgres_conn.rollback()
+            raise
+        finally:
+            cursor_sqlite.close()
+            cursor_postgres.close()
+
+        elapsed = time.perf_counter() - start
+        self.logger.info(f"Мигрировано {table}: {migrated} за {elapsed:.1f} с")
+        if skipped:
+            self.logger.warning(f"{table}: пропущено {skipped} строк без родительской записи")
+        return migrated
+
+    def _insert_chunk(self, cursor_postgres, table: str, columns: List[str], values: List[list]) -> List[int]:
+        """Вставляет порцию строк и возвращает их новые id в том же порядке"""
+        column_list = ', '.join(columns)
+        if table == 'organizations':
+            # Организации уникальны по имени: существующие обновляются, а не дублируются
+            returned = execute_values(cursor_postgres, f"""
+                INSERT INTO organizations ({column_list}) VALUES %s
+                ON CONFLICT (name) DO UPDATE SET contact = EXCLUDED.contact, phone = EXCLUDED.phone
+                RETURNING id, name
+            """, values, page_size=PAGE_SIZE, fetch=True)
+            ids_by_name = {name: new_id for new_id, name in returned}
+            return [ids_by_name[row[0]] for row in values]
+
+        # id выделяются заранее, чтобы соответствие не зависело от порядка RETURNING
+        cursor_postgres.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+            (table, len(values))
+        )
+        target_ids = [row[0] for row in cursor_postgres.fetchall()]
+        execute_values(
+            cursor_postgres,
+            f"INSERT INTO {table} (id, {column_list}) VALUES %s",
+            [[new_id] + row for new_id, row in zip(target_ids, values)],
+            page_size=PAGE_SIZE
+        )
+        return target_ids
+
+    def migrate_pipelined(self):
+        """Конвейерная миграция всех таблиц.
+
+        Поток чтения идет по SQLite порциями и кладет их в ограниченную
+        очередь, потоки записи (self.workers, у каждого свое соединение)
+        переносят порции в PostgreSQL. Чтение, преобразование и запись идут
+        одновременно, а в памяти не больше нескольких порций. Порции
+        потомков ждут, пока полностью перенесены родители.
+        """
+        cursor_postgres = self.postgres_conn.cursor()
+        progress = {
+            table: _TableProgress(self._load_checkpoint(cursor_postgres, table)) for table in TABLE_COLUMNS
+        }
+        cursor_postgres.close()
+        mappings = {table: self.load_id_mapping(table) for table in set(PARENT_TABLES.values())}
+        chunks: queue.Queue = queue.Queue(maxsize=self.workers * 2)
+        stop = threading.Event()
+        errors: List[Exception] = []
+        start = time.perf_counter()
+
+        def put(item) -> bool:
+            while not stop.is_set():
                 try:
-                    cursor_postgres.execute("""
-                        INSERT INTO constructions (
-                            object_id, pour_date, element, concrete_class, frost_resistance,
-                            water_resistance, supplier, concrete_passport, volume_concrete,
-                            cubes_count, cones_count, slump, temperature, temp_measurements,
-                            executor, act_number, request_number, invoice
-                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    """, (
-                        new_obj_id, pour_date, element, concrete_class, frost_resistance,
-                        water_resistance, supplier, concrete_passport, volume_concrete,
-                        cubes_count, cones_count, slump, temperature, temp_measurements,
-                        executor, act_number, request_number, invoice
-                    ))
-                    migrated_count += 1
-                except Exception as e:
-                    self.logger.error(f"Ошибка миграции конструкции: {e}")
-            else:
-                self.logger.warning(f"Пропускаем конструктив - объект не найден")
-        
-        self.postgres_conn.commit()
+                    chunks.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def reader():
+            # Соединения SQLite привязаны к потоку, поэтому у читателя свое
+            conn = query_stats.connect(self.sqlite_path)
+            try:
+                for table, columns, _ in TABLES:
+                    state = progress[table]
+                    if state.low_water:
+                        self.logger.info(f"{table}: продолжаем с id > {state.low_water}")
+                    cursor = conn.execute(
+                        f"SELECT {', '.join(columns)} FROM {table} WHERE id > ? ORDER BY id", (state.low_water,)
+                    )
+                    while True:
+                        rows = cursor.fetchmany(self.chunk_size)
+                        if not rows:
+                            break
+                        state.add(rows[-1][0])
+                        if not put((table, rows)):
+                            return
+                    state.finish_reading()
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+            finally:
+                conn.close()
+                for _ in range(self.workers):
+                    put(None)
+
+        def writer():
+            try:
+                conn = self.open_postgresql()
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+                return
+            try:
+                while not stop.is_set():
+                    try:
+                        item = chunks.get(timeout=0.5)
+                    except queue.Empty:
+                        continue
+                    if item is None:
+                        break
+                    table, rows = item
+                    parent = PARENT_TABLES.get(table)
+                    while parent and not progress[parent].done.wait(0.5):
+                        if stop.is_set():
+                            return
+                    self._write_chunk(conn, table, rows, mappings, progress[table])
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+            finally:
+                conn.close()
+
+        threads = [threading.Thread(target=reader, name='migrate-reader', daemon=True)]
+        threads += [
+            threading.Thread(target=writer, name=f'migrate-writer-{i}', daemon=True) for i in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+
+        elapsed = time.perf_counter() - start
+        for table in TABLE_COLUMNS:
+            state = progress[table]
+            self.logger.info(f"Мигрировано {table}: {state.rows}")
+            if state.skipped:
+                self.logger.warning(f"{table}: пропущено {state.skipped} строк без родительской записи")
+        total = sum(state.rows for state in progress.values())
+        self.logger.info(
+            f"Конвейерная миграция: {total} строк за {elapsed:.1f} с"
+            f" ({total / elapsed if elapsed else 0:.0f} строк/с, потоков записи: {self.workers})"
+        )
+
+    def _write_chunk(self, conn, table: str, rows: List[tuple], mappings: Dict[str, Dict[int, int]],
+                     state: '_TableProgress'):
+        """Записывает порцию в своей транзакции и продвигает контрольную точку"""
+        columns = TABLE_COLUMNS[table]
+        parent_index = columns.index(PARENTS[table]) if table in PARENTS else None
+        parent_mapping = mappings.get(PARENT_TABLES.get(table), {})
+        converters = [(i, NUMERIC_COLUMNS[col]) for i, col in enumerate(columns) if col in NUMERIC_COLUMNS]
+        cursor = conn.cursor()
+        try:
+            # После обрыва контрольная точка может отставать от уже записанных порций
+            cursor.execute(
+                "SELECT source_id FROM migration_id_map WHERE table_name = %s AND source_id BETWEEN %s AND %s",
+                (table, rows[0][0], rows[-1][0])
+            )
+            migrated = {row[0] for row in cursor.fetchall()}
+            source_ids, values, skipped = [], [], 0
+            for row in rows:
+                if row[0] in migrated:
+                    continue
+                row = list(row)
+                if parent_index is not None:
+                    row[parent_index] = parent_mapping.get(row[parent_index])
+                    if row[parent_index] is None:
+                        skipped += 1
+                        continue
+                for i, kind in converters:
+                    row[i] = _numeric(row[i], kind)
+                source_ids.append(row[0])
+                values.append(row[1:])
+
+            target_ids = []
+            if values:
+                target_ids = self._insert_chunk(cursor, table, columns[1:], values)
+                execute_values(cursor, """
+                    INSERT INTO migration_id_map (table_name, source_id, target_id) VALUES %s
+                    ON CONFLICT (table_name, source_id) DO UPDATE SET target_id = EXCLUDED.target_id
+                """, [(table, s, t) for s, t in zip(source_ids, target_ids)], page_size=PAGE_SIZE)
+            conn.commit()
+
+            if table in mappings:
+                mappings[table].update(zip(source_ids, target_ids))
+            low_water = state.commit(rows[-1][0], len(values), skipped)
+            self._save_checkpoint(cursor, table, low_water, len(values))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+        self.logger.info(f"{table}: перенесено {state.rows} строк (id <= {low_water})")
+
+    def migrate_resumable(self):
+        """Построчная миграция с переподключением и продолжением с контрольной точки"""
+        attempt = 0
+        while True:
+            try:
+                if self.postgres_conn is None or self.postgres_conn.closed:
+                    if not self.connect_postgresql():
+                        raise psycopg2.OperationalError("Не удалось переподключиться к PostgreSQL")
+                if self.workers > 0:
+                    self.migrate_pipelined()
+                else:
+                    org_id_mapping = self.migrate_organizations()
+                    obj_id_mapping = self.migrate_objects(org_id_mapping)
+                    self.migrate_constructions(obj_id_mapping)
+                return
+            except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                delay = min(2 ** attempt, 60)
+                self.logger.warning(
+                    f"Соединение с PostgreSQL потеряно ({e}), попытка {attempt}/{self.max_retries} через {delay} с"
+                )
+                try:
+                    self.postgres_conn.close()
+                except Exception:
+                    pass
+                time.sleep(delay)
+    
+    def migrate_bulk(self):
+        """Быстрая миграция через COPY FROM STDIN с сохранением id.
+
+        Строки читаются из SQLite порциями и потоком уходят в PostgreSQL.
+        Целевые таблицы должны быть пустыми; все выполняется одной
+        транзакцией. Контрольные точки и тождественное соответствие id
+        записываются, чтобы следующие запуски переносили только новые строки.
+        """
+        cursor_postgres = self.postgres_conn.cursor()
+        for table, _, _ in TABLES:
+            cursor_postgres.execute(f"SELECT EXISTS (SELECT 1 FROM {table})")
+            if cursor_postgres.fetchone()[0]:
+                raise RuntimeError(f"Таблица {table} в PostgreSQL не пуста, быстрая миграция невозможна")
+
+        try:
+            cursor_postgres.execute("SET LOCAL synchronous_commit = off")
+            for table, columns, condition in TABLES:
+                self._copy_table(cursor_postgres, table, columns, condition)
+            self.postgres_conn.commit()
+        except Exception:
+            self.postgres_conn.rollback()
+            raise
+        finally:
+            cursor_postgres.close()
+
+    def _copy_table(self, cursor_postgres, table: str, columns: List[str], condition: Optional[str]):
+        column_list = ', '.join(columns)
+        where = f" WHERE {condition}" if condition else ""
+        cursor_sqlite = self.sqlite_conn.cursor()
+        cursor_sqlite.execute(f"SELECT COUNT(*), COALESCE(MAX(id), 0) FROM {table}")
+        total, last_id = cursor_sqlite.fetchone()
+
+        start = time.perf_counter()
+        cursor_sqlite.execute(f"SELECT {column_list} FROM {table}{where} ORDER BY id")
+        stream = CopyStream(cursor_sqlite, columns)
+        cursor_postgres.copy_expert(f"COPY {table} ({column_list}) FROM STDIN", stream)
         cursor_sqlite.close()
-        cursor_postgres.close()
-        
-        self.logger.info(f"Мигрировано конструктивов: {migrated_count}")
+        # Последовательность id продолжается после перенесенных записей
+        cursor_postgres.execute(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 1), MAX(id) IS NOT NULL) "
+            f"FROM {table}"
+        )
+        cursor_postgres.execute(
+            f"INSERT INTO migration_id_map (table_name, source_id, target_id) SELECT %s, id, id FROM {table} "
+            "ON CONFLICT (table_name, source_id) DO UPDATE SET target_id = EXCLUDED.target_id",
+            (table,)
+        )
+        self._save_checkpoint(cursor_postgres, table, last_id, stream.rows)
+        elapsed = time.perf_counter() - start
+        skipped = total - stream.rows
+        self.logger.info(
+            f"{table}: перенесено {stream.rows} строк за {elapsed:.1f} с"
+            f" ({stream.rows / elapsed if elapsed else 0:.0f} строк/с)"
+        )
+        if skipped:
+            self.logger.warning(f"{table}: пропущено {skipped} строк без родительской записи")
     
-    def verify_migration(self):
-        """Проверка результатов миграции"""
+    def verify_migration(self) -> bool:
+        """Проверка результатов миграции: количество строк и контрольные суммы"""
         self.logger.info("Проверяем результаты миграции...")
         
         cursor_sqlite = self.sqlite_conn.cursor()
@@ -271,9 +689,155 @@ class DataMigrator:
         
         cursor_sqlite.close()
         cursor_postgres.close()
+
+        differences = self.verify_checksums()
+        for table, diff in differences.items():
+            for kind, title in (('missing', 'нет в PostgreSQL'), ('extra', 'лишние в PostgreSQL'),
+                                ('changed', 'отличаются')):
+                ids = diff[kind]
+                if ids:
+                    shown = ', '.join(map(str, ids[:20])) + (' ...' if len(ids) > 20 else '')
+                    self.logger.error(f"{table}: {title} {len(ids)} строк (id SQLite: {shown})")
+        return not differences
+
+    # ---------- сверка контрольных сумм ----------
+    def verify_checksums(self) -> Dict[str, Dict[str, List[int]]]:
+        """Сверяет содержимое таблиц по контрольным суммам диапазонов id.
+
+        Суммы нормализованных строк считаются на обеих сторонах (в PostgreSQL -
+        запросом, строки не передаются) по диапазонам VERIFY_RANGE id SQLite;
+        несовпавшие диапазоны делятся пополам, пока не останется VERIFY_LEAF
+        строк, которые сравниваются построчно. Строки PostgreSQL сопоставляются
+        через migration_id_map, ссылки на родителя - тоже в id SQLite.
+        Возвращает расхождения по таблицам (пустой словарь - все совпало).
+        """
+        differences = {}
+        cursor_postgres = self.postgres_conn.cursor()
+        try:
+            for table in TABLE_COLUMNS:
+                start = time.perf_counter()
+                sqlite_ranges = self._sqlite_range_digests(table)
+                postgres_ranges = self._postgres_range_digests(cursor_postgres, table)
+                diff = {'missing': [], 'extra': [], 'changed': []}
+                for bucket in sorted(set(sqlite_ranges) | set(postgres_ranges)):
+                    if sqlite_ranges.get(bucket) != postgres_ranges.get(bucket):
+                        lo = bucket * VERIFY_RANGE
+                        self._bisect(cursor_postgres, table, lo, lo + VERIFY_RANGE - 1, diff)
+                elapsed = time.perf_counter() - start
+                if any(diff.values()):
+                    differences[table] = diff
+                    self.logger.warning(f"{table}: контрольные суммы не совпали ({elapsed:.1f} с)")
+                else:
+                    self.logger.info(f"{table}: контрольные суммы совпадают ({elapsed:.1f} с)")
+        finally:
+            cursor_postgres.close()
+        return differences
+
+    def _sqlite_rows(self, table: str, lo: Optional[int] = None, hi: Optional[int] = None):
+        """Нормализованные строки SQLite (id, текст) в порядке id"""
+        columns = TABLE_COLUMNS[table]
+        kinds = [NUMERIC_COLUMNS.get(col) for col in columns]
+        condition = next(cond for name, _, cond in TABLES if name == table)
+        where, params = [], []
+        if condition:
+            where.append(f"({condition})")
+        if lo is not None:
+            where.append("id BETWEEN ? AND ?")
+            params += [lo, hi]
+        sql = f"SELECT {', '.join(columns)} FROM {table}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        cursor = self.sqlite_conn.cursor()
+        cursor.execute(sql + " ORDER BY id", params)
+        for row in cursor:
+            yield row[0], '|'.join(_normalize(value, kind) for value, kind in zip(row, kinds))
+        cursor.close()
+
+    def _sqlite_range_digests(self, table: str, lo: Optional[int] = None,
+                              hi: Optional[int] = None) -> Dict[int, Tuple[int, str]]:
+        ranges: Dict[int, List[str]] = {}
+        for row_id, text in self._sqlite_rows(table, lo, hi):
+            ranges.setdefault(row_id // VERIFY_RANGE, []).append(text)
+        return {bucket: (len(texts), _digest(texts)) for bucket, texts in ranges.items()}
+
+    def _postgres_row_sql(self, table: str) -> Tuple[str, str]:
+        """Выражение нормализованной строки и FROM с сопоставлением id через migration_id_map"""
+        parent_column = PARENTS.get(table)
+        parts = []
+        for column in TABLE_COLUMNS[table]:
+            if column == 'id':
+                expr = 'm.source_id'
+            elif column == parent_column:
+                expr = 'pm.source_id'
+            else:
+                expr = f't.{column}'
+            parts.append(f"coalesce({expr}::text, '\\N')")
+        source = f"FROM migration_id_map m JOIN {table} t ON t.id = m.target_id"
+        if parent_column:
+            source += (
+                f" LEFT JOIN migration_id_map pm ON pm.table_name = '{PARENT_TABLES[table]}'"
+                f" AND pm.target_id = t.{parent_column}"
+            )
+        source += f" WHERE m.table_name = '{table}'"
+        return f"concat_ws('|', {', '.join(parts)})", source
+
+    def _postgres_range_digests(self, cursor_postgres, table: str) -> Dict[int, Tuple[int, str]]:
+        row_sql, source = self._postgres_row_sql(table)
+        cursor_postgres.execute(f"""
+            SELECT m.source_id / %s, count(*), md5(string_agg(md5({row_sql}), '' ORDER BY m.source_id))
+            {source}
+            GROUP BY 1
+        """, (VERIFY_RANGE,))
+        return {bucket: (count, digest) for bucket, count, digest in cursor_postgres.fetchall()}
+
+    def _postgres_range(self, cursor_postgres, table: str, lo: int, hi: int) -> Tuple[int, Optional[str]]:
+        row_sql, source = self._postgres_row_sql(table)
+        cursor_postgres.execute(f"""
+            SELECT count(*), md5(string_agg(md5({row_sql}), '' ORDER BY m.source_id))
+            {source} AND m.source_id BETWEEN %s AND %s
+        """, (lo, hi))
+        count, digest = cursor_postgres.fetchone()
+        return (count, digest) if count else (0, None)
+
+    def _bisect(self, cursor_postgres, table: str, lo: int, hi: int, diff: Dict[str, List[int]]):
+        """Делит несовпавший диапазон пополам до построчного сравнения"""
+        sqlite_texts = dict(self._sqlite_rows(table, lo, hi))
+        postgres_count, postgres_digest = self._postgres_range(cursor_postgres, table, lo, hi)
+        if _digest(list(sqlite_texts.values())) == postgres_digest and len(sqlite_texts) == postgres_count:
+            return
+        if max(len(sqlite_texts), postgres_count) <= VERIFY_LEAF or lo >= hi:
+            row_sql, source = self._postgres_row_sql(table)
+            cursor_postgres.execute(
+                f"SELECT m.source_id, {row_sql} {source} AND m.source_id BETWEEN %s AND %s", (lo, hi)
+            )
+            postgres_texts = dict(cursor_postgres.fetchall())
+            for row_id in sorted(set(sqlite_texts) | set(postgres_texts)):
+                if row_id not in postgres_texts:
+                    diff['missing'].append(row_id)
+                elif row_id not in sqlite_texts:
+                    diff['extra'].append(row_id)
+                elif sqlite_texts[row_id] != postgres_texts[row_id]:
+                    diff['changed'].append(row_id)
+            return
+        middle = (lo + hi) // 2
+        self._bisect(cursor_postgres, table, lo, middle, diff)
+        self._bisect(cursor_postgres, table, middle + 1, hi, diff)
+
+    def run_verification(self) -> bool:
+        """Только сверка уже перенесенных данных"""
+        try:
+            if not self.connect_sqlite() or not self.connect_postgresql():
+                return False
+            self.create_migration_state()
+            return self.verify_migration()
+        except Exception as e:
+            self.logger.error(f"Ошибка проверки: {e}")
+            return False
+        finally:
+            self.close_connections()
     
-    def run_migration(self):
-        """Запуск полной миграции"""
+    def run_migration(self, bulk: bool = False):
+        """Запуск миграции (bulk - через COPY с сохранением id, иначе порциями с контрольными точками)"""
         try:
             # Подключаемся к базам данных
             if not self.connect_sqlite():
@@ -284,16 +848,21 @@ class DataMigrator:
             
             # Создаем таблицы в PostgreSQL
             self.create_tables_postgresql()
+            self.create_migration_state()
             
             # Мигрируем данные
-            org_id_mapping = self.migrate_organizations()
-            obj_id_mapping = self.migrate_objects(org_id_mapping)
-            self.migrate_constructions(obj_id_mapping)
+            if bulk:
+                self.migrate_bulk()
+            else:
+                self.migrate_resumable()
             
             # Проверяем результаты
-            self.verify_migration()
+            if not self.verify_migration():
+                self.logger.error("Перенесенные данные не совпадают с SQLite")
+                return False
             
             self.logger.info("Миграция завершена успешно!")
+            self.logger.info("Время запросов миграции:\n" + query_stats.stats.report())
             return True
             
         except Exception as e:
@@ -314,6 +883,20 @@ class DataMigrator:
 
 def main():
     """Главная функция"""
+    parser = argparse.ArgumentParser(description="Миграция данных из SQLite в PostgreSQL")
+    parser.add_argument('--sqlite', default='concrete.db', help="Путь к базе SQLite")
+    parser.add_argument('--bulk', action='store_true',
+                        help="Быстрая миграция через COPY с сохранением id (целевые таблицы пусты)")
+    parser.add_argument('--verify', action='store_true',
+                        help="Только сверить уже перенесенные данные по контрольным суммам")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="Строк в одной транзакции при построчной миграции")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help="Потоков записи в PostgreSQL (0 - последовательный перенос)")
+    parser.add_argument('--retries', type=int, default=5,
+                        help="Попыток переподключения при обрыве соединения")
+    args = parser.parse_args()
+
     print("=== Миграция данных из SQLite в PostgreSQL Railway ===")
     print()
     
@@ -326,10 +909,14 @@ def main():
         return
     
     # Запускаем миграцию
-    migrator = DataMigrator()
+    migrator = DataMigrator(sqlite_path=args.sqlite, chunk_size=args.chunk_size, max_retries=args.retries,
+                            workers=args.workers)
     
     try:
-        success = migrator.run_migration()
+        if args.verify:
+            success = migrator.run_verification()
+        else:
+            success = migrator.run_migration(bulk=args.bulk)
         if success:
             print("\n✅ Миграция завершена успешно!")
             print("Теперь можете использовать PostgreSQL Railway")
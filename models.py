@@ -0,0 +1,131 @@
+"""
+Типизированные записи строк БД: Organization, Object, Construction
+
+Записи - именованные кортежи без __dict__ (__slots__ = ()), поэтому на строку
+уходит примерно столько же памяти, сколько на обычный кортеж, и в разы
+меньше, чем на словарь. Записи создаются прямо фабрикой строк курсора
+(row_factory), без промежуточных кортежей и dict(zip(columns, row)).
+
+Поля доступны как атрибуты (row.name), по номеру (row[0]) и по имени
+(row['name'], row.get('name')), так что старый код со словарями работает.
+"""
+
+from collections import namedtuple
+from operator import attrgetter
+from typing import Any, Callable, List, Optional, Sequence, Type
+
+import queries
+
+
+class _Record:
+    """Доступ к полям записи по имени, как у словаря"""
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            if key not in self._fields:
+                raise KeyError(key)
+            return getattr(self, key)
+        return super().__getitem__(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in self._fields else default
+
+    def keys(self):
+        return self._fields
+
+
+def _fields(names: str):
+    return namedtuple('_Row', names, defaults=(None,) * len(names.split()))
+
+
+class Organization(_Record, _fields('id name contact phone')):
+    """Организация"""
+    __slots__ = ()
+
+
+class Object(_Record, _fields('id org_id name address')):
+    """Объект организации"""
+    __slots__ = ()
+
+
+class Construction(_Record, _fields(
+        'id object_id pour_date element concrete_class frost_resistance water_resistance '
+        'supplier concrete_passport volume_concrete cubes_count cones_count '
+        'slump temperature temp_measurements executor act_number request_number invoice')):
+    """Запись контроля бетонирования"""
+    __slots__ = ()
+
+
+# Колонки записи контроля в таблице GUI (без id и object_id)
+Construction.DATA_FIELDS = Construction._fields[2:]
+Construction.data_values = property(attrgetter(*Construction.DATA_FIELDS))
+
+
+class ConstructionDetails(_Record, _fields(
+        'pour_date element concrete_class frost_resistance water_resistance '
+        'supplier concrete_passport volume_concrete cubes_count cones_count '
+        'slump temperature temp_measurements act_number request_number invoice '
+        'object_name address org_name contact phone')):
+    """Запись контроля вместе с объектом и организацией (для документов)"""
+    __slots__ = ()
+
+
+def row_factory(cls: Type[_Record]) -> Callable:
+    """Фабрика строк курсора, создающая записи cls.
+
+    Соответствие колонок полям вычисляется один раз на результат запроса
+    (по cursor.description), а не на каждую строку. Колонки, которых нет в
+    записи, пропускаются, недостающие поля получают None. Понимает и строки-
+    словари (RealDictCursor в PostgreSQL).
+    """
+    make = cls._make
+    layout = [None, None]  # description, индексы колонок по полям (None - порядок совпадает)
+
+    def factory(cursor, row):
+        if isinstance(row, dict):
+            row = tuple(row.values())
+        description = cursor.description
+        if description is not layout[0]:
+            columns = [column[0] for column in description]
+            if tuple(columns) == cls._fields:
+                indexes = None
+            else:
+                indexes = [columns.index(field) if field in columns else None for field in cls._fields]
+            layout[0], layout[1] = description, indexes
+        indexes = layout[1]
+        if indexes is None:
+            return make(row)
+        return make([None if i is None else row[i] for i in indexes])
+
+    return factory
+
+
+def records(cursor, rows: Sequence, cls: Type[_Record]) -> List[_Record]:
+    """Уже полученные строки в записи cls"""
+    factory = row_factory(cls)
+    return [factory(cursor, row) for row in rows]
+
+
+def execute(conn_or_cursor, name: str, cls: Type[_Record], params: Sequence[Any] = ()):
+    """Выполняет запрос из реестра queries; курсор SQLite сразу отдает записи cls"""
+    cursor = conn_or_cursor.cursor() if hasattr(conn_or_cursor, 'cursor') else conn_or_cursor
+    if queries.dialect_of(cursor) == 'sqlite':
+        cursor.row_factory = row_factory(cls)
+    return queries.execute(cursor, name, params)
+
+
+def fetchall(conn_or_cursor, name: str, cls: Type[_Record], params: Sequence[Any] = ()) -> List[_Record]:
+    cursor = execute(conn_or_cursor, name, cls, params)
+    rows = cursor.fetchall()
+    if queries.dialect_of(cursor) == 'sqlite':
+        return rows
+    return records(cursor, rows, cls)
+
+
+def fetchone(conn_or_cursor, name: str, cls: Type[_Record], params: Sequence[Any] = ()) -> Optional[_Record]:
+    cursor = execute(conn_or_cursor, name, cls, params)
+    row = cursor.fetchone()
+    if row is None or queries.dialect_of(cursor) == 'sqlite':
+        return row
+    return row_factory(cls)(cursor, row)
@@ -0,0 +1,162 @@
+"""
+Реестр именованных SQL-запросов
+
+Запрос пишется один раз с плейсхолдерами ? и компилируется под диалект при
+первом использовании. В SQLite текст не меняется: sqlite3 держит кэш
+подготовленных выражений на соединение по тексту запроса, поэтому один и тот
+же текст из реестра разбирается только один раз. В PostgreSQL плейсхолдеры
+заменяются на $1..$n, выражение один раз готовится на соединении (PREPARE),
+а дальше выполняется через EXECUTE без повторного разбора и планирования.
+"""
+
+import re
+import sqlite3
+from functools import lru_cache
+from typing import Any, Dict, Optional, Sequence, Set, Tuple
+
+QUERIES: Dict[str, str] = {}
+
+_LITERAL = re.compile(r"('(?:[^']|'')*')")
+
+# Подготовленные выражения по соединениям PostgreSQL: (id, pid) -> имена запросов
+_prepared: Dict[Tuple[int, int], Set[str]] = {}
+
+
+def register(name: str, sql: str) -> None:
+    """Добавляет или заменяет запрос в реестре"""
+    QUERIES[name] = sql
+    compile_query.cache_clear()
+
+
+@lru_cache(maxsize=None)
+def compile_query(name: str, dialect: str) -> str:
+    """Текст запроса для диалекта: 'sqlite' (?), 'postgresql' ($n) или 'pyformat' (%s)"""
+    sql = QUERIES[name]
+    if dialect == 'sqlite':
+        return sql
+    counter = iter(range(1, sql.count('?') + 1))
+    parts = _LITERAL.split(sql)
+    for i in range(0, len(parts), 2):
+        # Плейсхолдеры заменяются только вне строковых литералов
+        if dialect == 'pyformat':
+            parts[i] = parts[i].replace('%', '%%').replace('?', '%s')
+        else:
+            parts[i] = re.sub(r'\?', lambda _: f"${next(counter)}", parts[i])
+    if dialect == 'pyformat':
+        for i in range(1, len(parts), 2):
+            parts[i] = parts[i].replace('%', '%%')
+    return ''.join(parts)
+
+
+def sql(name: str, db_type: str = 'sqlite') -> str:
+    """Текст запроса для обычного execute (чтобы дописать условия фильтров)"""
+    return compile_query(name, 'sqlite' if db_type == 'sqlite' else 'pyformat')
+
+
+def dialect_of(conn_or_cursor) -> str:
+    return 'sqlite' if isinstance(conn_or_cursor, (sqlite3.Connection, sqlite3.Cursor)) else 'postgresql'
+
+
+def statement_name(name: str) -> str:
+    return 'beton_' + re.sub(r'\W', '_', name)
+
+
+def execute(conn_or_cursor, name: str, params: Sequence[Any] = ()):
+    """Выполняет запрос из реестра и возвращает курсор с результатом"""
+    cursor = conn_or_cursor.cursor() if hasattr(conn_or_cursor, 'cursor') else conn_or_cursor
+    if dialect_of(cursor) == 'sqlite':
+        cursor.execute(compile_query(name, 'sqlite'), params)
+        return cursor
+
+    connection = cursor.connection
+    prepared = _prepared.setdefault((id(connection), connection.get_backend_pid()), set())
+    statement = statement_name(name)
+    if name not in prepared:
+        # Без параметров psycopg2 не разбирает % в тексте
+        cursor.execute(f"PREPARE {statement} AS {compile_query(name, 'postgresql')}")
+        prepared.add(name)
+    if params:
+        cursor.execute(f"EXECUTE {statement} ({', '.join(['%s'] * len(params))})", tuple(params))
+    else:
+        cursor.execute(f"EXECUTE {statement}")
+    return cursor
+
+
+def fetchall(conn_or_cursor, name: str, params: Sequence[Any] = ()) -> list:
+    return execute(conn_or_cursor, name, params).fetchall()
+
+
+def fetchone(conn_or_cursor, name: str, params: Sequence[Any] = ()) -> Optional[Any]:
+    return execute(conn_or_cursor, name, params).fetchone()
+
+
+# ---------- запросы приложения ----------
+register('organizations.list', "SELECT id, name FROM organizations ORDER BY name")
+
+register('objects.by_org', "SELECT id, name, address FROM objects WHERE org_id = ? ORDER BY name")
+
+register('objects.with_org', """
+    SELECT o.name as object_name, org.name as org_name
+    FROM objects o
+    JOIN organizations org ON o.org_id = org.id
+    WHERE o.id = ?
+""")
+
+# Записи контроля объекта в колонках таблицы GUI
+register('constructions.by_object', """
+    SELECT id, pour_date, element, concrete_class, frost_resistance, water_resistance,
+    supplier, concrete_passport, volume_concrete, cubes_count, cones_count,
+    slump, temperature, temp_measurements, executor, act_number, request_number, invoice
+    FROM constructions
+    WHERE object_id = ?
+""")
+
+# То же за все годы (поиск с фильтрами): all_constructions из archive.py
+register('constructions.by_object_history', """
+    SELECT id, pour_date, element, concrete_class, frost_resistance, water_resistance,
+    supplier, concrete_passport, volume_concrete, cubes_count, cones_count,
+    slump, temperature, temp_measurements, executor, act_number, request_number, invoice
+    FROM all_constructions
+    WHERE object_id = ?
+""")
+
+register('constructions.get', """
+    SELECT pour_date, element, concrete_class, frost_resistance, water_resistance,
+           supplier, concrete_passport, volume_concrete, cubes_count, cones_count,
+           slump, temperature, temp_measurements, executor, act_number, request_number, invoice
+    FROM constructions WHERE id = ?
+""")
+
+register('constructions.export', """
+    SELECT pour_date, element, concrete_class, frost_resistance, water_resistance,
+        supplier, concrete_passport, volume_concrete, cubes_count, cones_count,
+        slump, temperature, temp_measurements, executor, act_number, request_number, invoice
+    FROM constructions
+    WHERE object_id = ?
+    ORDER BY pour_date
+""")
+
+# Выгрузка за все годы: all_constructions - временное представление SQLite
+# из archive.attach_archives (рабочая таблица вместе с архивами прошлых лет)
+register('constructions.export_history', """
+    SELECT pour_date, element, concrete_class, frost_resistance, water_resistance,
+        supplier, concrete_passport, volume_concrete, cubes_count, cones_count,
+        slump, temperature, temp_measurements, executor, act_number, request_number, invoice
+    FROM all_constructions
+    WHERE object_id = ?
+    ORDER BY substr(pour_date, 7, 4), pour_date
+""")
+
+# Запись контроля вместе с объектом и организацией (для документов)
+register('constructions.document', """
+    SELECT
+        c.pour_date, c.element, c.concrete_class, c.frost_resistance, c.water_resistance,
+        c.supplier, c.concrete_passport, c.volume_concrete, c.cubes_count, c.cones_count,
+        c.slump, c.temperature, c.temp_measurements, c.act_number, c.request_number, c.invoice,
+        o.name as object_name, o.address,
+        org.name as org_name, org.contact, org.phone
+    FROM constructions c
+    JOIN objects o ON c.object_id = o.id
+    JOIN organizations org ON o.org_id = org.id
+    WHERE c.id = ?
+""")
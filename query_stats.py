@@ -0,0 +1,328 @@
+"""
+Замеры времени SQL-запросов и журнал медленных запросов
+
+Соединения, открытые через connect() (SQLite) или с курсором из
+pg_cursor_factory() (psycopg2), замеряют каждый execute/executemany.
+Статистика копится по нормализованному тексту запроса (литералы заменены
+на ?), с гистограммой задержек.
+
+SQLite выполняет SELECT по мере чтения строк, поэтому у курсора SQLite
+замеряются и fetchone/fetchmany/fetchall/итерация: время чтения относится
+к последнему выполненному запросу курсора и входит в его total_ms (отдельно
+fetch_ms), но не в гистограмму и max_ms - они только про execute. psycopg2
+получает все строки уже в execute, его fetch отдельно не замеряется. Запросы дольше BETON_SLOW_QUERY_MS
+миллисекунд пишутся в лог вместе с планом выполнения (EXPLAIN QUERY PLAN
+для SQLite, EXPLAIN для PostgreSQL), поэтому полные сканы таблиц видно
+сразу.
+
+BETON_QUERY_STATS=0 отключает замеры, BETON_QUERY_REPORT=1 печатает
+сводку при выходе из приложения.
+"""
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Верхние границы корзин гистограммы, мс (последняя - все остальное)
+BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, float('inf'))
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)+\s*\)", re.IGNORECASE)
+_SPACES = re.compile(r"\s+")
+
+
+def enabled() -> bool:
+    return os.getenv('BETON_QUERY_STATS', '1') != '0'
+
+
+def report_enabled() -> bool:
+    return os.getenv('BETON_QUERY_REPORT', '') not in ('', '0')
+
+
+def slow_query_ms() -> float:
+    return float(os.getenv('BETON_SLOW_QUERY_MS', '100'))
+
+
+@lru_cache(maxsize=1024)
+def normalize_query(sql: str) -> str:
+    """Текст запроса без литералов и лишних пробелов (ключ статистики)"""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _SPACES.sub(' ', sql).strip()
+    sql = sql.replace('%s', '?')
+    return _IN_LIST.sub('IN (?, ...)', sql)
+
+
+class QueryStats:
+    """Потокобезопасная статистика задержек по нормализованным запросам"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queries: Dict[str, Dict[str, Any]] = {}
+
+    def _entry(self, sql: str) -> Dict[str, Any]:
+        key = normalize_query(sql)
+        entry = self._queries.get(key)
+        if entry is None:
+            entry = self._queries[key] = {
+                'count': 0, 'total_ms': 0.0, 'fetch_ms': 0.0, 'max_ms': 0.0, 'buckets': [0] * len(BUCKETS_MS)
+            }
+        return entry
+
+    def record(self, sql: str, seconds: float) -> None:
+        ms = seconds * 1000
+        with self._lock:
+            entry = self._entry(sql)
+            entry['count'] += 1
+            entry['total_ms'] += ms
+            if ms > entry['max_ms']:
+                entry['max_ms'] = ms
+            for i, bound in enumerate(BUCKETS_MS):
+                if ms <= bound:
+                    entry['buckets'][i] += 1
+                    break
+
+    def record_fetch(self, sql: str, seconds: float) -> None:
+        """Время чтения строк запроса (без увеличения числа запросов)"""
+        ms = seconds * 1000
+        with self._lock:
+            entry = self._entry(sql)
+            entry['total_ms'] += ms
+            entry['fetch_ms'] += ms
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Статистика по запросам, от самых затратных по суммарному времени"""
+        with self._lock:
+            items = [(key, dict(entry, buckets=list(entry['buckets']))) for key, entry in self._queries.items()]
+        result = []
+        for key, entry in items:
+            result.append({
+                'query': key,
+                'count': entry['count'],
+                'total_ms': round(entry['total_ms'], 3),
+                'fetch_ms': round(entry['fetch_ms'], 3),
+                'avg_ms': round(entry['total_ms'] / max(entry['count'], 1), 3),
+                'max_ms': round(entry['max_ms'], 3),
+                'p95_ms': _bucket_percentile(entry['buckets'], entry['count'], 0.95, entry['max_ms']),
+                'histogram': {_bucket_label(b): n for b, n in zip(BUCKETS_MS, entry['buckets']) if n},
+            })
+        result.sort(key=lambda item: item['total_ms'], reverse=True)
+        return result
+
+    def report(self, limit: int = 15) -> str:
+        rows = self.snapshot()
+        if not rows:
+            return "Запросов не было"
+        lines = [f"{'кол-во':>8} {'всего мс':>10} {'сред мс':>9} {'p95 мс':>8} {'макс мс':>9}  запрос"]
+        for row in rows[:limit]:
+            query = row['query'] if len(row['query']) <= 100 else row['query'][:97] + '...'
+            lines.append(
+                f"{row['count']:>8} {row['total_ms']:>10.1f} {row['avg_ms']:>9.2f} "
+                f"{row['p95_ms']:>8.1f} {row['max_ms']:>9.1f}  {query}"
+            )
+        return "\n".join(lines)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._queries.clear()
+
+
+def _bucket_label(bound: float) -> str:
+    return f"<={bound:g}ms" if bound != float('inf') else f">{BUCKETS_MS[-2]:g}ms"
+
+
+def _bucket_percentile(buckets: List[int], count: int, q: float, max_ms: float) -> float:
+    # Оценка сверху: граница корзины, в которую попал q-й процентиль
+    threshold = q * count
+    seen = 0
+    for bound, n in zip(BUCKETS_MS, buckets):
+        seen += n
+        if seen >= threshold:
+            return min(bound, round(max_ms, 3))
+    return round(max_ms, 3)
+
+
+# Общая статистика процесса
+stats = QueryStats()
+
+
+def _log_slow(sql: str, seconds: float, plan: List[str]) -> None:
+    logger.warning(
+        f"Медленный запрос ({seconds * 1000:.1f} мс): {normalize_query(sql)}"
+        + ("".join(f"\n  план: {step}" for step in plan))
+    )
+
+
+# ---------- SQLite ----------
+class InstrumentedCursor(sqlite3.Cursor):
+    """Курсор SQLite, замеряющий каждый запрос и чтение его строк"""
+
+    _last_sql = None
+    _last_parameters = ()
+    _fetch_seconds = 0.0
+
+    def execute(self, sql, parameters=()):
+        self._flush_fetch()
+        self._last_sql, self._last_parameters = sql, parameters
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            elapsed = time.perf_counter() - start
+            stats.record(sql, elapsed)
+            if elapsed * 1000 >= slow_query_ms():
+                _log_slow(sql, elapsed, self._plan(sql, parameters))
+
+    def executemany(self, sql, seq_of_parameters):
+        self._flush_fetch()
+        self._last_sql = None
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            elapsed = time.perf_counter() - start
+            stats.record(sql, elapsed)
+            if elapsed * 1000 >= slow_query_ms():
+                _log_slow(sql, elapsed, [])
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(start, True)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(start, True)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(start, True)
+        return rows
+
+    # При итерации время копится на курсоре и уходит в статистику одним
+    # вызовом: когда строки закончились, курсор закрыт или выполняется новый запрос
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(start, True)
+            raise
+        self._fetched(start, False)
+        return row
+
+    def close(self):
+        self._flush_fetch()
+        super().close()
+
+    def _fetched(self, start: float, done: bool) -> None:
+        self._fetch_seconds += time.perf_counter() - start
+        if done:
+            self._flush_fetch()
+
+    def _flush_fetch(self) -> None:
+        elapsed, self._fetch_seconds = self._fetch_seconds, 0.0
+        if not elapsed or self._last_sql is None:
+            return
+        stats.record_fetch(self._last_sql, elapsed)
+        if elapsed * 1000 >= slow_query_ms():
+            _log_slow(self._last_sql, elapsed, self._plan(self._last_sql, self._last_parameters))
+
+    def _plan(self, sql: str, parameters) -> List[str]:
+        if not sql.lstrip().upper().startswith(('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT')):
+            return []
+        try:
+            # Обычный курсор, чтобы план не попадал в статистику
+            rows = sqlite3.Cursor(self.connection).execute(f"EXPLAIN QUERY PLAN {sql}", parameters).fetchall()
+            return [row[-1] for row in rows]
+        except sqlite3.Error:
+            return []
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Соединение SQLite, у которого все курсоры замеряют запросы"""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    # Connection.execute в C обходит переопределенный Cursor.execute
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connect(database: str, **kwargs) -> sqlite3.Connection:
+    """sqlite3.connect с замерами запросов (если они не отключены)"""
+    if enabled():
+        kwargs.setdefault('factory', InstrumentedConnection)
+    return sqlite3.connect(database, **kwargs)
+
+
+# ---------- PostgreSQL ----------
+_pg_cursor_class = None
+
+
+def pg_cursor_factory(base=None):
+    """Класс курсора psycopg2 с замерами для connect(cursor_factory=...)
+
+    base - родительский курсор (например, RealDictCursor), по умолчанию обычный.
+    """
+    global _pg_cursor_class
+    if base is None and _pg_cursor_class is not None:
+        return _pg_cursor_class
+    import psycopg2.extensions
+
+    parent = base or psycopg2.extensions.cursor
+
+    class InstrumentedPgCursor(parent):
+        def execute(self, query, vars=None):
+            start = time.perf_counter()
+            try:
+                return super().execute(query, vars)
+            finally:
+                elapsed = time.perf_counter() - start
+                sql = query if isinstance(query, str) else str(query)
+                stats.record(sql, elapsed)
+                if elapsed * 1000 >= slow_query_ms():
+                    _log_slow(sql, elapsed, self._plan(sql, vars))
+
+        def executemany(self, query, vars_list):
+            start = time.perf_counter()
+            try:
+                return super().executemany(query, vars_list)
+            finally:
+                elapsed = time.perf_counter() - start
+                stats.record(query if isinstance(query, str) else str(query), elapsed)
+
+        def _plan(self, sql: str, vars) -> List[str]:
+            if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+                return []
+            try:
+                with self.connection.cursor(cursor_factory=psycopg2.extensions.cursor) as cur:
+                    cur.execute(f"EXPLAIN {sql}", vars)
+                    return [row[0] for row in cur.fetchall()]
+            except Exception:
+                return []
+
+    if base is None:
+        _pg_cursor_class = InstrumentedPgCursor
+    return InstrumentedPgCursor
+
+
+def pg_connect_kwargs(cursor_base=None) -> Dict[str, Any]:
+    """Аргументы psycopg2.connect, подключающие замеры (пусто, если отключены)"""
+    return {'cursor_factory': pg_cursor_factory(cursor_base)} if enabled() else {}
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Запуск Beton_control без графического интерфейса (сервер, контейнер)
+
+Поднимает только базу данных и Telegram-бота: tkinter, ttkbootstrap и
+openpyxl не импортируются. Бот работает в главном потоке, поэтому
+корректно завершается по SIGTERM/SIGINT.
+"""
+
+from startup_profiler import profiler
+
+import os
+
+import backup
+import query_stats
+import scheduler
+from database_manager import DatabaseManager
+from telegram_bot import TelegramBotService, TELEGRAM_BOT_TOKEN
+
+profiler.mark('imports')
+
+
+def main():
+    """Главная функция запуска сервиса"""
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        # На сервере переменные обычно заданы окружением
+        pass
+
+    db_path = os.getenv('RAILWAY_DB_PATH', 'concrete.db')
+    print("🚀 Запуск Beton_control в режиме сервиса")
+    print(f"🗄️  База данных: {db_path}")
+
+    # Схема, индексы и триггеры создаются один раз до старта бота
+    with profiler.phase('db_open_migrate'):
+        db = DatabaseManager(db_path)
+        db.close()
+
+    # Онлайн-копии и обслуживание базы по расписанию (APScheduler)
+    if scheduler.schedule_backups(db_path):
+        print(f"💾 Резервные копии: {backup.backup_dir_for(db_path)}")
+    scheduler.schedule_maintenance(db_path)
+
+    service = TelegramBotService(TELEGRAM_BOT_TOKEN, db_path=db_path)
+    profiler.finish('run_service')
+    print(f"🤖 Telegram-бот: режим {service.mode}")
+    try:
+        service.run()
+    except KeyboardInterrupt:
+        print("\n⚠️ Остановлено пользователем")
+    if query_stats.report_enabled():
+        print(query_stats.stats.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Фоновые задачи по расписанию (APScheduler): резервные копии и обслуживание базы
+
+Один BackgroundScheduler на процесс, общий для GUI и run_service.py.
+APScheduler загружается только при первом планировании; если он не
+установлен, задачи просто не запускаются.
+"""
+
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+import backup
+import maintenance
+from lazy_imports import lazy_import
+
+# Первая задача после запуска - не сразу, чтобы не мешать старту
+STARTUP_DELAY = timedelta(minutes=1)
+# Первое обслуживание - после первой копии; повтор отложенного из-за записей
+MAINTENANCE_DELAY = timedelta(minutes=15)
+MAINTENANCE_RETRY = timedelta(minutes=30)
+
+logger = logging.getLogger(__name__)
+
+_scheduler = None
+
+
+def get_scheduler():
+    """Запущенный общий планировщик (None, если APScheduler не установлен)"""
+    global _scheduler
+    if _scheduler is None:
+        try:
+            background = lazy_import('apscheduler.schedulers.background')
+        except ImportError:
+            logger.warning("APScheduler не установлен, фоновые задачи отключены")
+            return None
+        _scheduler = background.BackgroundScheduler(daemon=True)
+        _scheduler.start()
+    return _scheduler
+
+
+def schedule_backups(db_path: str, hours: Optional[float] = None) -> bool:
+    """Резервная копия каждые hours часов (BETON_BACKUP_HOURS, 0 - отключить).
+
+    Если последняя копия старше интервала (или ее нет), первая снимается
+    вскоре после запуска.
+    """
+    hours = hours if hours is not None else float(os.getenv('BETON_BACKUP_HOURS', '24'))
+    if hours <= 0:
+        return False
+    scheduler = get_scheduler()
+    if scheduler is None:
+        return False
+    interval = timedelta(hours=hours)
+    first_run = datetime.now() + interval
+    age = backup.latest_backup_age(db_path)
+    if age is None or age >= interval.total_seconds():
+        first_run = datetime.now() + STARTUP_DELAY
+    scheduler.add_job(
+        _run_backup, 'interval', args=[db_path], hours=hours, next_run_time=first_run,
+        id=f"backup:{os.path.abspath(db_path)}", replace_existing=True, max_instances=1, coalesce=True
+    )
+    logger.info(f"Резервные копии {db_path} каждые {hours:g} ч, первая в {first_run:%H:%M}")
+    return True
+
+
+def _run_backup(db_path: str) -> None:
+    try:
+        backup.backup_database(db_path)
+    except Exception as e:
+        logger.error(f"Ошибка резервного копирования {db_path}: {e}")
+
+
+def schedule_maintenance(db_path: str, hours: Optional[float] = None) -> bool:
+    """Обслуживание базы каждые hours часов (BETON_MAINTENANCE_HOURS, 0 - отключить)"""
+    hours = hours if hours is not None else float(os.getenv('BETON_MAINTENANCE_HOURS', '24'))
+    if hours <= 0:
+        return False
+    scheduler = get_scheduler()
+    if scheduler is None:
+        return False
+    scheduler.add_job(
+        _run_maintenance, 'interval', args=[db_path], hours=hours,
+        next_run_time=datetime.now() + MAINTENANCE_DELAY,
+        id=f"maintenance:{os.path.abspath(db_path)}", replace_existing=True, max_instances=1, coalesce=True
+    )
+    logger.info(f"Обслуживание {db_path} каждые {hours:g} ч (в простое)")
+    return True
+
+
+def _run_maintenance(db_path: str) -> None:
+    try:
+        if maintenance.run_maintenance(db_path):
+            return
+    except Exception as e:
+        logger.error(f"Ошибка обслуживания {db_path}: {e}")
+        return
+    # База занята: пробуем еще раз позже, не дожидаясь следующего интервала
+    if _scheduler is not None:
+        _scheduler.add_job(
+            _run_maintenance, 'date', args=[db_path], run_date=datetime.now() + MAINTENANCE_RETRY,
+            id=f"maintenance-retry:{os.path.abspath(db_path)}", replace_existing=True
+        )
+
+
+def shutdown() -> None:
+    """Останавливает планировщик, не дожидаясь текущих задач"""
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.shutdown(wait=False)
+        _scheduler = None
@@ -0,0 +1,92 @@
+"""
+Профилирование запуска приложения по фазам
+
+Включается переменной окружения BETON_PROFILE_STARTUP. Значение 1 пишет
+отчет в startup_profile.jsonl, любое другое значение считается путем к
+файлу. Отчет добавляется одной JSON-строкой за запуск, чтобы регрессии
+времени старта было видно между версиями.
+
+Модуль нужно импортировать первым: время импорта остальных модулей
+считается от момента его загрузки.
+"""
+
+import json
+import os
+import platform
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_REPORT_PATH = 'startup_profile.jsonl'
+
+
+class StartupProfiler:
+    """Замеры времени фаз запуска (wall time)"""
+
+    def __init__(self, enabled: Optional[bool] = None, report_path: Optional[str] = None):
+        setting = os.getenv('BETON_PROFILE_STARTUP', '')
+        if enabled is None:
+            enabled = setting not in ('', '0')
+        self.enabled = enabled
+        if report_path is None and setting not in ('', '0', '1'):
+            report_path = setting
+        self.report_path = report_path or DEFAULT_REPORT_PATH
+        self.started = time.perf_counter()
+        self._last_mark = self.started
+        self.phases: List[Tuple[str, float]] = []
+        self.finished = False
+
+    def mark(self, name: str) -> None:
+        """Закрывает фазу, длившуюся с предыдущей отметки"""
+        if not self.enabled or self.finished:
+            return
+        now = time.perf_counter()
+        self.phases.append((name, now - self._last_mark))
+        self._last_mark = now
+
+    @contextmanager
+    def phase(self, name: str):
+        """Замер блока кода как отдельной фазы"""
+        if not self.enabled or self.finished:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            self.phases.append((name, now - start))
+            self._last_mark = now
+
+    def report(self, app: str = '') -> Dict:
+        total = time.perf_counter() - self.started
+        return {
+            'app': app,
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': sys.platform,
+            'total_ms': round(total * 1000, 1),
+            'phases': {name: round(seconds * 1000, 1) for name, seconds in self.phases},
+        }
+
+    def finish(self, app: str = '') -> Optional[Dict]:
+        """Завершает замер, печатает сводку и дописывает отчет в файл"""
+        if not self.enabled or self.finished:
+            return None
+        self.finished = True
+        report = self.report(app)
+        print(f"⏱️ Запуск {app}: {report['total_ms']:.0f} мс")
+        for name, ms in report['phases'].items():
+            print(f"   {name:<20} {ms:8.1f} мс")
+        try:
+            with open(self.report_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(report, ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"⚠️ Не удалось записать отчет о запуске: {e}")
+        return report
+
+
+# Общий профилировщик процесса
+profiler = StartupProfiler()
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Инкрементальная синхронизация локальной SQLite с PostgreSQL Railway
+
+Переносит только строки, упомянутые в журнале change_log (см. change_log.py):
+существующие в SQLite строки записываются в PostgreSQL целиком (вставка или
+обновление по migration_id_map), исчезнувшие - удаляются. Записи контроля
+ищутся и в архивах закрытых лет (archive.py): перенос в архив - не удаление,
+поэтому записи, измененные до переноса, все равно доходят до PostgreSQL. Пачка изменений,
+соответствие id и номер последней записи журнала (sync_state) фиксируются
+одной транзакцией, поэтому повторный запуск после сбоя безопасен.
+
+При первом запуске для источника сначала выполняется возобновляемая
+миграция (migrate_to_railway.py), дальше - только журнал.
+"""
+
+import argparse
+import os
+import socket
+import time
+from typing import Dict, Iterable, List, Tuple
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+import archive
+import change_log
+from migrate_to_railway import (
+    DataMigrator, NUMERIC_COLUMNS, PAGE_SIZE, PARENT_TABLES, PARENTS, TABLE_COLUMNS, _numeric
+)
+
+SYNC_STATE_SCRIPT = """CREATE TABLE IF NOT EXISTS sync_state (
+    source VARCHAR(255) PRIMARY KEY,
+    last_seq BIGINT NOT NULL DEFAULT 0,
+    synced_rows BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT now()
+)"""
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+class PostgresSync(DataMigrator):
+    """Отправка изменений из change_log в PostgreSQL"""
+
+    def __init__(self, sqlite_path: str = 'concrete.db', source: str = None,
+                 batch_size: int = DEFAULT_BATCH_SIZE):
+        super().__init__(sqlite_path, chunk_size=batch_size)
+        # Имя источника (ноутбука) в sync_state
+        self.source = source or os.getenv('BETON_SYNC_SOURCE') or socket.gethostname()
+
+    def prepare(self) -> bool:
+        """Подключение к обеим базам и создание служебных таблиц"""
+        if self.sqlite_conn is None:
+            if not self.connect_sqlite():
+                return False
+            change_log.ensure_schema(self.sqlite_conn)
+            self.sqlite_conn.commit()
+        if self.postgres_conn is None or self.postgres_conn.closed:
+            if not self.connect_postgresql():
+                return False
+            self.create_tables_postgresql()
+            self.create_migration_state()
+            cursor = self.postgres_conn.cursor()
+            cursor.execute(SYNC_STATE_SCRIPT)
+            self.postgres_conn.commit()
+            cursor.close()
+        return True
+
+    def _load_sync_seq(self, cursor_postgres):
+        cursor_postgres.execute("SELECT last_seq FROM sync_state WHERE source = %s", (self.source,))
+        row = cursor_postgres.fetchone()
+        return row[0] if row else None
+
+    def sync_once(self) -> int:
+        """Отправляет все накопленные изменения, возвращает число перенесенных строк"""
+        cursor_postgres = self.postgres_conn.cursor()
+        last_seq = self._load_sync_seq(cursor_postgres)
+        cursor_postgres.close()
+        if last_seq is None:
+            # Источник синхронизируется впервые: переносим все, чего еще нет в PostgreSQL
+            self.logger.info(f"Первая синхронизация источника '{self.source}', выполняем миграцию")
+            self.migrate_resumable()
+            last_seq = 0
+        # migrate_resumable мог переподключиться, курсор берется после нее
+        cursor_postgres = self.postgres_conn.cursor()
+        cursor_postgres.execute(
+            "INSERT INTO sync_state (source) VALUES (%s) ON CONFLICT (source) DO NOTHING", (self.source,)
+        )
+        self.postgres_conn.commit()
+        # С этого момента журнал обрезает синхронизация, а не обслуживание
+        change_log.mark_consumer(self.sqlite_conn, self.source, last_seq)
+
+        # Архивы, созданные с прошлого запуска, тоже подключаются
+        archive.attach_archives(self.sqlite_conn)
+
+        total = 0
+        start = time.perf_counter()
+        while True:
+            seq, changes = change_log.read_changes(self.sqlite_conn, last_seq, self.chunk_size)
+            if seq == last_seq:
+                break
+            try:
+                rows = self._apply(cursor_postgres, changes)
+                cursor_postgres.execute("""
+                    INSERT INTO sync_state (source, last_seq, synced_rows, updated_at)
+                    VALUES (%s, %s, %s, now())
+                    ON CONFLICT (source) DO UPDATE SET
+                        last_seq = EXCLUDED.last_seq,
+                        synced_rows = sync_state.synced_rows + EXCLUDED.synced_rows,
+                        updated_at = now()
+                """, (self.source, seq, rows))
+                self.postgres_conn.commit()
+            except Exception:
+                self.postgres_conn.rollback()
+                raise
+            # Отправленное больше не нужно; при сбое здесь пачка просто повторится
+            change_log.mark_consumer(self.sqlite_conn, self.source, seq)
+            change_log.prune(self.sqlite_conn, seq)
+            last_seq = seq
+            total += rows
+
+        cursor_postgres.close()
+        if total:
+            self.logger.info(f"Синхронизировано строк: {total} за {time.perf_counter() - start:.1f} с (seq {last_seq})")
+        return total
+
+    # ---------- применение пачки ----------
+    def _current_rows(self, changes: Dict[str, Dict[int, str]]) -> Tuple[Dict[str, Dict[int, list]],
+                                                                         Dict[str, List[int]]]:
+        """Строки для записи и id для удаления по пачке журнала.
+
+        Берется текущее состояние строки, а не операция из журнала: так повтор
+        одной и той же пачки дает тот же результат. Нужны attach_archives.
+        """
+        upserts: Dict[str, Dict[int, list]] = {}
+        deletes: Dict[str, List[int]] = {}
+        for table in change_log.TRACKED_TABLES:
+            ids = sorted(changes.get(table, {}))
+            source = archive.VIEW_NAME if table == 'constructions' else table
+            rows = change_log.fetch_rows(self.sqlite_conn, table, TABLE_COLUMNS[table], ids, source)
+            upserts[table] = {row[0]: list(row) for row in rows}
+            deletes[table] = [row_id for row_id in ids if row_id not in upserts[table]]
+        return upserts, deletes
+
+    def _apply(self, cursor_postgres, changes: Dict[str, Dict[int, str]]) -> int:
+        upserts, deletes = self._current_rows(changes)
+
+        # Родители, которых еще нет в PostgreSQL, переносятся вместе с потомками
+        for table in ('constructions', 'objects'):
+            parent = PARENT_TABLES[table]
+            index = TABLE_COLUMNS[table].index(PARENTS[table])
+            needed = {row[index] for row in upserts[table].values()} - set(upserts[parent])
+            missing = needed - set(self._lookup_ids(cursor_postgres, parent, needed))
+            for row in change_log.fetch_rows(self.sqlite_conn, parent, TABLE_COLUMNS[parent], sorted(missing)):
+                upserts[parent][row[0]] = list(row)
+
+        for table in reversed(change_log.TRACKED_TABLES):
+            self._delete(cursor_postgres, table, deletes[table])
+        written = 0
+        for table in change_log.TRACKED_TABLES:
+            written += self._upsert(cursor_postgres, table, upserts[table])
+        return written + sum(len(ids) for ids in deletes.values())
+
+    def _lookup_ids(self, cursor_postgres, table: str, ids: Iterable[int]) -> Dict[int, int]:
+        ids = list(ids)
+        if not ids:
+            return {}
+        cursor_postgres.execute(
+            "SELECT source_id, target_id FROM migration_id_map WHERE table_name = %s AND source_id = ANY(%s)",
+            (table, ids)
+        )
+        return dict(cursor_postgres.fetchall())
+
+    def _delete(self, cursor_postgres, table: str, ids: List[int]):
+        targets = self._lookup_ids(cursor_postgres, table, ids)
+        if not targets:
+            return
+        cursor_postgres.execute(f"DELETE FROM {table} WHERE id = ANY(%s)", (list(targets.values()),))
+        cursor_postgres.execute(
+            "DELETE FROM migration_id_map WHERE table_name = %s AND source_id = ANY(%s)",
+            (table, list(targets))
+        )
+
+    def _upsert(self, cursor_postgres, table: str, rows: Dict[int, list]) -> int:
+        if not rows:
+            return 0
+        columns = TABLE_COLUMNS[table]
+        converters = [(i, NUMERIC_COLUMNS[col]) for i, col in enumerate(columns) if col in NUMERIC_COLUMNS]
+        parent_index = columns.index(PARENTS[table]) if table in PARENTS else None
+        parent_map = {}
+        if parent_index is not None:
+            parent_map = self._lookup_ids(
+                cursor_postgres, PARENT_TABLES[table], {row[parent_index] for row in rows.values()}
+            )
+        existing = self._lookup_ids(cursor_postgres, table, rows)
+
+        updates, new_ids, new_values = [], [], []
+        for source_id, row in sorted(rows.items()):
+            if parent_index is not None:
+                row[parent_index] = parent_map.get(row[parent_index])
+                if row[parent_index] is None:
+                    self.logger.warning(f"{table}: строка {source_id} без родительской записи пропущена")
+                    continue
+            for i, kind in converters:
+                row[i] = _numeric(row[i], kind)
+            if source_id in existing:
+                updates.append([existing[source_id]] + row[1:])
+            else:
+                new_ids.append(source_id)
+                new_values.append(row[1:])
+
+        if updates:
+            assignments = ', '.join(f"{col} = EXCLUDED.{col}" for col in columns[1:])
+            execute_values(cursor_postgres, f"""
+                INSERT INTO {table} ({', '.join(columns)}) VALUES %s
+                ON CONFLICT (id) DO UPDATE SET {assignments}
+            """, updates, page_size=PAGE_SIZE)
+        if new_values:
+            target_ids = self._insert_chunk(cursor_postgres, table, columns[1:], new_values)
+            execute_values(cursor_postgres, """
+                INSERT INTO migration_id_map (table_name, source_id, target_id) VALUES %s
+                ON CONFLICT (table_name, source_id) DO UPDATE SET target_id = EXCLUDED.target_id
+            """, [(table, s, t) for s, t in zip(new_ids, target_ids)], page_size=PAGE_SIZE)
+        return len(updates) + len(new_values)
+
+    def run(self, interval: float = 0) -> bool:
+        """Одна синхронизация или бесконечный цикл с паузой interval секунд"""
+        while True:
+            try:
+                if not self.prepare():
+                    if not interval:
+                        return False
+                else:
+                    self.sync_once()
+                    if not interval:
+                        return True
+            except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+                self.logger.warning(f"Соединение с PostgreSQL потеряно: {e}")
+                try:
+                    self.postgres_conn.close()
+                except Exception:
+                    pass
+                if not interval:
+                    return False
+            time.sleep(interval)
+
+
+def main():
+    """Главная функция"""
+    parser = argparse.ArgumentParser(description="Инкрементальная синхронизация SQLite -> PostgreSQL")
+    parser.add_argument('--sqlite', default='concrete.db', help="Путь к базе SQLite")
+    parser.add_argument('--source', help="Имя источника в sync_state (по умолчанию имя компьютера)")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Записей журнала в одной транзакции")
+    parser.add_argument('--interval', type=float, default=0,
+                        help="Повторять синхронизацию каждые N секунд (0 - один раз)")
+    args = parser.parse_args()
+
+    if not any(os.getenv(var) for var in ['DATABASE_URL', 'RAILWAY_DB_HOST']):
+        print("ОШИБКА: Не настроены переменные окружения для PostgreSQL")
+        print("Создайте файл .env на основе config.env.example")
+        return
+
+    sync = PostgresSync(sqlite_path=args.sqlite, source=args.source, batch_size=args.batch_size)
+    try:
+        if sync.run(interval=args.interval):
+            print("\n✅ Синхронизация завершена")
+        else:
+            print("\n❌ Синхронизация не выполнена, проверьте логи выше")
+    except KeyboardInterrupt:
+        print("\n⚠️ Синхронизация остановлена пользователем")
+    finally:
+        sync.close_connections()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,850 @@
+"""
+Telegram-бот для добавления записей контроля и выгрузки документов
+
+Не зависит от Tkinter: запускается из настольного приложения в фоновом
+потоке (TelegramBotService.start) или отдельно, без GUI, через run_service.py.
+"""
+
+import asyncio
+import os
+import re
+import tempfile
+import threading
+from typing import Optional
+
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.ext import (
+    ApplicationBuilder,
+    CommandHandler,
+    MessageHandler,
+    CallbackQueryHandler,
+    ConversationHandler,
+    ContextTypes,
+    filters,
+)
+
+import change_log
+import distinct_cache
+from bot_metrics import BotMetrics
+import documents
+import query_stats
+import usage_ranking
+import write_queue
+from bot_persistence import SQLitePersistence
+
+TELEGRAM_BOT_TOKEN = os.getenv(
+    'TELEGRAM_BOT_TOKEN',
+    '7619596833:AAEtEBVEcQeyevk61-kZdXvpZp1skfdzomA'
+)
+
+class TelegramBotService:
+    """Background Telegram bot that guides user to add a new construction record."""
+
+    # Conversation states
+    (ACTION, ORG, OBJ, CLASS, FROST, WATER, ELEMENT, SUPPLIER, PASSPORT,
+     CUBES, CONES, SLUMP, VOLUME, TEMP, TEMP_MEAS, EXECUTOR, ACT, REQUEST, DATE,
+     SEND_ACT, DOC_PICK, ORG_DOCS, OBJ_DOCS) = range(23)
+
+    # Размер страницы списков организаций/объектов и записей контроля
+    PAGE_SIZE = 10
+
+    # Списки с пагинацией: вид -> (таблица, ключ родителя в user_data, заголовок)
+    LIST_KINDS = {
+        'ORG': ('organizations', None, "Какая организация?"),
+        'ORG_DOCS': ('organizations', None, "Выберите организацию:"),
+        'OBJ': ('objects', 'org_id', "Какой объект?"),
+        'OBJ_DOCS': ('objects', 'org_docs_id', "Выберите объект:"),
+    }
+
+    # Стандартные значения клавиатур: колонка -> (всегда добавлять, если пусто)
+    CHOICE_FALLBACKS = {
+        'concrete_class': (["B7,5", "B10", "B12,5", "B15", "B20", "B22,5", "B25", "B27,5", "B30", "B35", "B40", "B45", "B50"], []),
+        'frost_resistance': (["F50", "F75", "F100", "F150", "F200", "F300", "F400", "F500"], []),
+        'water_resistance': (["W2", "W4", "W6", "W8", "W10", "W12", "W14"], []),
+        'supplier': ([], ["Неизвестно"]),
+        'executor': ([], ["Исполнитель"]),
+    }
+
+    def __init__(self, token: str, db_path: str = 'concrete.db', mode: Optional[str] = None,
+                 webhook_url: Optional[str] = None, port: Optional[int] = None,
+                 base_url: Optional[str] = None):
+        self.token = token
+        self.db_path = db_path
+        self.thread: Optional[threading.Thread] = None
+        # Режим получения обновлений: polling (по умолчанию) или webhook
+        self.mode = (mode or os.getenv('TELEGRAM_MODE', 'polling')).lower()
+        # Публичный адрес, на который Telegram будет слать обновления (без пути)
+        self.webhook_url = webhook_url or os.getenv('TELEGRAM_WEBHOOK_URL', '')
+        self.webhook_path = os.getenv('TELEGRAM_WEBHOOK_PATH', 'telegram')
+        self.listen = os.getenv('TELEGRAM_WEBHOOK_LISTEN', '0.0.0.0')
+        self.port = int(port or os.getenv('TELEGRAM_WEBHOOK_PORT') or os.getenv('PORT') or 8000)
+        self.secret_token = os.getenv('TELEGRAM_WEBHOOK_SECRET') or None
+        # Адрес Bot API, например http://127.0.0.1:8081/bot для fake_telegram_api.py
+        self.base_url = base_url or os.getenv('TELEGRAM_API_BASE_URL') or None
+        # Метрики для /metrics (порт BOT_METRICS_PORT)
+        self.metrics = BotMetrics()
+
+    def is_running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self) -> None:
+        if self.is_running():
+            return
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def build_application(self):
+        """Собирает Application со всеми обработчиками диалога (None при ошибке БД)"""
+        print("[TG] Building application...")
+        # Прогресс диалогов хранится в БД и переживает перезапуск бота
+        persistence = SQLitePersistence(self.db_path)
+        builder = ApplicationBuilder().token(self.token).persistence(persistence)
+        if self.base_url:
+            builder = builder.base_url(self.base_url)
+        application = builder.build()
+
+        # Local DB connection for this thread
+        try:
+            db_conn = query_stats.connect(self.db_path)
+            distinct_cache.ensure_schema(db_conn)
+            usage_ranking.ensure_schema(db_conn)
+            change_log.ensure_schema(db_conn)
+            db_conn.commit()
+            # Регистронезависимый поиск по началу названия (LIKE в SQLite не знает кириллицу)
+            db_conn.create_function(
+                'casefold', 1, lambda v: v.casefold() if isinstance(v, str) else v, deterministic=True
+            )
+        except Exception as e:
+            print(f"[TG] DB connect error: {e}")
+            return None
+
+        # Все вставки идут через общую очередь записи (один писатель на файл БД)
+        writes = write_queue.get_queue(self.db_path)
+
+        def fetchall(query: str, params: tuple = ()):
+            cur = db_conn.cursor()
+            cur.execute(query, params)
+            return cur.fetchall()
+
+        async def send_documents(query, constr_id: int, kind: str) -> Optional[bool]:
+            """Формирует акт и/или заявку во временной папке и отправляет в чат (None - нет записи)"""
+            construction_data = documents.fetch_construction(db_conn, constr_id)
+            if construction_data is None:
+                return None
+            sent_any = False
+            for doc_kind, template_file, doc_type, filename in (
+                ('ACT', documents.ACT_TEMPLATE, 'Акт', 'act.docx'),
+                ('REQ', documents.REQUEST_TEMPLATE, 'Заявка', 'request.docx'),
+            ):
+                if kind not in (doc_kind, 'BOTH'):
+                    continue
+                template_path = documents.template_path(template_file)
+                if not os.path.exists(template_path):
+                    await query.message.reply_text(f"Шаблон не найден: {template_path}")
+                    continue
+                with tempfile.TemporaryDirectory() as tmpdir:
+                    out_path = os.path.join(tmpdir, filename)
+                    with self.metrics.document_render_seconds.time(doc=doc_kind):
+                        documents.render_document(
+                            template_file, documents.build_context(construction_data, doc_type), out_path
+                        )
+                    with self.metrics.document_send_seconds.time(doc=doc_kind):
+                        with open(out_path, 'rb') as f:
+                            await query.message.reply_document(document=f, filename=filename)
+                sent_any = True
+            return sent_any
+
+        def choice_keyboard(update: Update, context, column: str, prefix: str, per_row: int) -> list:
+            """Клавиатура выбора значения: сначала частые для объекта и пользователя"""
+            fallback, empty_fallback = self.CHOICE_FALLBACKS[column]
+            values = usage_ranking.ranked_values(
+                db_conn, column,
+                object_id=context.user_data.get('object_id'),
+                user_id=update.effective_user.id if update.effective_user else None,
+                fallback=fallback,
+            ) or empty_fallback
+            keyboard = []
+            row = []
+            for val in values:
+                row.append(InlineKeyboardButton(val, callback_data=f"{prefix}:{val}"))
+                if len(row) == per_row:
+                    keyboard.append(row)
+                    row = []
+            if row:
+                keyboard.append(row)
+            keyboard.append([InlineKeyboardButton("Пропустить", callback_data=f"SKIP:{column}")])
+            return keyboard
+
+        def escape_like(text: str) -> str:
+            return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+        def list_page(kind: str, context, direction: str = 'N', cursor_id: Optional[int] = None):
+            """Страница организаций/объектов с keyset-пагинацией по (name, id)"""
+            table, parent_key, _ = self.LIST_KINDS[kind]
+            where, params = [], []
+            if parent_key:
+                where.append("org_id = ?")
+                params.append(context.user_data.get(parent_key))
+            prefix = context.user_data.get('list_prefix')
+            if prefix:
+                where.append("casefold(name) LIKE ? ESCAPE '\\'")
+                params.append(escape_like(prefix.casefold()) + '%')
+            anchor = fetchall(f"SELECT name FROM {table} WHERE id = ?", (cursor_id,)) if cursor_id else []
+            if anchor and direction == 'P':
+                where.append("(name < ? OR (name = ? AND id < ?))")
+                order = "name DESC, id DESC"
+            elif anchor:
+                where.append("(name > ? OR (name = ? AND id > ?))")
+                order = "name, id"
+            else:
+                direction, order = 'N', "name, id"
+            if anchor:
+                params += [anchor[0][0], anchor[0][0], cursor_id]
+            sql = f"SELECT id, name FROM {table}"
+            if where:
+                sql += " WHERE " + " AND ".join(where)
+            rows = fetchall(f"{sql} ORDER BY {order} LIMIT ?", tuple(params) + (self.PAGE_SIZE + 1,))
+            more = len(rows) > self.PAGE_SIZE
+            rows = rows[:self.PAGE_SIZE]
+            if direction == 'P':
+                rows.reverse()
+                return rows, more, True
+            return rows, bool(anchor), more
+
+        def records_page(object_id: int, direction: str = 'N', cursor_id: Optional[int] = None):
+            """Страница записей контроля по объекту, от новых к старым (keyset по id)"""
+            columns = "SELECT id, pour_date, element, concrete_class FROM constructions WHERE object_id = ?"
+            if cursor_id and direction == 'P':
+                rows = fetchall(f"{columns} AND id > ? ORDER BY id ASC LIMIT ?",
+                                (object_id, cursor_id, self.PAGE_SIZE + 1))
+            elif cursor_id:
+                rows = fetchall(f"{columns} AND id < ? ORDER BY id DESC LIMIT ?",
+                                (object_id, cursor_id, self.PAGE_SIZE + 1))
+            else:
+                rows = fetchall(f"{columns} ORDER BY id DESC LIMIT ?", (object_id, self.PAGE_SIZE + 1))
+            more = len(rows) > self.PAGE_SIZE
+            rows = rows[:self.PAGE_SIZE]
+            if cursor_id and direction == 'P':
+                rows.reverse()
+                return rows, more, True
+            return rows, bool(cursor_id), more
+
+        def nav_row(kind: str, rows, has_prev: bool, has_next: bool) -> list:
+            nav = []
+            if has_prev:
+                nav.append(InlineKeyboardButton("« Назад", callback_data=f"PAGE:{kind}:P:{rows[0][0]}"))
+            if has_next:
+                nav.append(InlineKeyboardButton("Вперед »", callback_data=f"PAGE:{kind}:N:{rows[-1][0]}"))
+            return nav
+
+        async def reply_or_edit(query, message, text: str, keyboard=None):
+            markup = InlineKeyboardMarkup(keyboard) if keyboard else None
+            if query is not None:
+                await query.edit_message_text(text, reply_markup=markup)
+            else:
+                await message.reply_text(text, reply_markup=markup)
+
+        async def show_list(kind: str, context, query=None, message=None,
+                            direction: str = 'N', cursor_id: Optional[int] = None):
+            states = {'ORG': self.ORG, 'ORG_DOCS': self.ORG_DOCS, 'OBJ': self.OBJ, 'OBJ_DOCS': self.OBJ_DOCS}
+            context.user_data['list_kind'] = kind
+            prefix = context.user_data.get('list_prefix')
+            rows, has_prev, has_next = list_page(kind, context, direction, cursor_id)
+            if not rows and not prefix:
+                empty = "Нет организаций в базе." if self.LIST_KINDS[kind][0] == 'organizations' else "У организации нет объектов."
+                await reply_or_edit(query, message, empty)
+                return ConversationHandler.END
+            keyboard = []
+            row = []
+            for oid, name in rows:
+                row.append(InlineKeyboardButton(name, callback_data=f"{kind}:{oid}"))
+                if len(row) == 2:
+                    keyboard.append(row)
+                    row = []
+            if row:
+                keyboard.append(row)
+            nav = nav_row(kind, rows, has_prev, has_next)
+            if nav:
+                keyboard.append(nav)
+            text = self.LIST_KINDS[kind][2]
+            if prefix:
+                keyboard.append([InlineKeyboardButton("Сбросить поиск", callback_data=f"PAGE:{kind}:R:0")])
+                text += f"\nПоиск: «{prefix}»" if rows else f"\nПо «{prefix}» ничего не найдено"
+            elif has_prev or has_next:
+                text += "\n(для поиска введите начало названия)"
+            await reply_or_edit(query, message, text, keyboard)
+            return states[kind]
+
+        async def show_records(context, query, direction: str = 'N', cursor_id: Optional[int] = None):
+            object_id = context.user_data.get('docs_object_id')
+            rows, has_prev, has_next = records_page(object_id, direction, cursor_id)
+            if not rows:
+                await query.edit_message_text("Нет контролей по этому объекту")
+                return ConversationHandler.END
+            keyboard = []
+            for cid, date, elem, cls in rows:
+                text = f"#{cid} | {date or ''} | {elem or ''} | {cls or ''}"
+                keyboard.append([InlineKeyboardButton(text[:60], callback_data=f"PICK:{cid}")])
+            nav = nav_row('REC', rows, has_prev, has_next)
+            if nav:
+                keyboard.append(nav)
+            await query.edit_message_text("Выбери запись:", reply_markup=InlineKeyboardMarkup(keyboard))
+            return self.DOC_PICK
+
+        async def page_selected(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            query = update.callback_query
+            await query.answer()
+            m = re.match(r"PAGE:(\w+):([NPR]):(\d+)", query.data)
+            if not m:
+                await query.edit_message_text("Неверный выбор страницы")
+                return ConversationHandler.END
+            kind, direction, cursor_id = m.group(1), m.group(2), int(m.group(3))
+            if kind == 'REC':
+                return await show_records(context, query, direction, cursor_id)
+            if kind not in self.LIST_KINDS:
+                await query.edit_message_text("Неверный выбор страницы")
+                return ConversationHandler.END
+            if direction == 'R':
+                context.user_data.pop('list_prefix', None)
+                return await show_list(kind, context, query=query)
+            return await show_list(kind, context, query=query, direction=direction, cursor_id=cursor_id)
+
+        async def search_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            kind = context.user_data.get('list_kind')
+            if kind not in self.LIST_KINDS:
+                await update.message.reply_text("Выберите вариант кнопкой")
+                return ConversationHandler.END
+            context.user_data['list_prefix'] = update.message.text.strip()
+            return await show_list(kind, context, message=update.message)
+
+        async def start_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            keyboard = [
+                [InlineKeyboardButton("Хочу добавить контроль", callback_data="ACTION:ADD")],
+                [InlineKeyboardButton("Сформировать документ по записи", callback_data="ACTION:DOCS")]
+            ]
+            await update.effective_message.reply_text(
+                "Че надо?",
+                reply_markup=InlineKeyboardMarkup(keyboard)
+            )
+            return self.ACTION
+
+        async def action_selected(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            query = update.callback_query
+            await query.answer()
+            context.user_data.pop('list_prefix', None)
+            if query.data == "ACTION:ADD":
+                # Ask for organization
+                return await show_list('ORG', context, query=query)
+            if query.data == "ACTION:DOCS":
+                # Сначала спросим организацию
+                return await show_list('ORG_DOCS', context, query=query)
+            return ConversationHandler.END
+        async def pick_construction(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            query = update.callback_query
+            await query.answer()
+            m = re.match(r"PICK:(\d+)", query.data)
+            if not m:
+                await query.edit_message_text("Неверный выбор")
+                return ConversationHandler.END
+            constr_id = int(m.group(1))
+            # Предложить что сформировать
+            keyboard = [
+                [InlineKeyboardButton("Акт", callback_data=f"MAKE:ACT:{constr_id}"), InlineKeyboardButton("Заявку", callback_data=f"MAKE:REQ:{constr_id}")],
+                [InlineKeyboardButton("Оба", callback_data=f"MAKE:BOTH:{constr_id}")]
+            ]
+            await query.edit_message_text("Что сформировать?", reply_markup=InlineKeyboardMarkup(keyboard))
+            return self.DOC_PICK
+
+        async def org_docs_selected(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            query = update.callback_query
+            await query.answer()
+            m = re.match(r"ORG_DOCS:(\d+)", query.data)
+            if not m:
+                await query.edit_message_text("Неверный выбор организации")
+                return ConversationHandler.END
+            org_id = int(m.group(1))
+            context.user_data['org_docs_id'] = org_id
+            context.user_data.pop('list_prefix', None)
+            return await show_list('OBJ_DOCS', context, query=query)
+
+        async def obj_docs_selected(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            query = update.callback_query
+            await query.answer()
+            m = re.match(r"OBJ_DOCS:(\d+)", query.data)
+            if not m:
+                await query.edit_message_text("Неверный выбор объекта")
+                return ConversationHandler.END
+            object_id = int(m.group(1))
+            context.user_data['docs_object_id'] = object_id
+            # Показываем записи по объекту постранично, начиная с последних
+            return await show_records(context, query)
+
+        async def make_docs(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            query = update.callback_query
+            await query.answer()
+            parts = query.data.split(":")
+            if len(parts) != 3:
+                await query.edit_message_text("Ошибка параметров")
+                return ConversationHandler.END
+            _, kind, id_str = parts
+            constr_id = int(id_str)
+            try:
+                sent_any = await send_documents(query, constr_id, kind)
+                if sent_any is None:
+                    await query.edit_message_text("Запись не найдена")
+                    return ConversationHandler.END
+                await query.edit_message_text("Готово" if sent_any else "Не удалось отправить документы")
+            except Exception as e:
+                await query.edit_message_text(f"Ошибка: {str(e)}")
+            return ConversationHandler.END
+
+        async def org_selected(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            query = update.callback_query
+            await query.answer()
+            m = re.match(r"ORG:(\d+)", query.data)
+            if not m:
+                await query.edit_message_text("Неверный выбор организации")
+                return ConversationHandler.END
+            org_id = int(m.group(1))
+            context.user_data['org_id'] = org_id
+            context.user_data.pop('list_prefix', None)
+            return await show_list('OBJ', context, query=query)
+
+        async def obj_selected(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            query = update.callback_query
+            await query.answer()
+            m = re.match(r"OBJ:(\d+)", query.data)
+            if not m:
+                await query.edit_message_text("Неверный выбор объекта")
+                return ConversationHandler.END
+            object_id = int(m.group(1))
+            context.user_data['object_id'] = object_id
+
+            # Частые для объекта и пользователя значения, затем расширенный справочник
+            keyboard = choice_keyboard(update, context, 'concrete_class', 'CLASS', 3)
+            await query.edit_message_text("Класс бетона?", reply_markup=InlineKeyboardMarkup(keyboard))
+            return self.CLASS
+
+        async def class_selected(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            query = update.callback_query
+            await query.answer()
+            context.user_data['concrete_class'] = query.data.split(":", 1)[1]
+
+            keyboard = choice_keyboard(update, context, 'frost_resistance', 'FROST', 3)
+            await query.edit_message_text("Морозостойкость?", reply_markup=InlineKeyboardMarkup(keyboard))
+            return self.FROST
+
+        async def frost_selected(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            query = update.callback_query
+            await query.answer()
+            context.user_data['frost_resistance'] = query.data.split(":", 1)[1]
+
+            keyboard = choice_keyboard(update, context, 'water_resistance', 'WATER', 3)
+            await query.edit_message_text("Водопроницаемость?", reply_markup=InlineKeyboardMarkup(keyboard))
+            return self.WATER
+
+        async def water_selected(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            query = update.callback_query
+            await query.answer()
+            context.user_data['water_resistance'] = query.data.split(":", 1)[1]
+            await query.edit_message_text("Конструктив? (введите текст)", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Пропустить", callback_data="SKIP:element")]]))
+            return self.ELEMENT
+
+        async def element_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            context.user_data['element'] = update.message.text.strip()
+            keyboard = choice_keyboard(update, context, 'supplier', 'SUPPLIER', 2)
+            await update.message.reply_text("Поставщик?", reply_markup=InlineKeyboardMarkup(keyboard))
+            return self.SUPPLIER
+
+        async def supplier_selected(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            query = update.callback_query
+            await query.answer()
+            context.user_data['supplier'] = query.data.split(":", 1)[1]
+            await query.edit_message_text("Паспорт? (введите текст)", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Пропустить", callback_data="SKIP:concrete_passport")]]))
+            return self.PASSPORT
+
+        async def passport_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            context.user_data['concrete_passport'] = update.message.text.strip()
+            await update.message.reply_text("Количество кубиков? (число)", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Пропустить", callback_data="SKIP:cubes_count")]]))
+            return self.CUBES
+
+        async def cubes_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            try:
+                context.user_data['cubes_count'] = int(update.message.text.strip())
+            except Exception:
+                await update.message.reply_text("Введите целое число для кубиков")
+                return self.CUBES
+            await update.message.reply_text("Количество конусов? (число)", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Пропустить", callback_data="SKIP:cones_count")]]))
+            return self.CONES
+
+        async def cones_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            try:
+                context.user_data['cones_count'] = int(update.message.text.strip())
+            except Exception:
+                await update.message.reply_text("Введите целое число для конусов")
+                return self.CONES
+            await update.message.reply_text("Просадка? (введите текст, например 10)", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Пропустить", callback_data="SKIP:slump")]]))
+            return self.SLUMP
+
+        async def slump_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            context.user_data['slump'] = update.message.text.strip()
+            await update.message.reply_text("Объем бетонной смеси? (число, можно с точкой)", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Пропустить", callback_data="SKIP:volume_concrete")]]))
+            return self.VOLUME
+
+        async def volume_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            try:
+                context.user_data['volume_concrete'] = float(update.message.text.strip())
+            except Exception:
+                await update.message.reply_text("Введите число для объема")
+                return self.VOLUME
+            await update.message.reply_text("Температура? (введите текст, например 12)", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Пропустить", callback_data="SKIP:temperature")]]))
+            return self.TEMP
+
+        async def temp_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            context.user_data['temperature'] = update.message.text.strip()
+            await update.message.reply_text("Сколько замеров темп.? (целое число)", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Пропустить", callback_data="SKIP:temp_measurements")]]))
+            return self.TEMP_MEAS
+
+        async def temp_meas_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            try:
+                context.user_data['temp_measurements'] = int(update.message.text.strip())
+            except Exception:
+                await update.message.reply_text("Введите целое число для замеров")
+                return self.TEMP_MEAS
+
+            keyboard = choice_keyboard(update, context, 'executor', 'EXECUTOR', 2)
+            await update.message.reply_text("Исполнитель?", reply_markup=InlineKeyboardMarkup(keyboard))
+            return self.EXECUTOR
+
+        async def executor_selected(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            query = update.callback_query
+            await query.answer()
+            context.user_data['executor'] = query.data.split(":", 1)[1]
+            await query.edit_message_text("Как назвать Акт? (введите текст)", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Пропустить", callback_data="SKIP:act_number")]]))
+            return self.ACT
+
+        async def act_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            context.user_data['act_number'] = update.message.text.strip()
+            await update.message.reply_text("№ Заявки? (введите текст)")
+            return self.REQUEST
+
+        async def request_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            context.user_data['request_number'] = update.message.text.strip()
+            keyboard = [[InlineKeyboardButton("Сегодня", callback_data="DATE:TODAY")], [InlineKeyboardButton("Пропустить", callback_data="SKIP:pour_date")]]
+            await update.message.reply_text(
+                "Какая дата? (введите ДД-ММ-ГГГГ или нажмите 'Сегодня')",
+                reply_markup=InlineKeyboardMarkup(keyboard)
+            )
+            return self.DATE
+
+        async def date_today(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            query = update.callback_query
+            await query.answer()
+            from datetime import datetime as dt
+            context.user_data['pour_date'] = dt.now().strftime("%d-%m-%Y")
+            return await finalize_and_save(update, context, edit_message=True)
+
+        async def date_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            text = update.message.text.strip()
+            if not re.match(r"^\d{2}-\d{2}-\d{4}$", text):
+                await update.message.reply_text("Формат даты: ДД-ММ-ГГГГ")
+                return self.DATE
+            context.user_data['pour_date'] = text
+            return await finalize_and_save(update, context, edit_message=False)
+
+        async def skip_selected(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            query = update.callback_query
+            await query.answer()
+            field = query.data.split(":", 1)[1]
+            defaults = {
+                'concrete_class': '',
+                'frost_resistance': '',
+                'water_resistance': '',
+                'element': '',
+                'supplier': '',
+                'concrete_passport': '',
+                'cubes_count': 0,
+                'cones_count': 0,
+                'slump': '',
+                'volume_concrete': 0.0,
+                'temperature': '',
+                'temp_measurements': 0,
+                'executor': '',
+                'act_number': '',
+                'request_number': '',
+                'pour_date': None,
+            }
+            context.user_data[field] = defaults.get(field)
+
+            # route to next step
+            if field == 'concrete_class':
+                keyboard = choice_keyboard(update, context, 'frost_resistance', 'FROST', 3)
+                await query.edit_message_text("Морозостойкость?", reply_markup=InlineKeyboardMarkup(keyboard))
+                return self.FROST
+            if field == 'frost_resistance':
+                keyboard = choice_keyboard(update, context, 'water_resistance', 'WATER', 3)
+                await query.edit_message_text("Водопроницаемость?", reply_markup=InlineKeyboardMarkup(keyboard))
+                return self.WATER
+            if field == 'water_resistance':
+                await query.edit_message_text("Конструктив? (введите текст)", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Пропустить", callback_data="SKIP:element")]]))
+                return self.ELEMENT
+            if field == 'element':
+                keyboard = choice_keyboard(update, context, 'supplier', 'SUPPLIER', 2)
+                await query.edit_message_text("Поставщик?", reply_markup=InlineKeyboardMarkup(keyboard))
+                return self.SUPPLIER
+            if field == 'supplier':
+                await query.edit_message_text("Паспорт? (введите текст)", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Пропустить", callback_data="SKIP:concrete_passport")]]))
+                return self.PASSPORT
+            if field == 'concrete_passport':
+                await query.edit_message_text("Количество кубиков? (число)", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Пропустить", callback_data="SKIP:cubes_count")]]))
+                return self.CUBES
+            if field == 'cubes_count':
+                await query.edit_message_text("Количество конусов? (число)", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Пропустить", callback_data="SKIP:cones_count")]]))
+                return self.CONES
+            if field == 'cones_count':
+                await query.edit_message_text("Просадка? (введите текст, например 10)", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Пропустить", callback_data="SKIP:slump")]]))
+                return self.SLUMP
+            if field == 'slump':
+                await query.edit_message_text("Объем бетонной смеси? (число, можно с точкой)", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Пропустить", callback_data="SKIP:volume_concrete")]]))
+                return self.VOLUME
+            if field == 'volume_concrete':
+                await query.edit_message_text("Температура? (введите текст, например 12)", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Пропустить", callback_data="SKIP:temperature")]]))
+                return self.TEMP
+            if field == 'temperature':
+                await query.edit_message_text("Сколько замеров темп.? (целое число)", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Пропустить", callback_data="SKIP:temp_measurements")]]))
+                return self.TEMP_MEAS
+            if field == 'temp_measurements':
+                keyboard = choice_keyboard(update, context, 'executor', 'EXECUTOR', 2)
+                await query.edit_message_text("Исполнитель?", reply_markup=InlineKeyboardMarkup(keyboard))
+                return self.EXECUTOR
+            if field == 'executor':
+                await query.edit_message_text("Как назвать Акт? (введите текст)", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Пропустить", callback_data="SKIP:act_number")]]))
+                return self.ACT
+            if field == 'act_number':
+                await query.edit_message_text("№ Заявки? (введите текст)", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Пропустить", callback_data="SKIP:request_number")]]))
+                return self.REQUEST
+            if field == 'request_number':
+                keyboard = [[InlineKeyboardButton("Сегодня", callback_data="DATE:TODAY")], [InlineKeyboardButton("Пропустить", callback_data="SKIP:pour_date")]]
+                await query.edit_message_text("Какая дата? (введите ДД-ММ-ГГГГ или нажмите 'Сегодня')", reply_markup=InlineKeyboardMarkup(keyboard))
+                return self.DATE
+            if field == 'pour_date':
+                from datetime import datetime as dt
+                context.user_data['pour_date'] = dt.now().strftime("%d-%m-%Y")
+                return await finalize_and_save(update, context, edit_message=True)
+            await query.edit_message_text("Отменено")
+            return ConversationHandler.END
+
+        async def finalize_and_save(update: Update, context: ContextTypes.DEFAULT_TYPE, edit_message: bool):
+            data = context.user_data
+            # Required fields defaulting
+            fields = {
+                'object_id': int(data.get('object_id')),
+                'pour_date': data.get('pour_date') or '',
+                'element': data.get('element') or '',
+                'concrete_class': data.get('concrete_class') or '',
+                'frost_resistance': data.get('frost_resistance') or '',
+                'water_resistance': data.get('water_resistance') or '',
+                'supplier': data.get('supplier') or '',
+                'concrete_passport': data.get('concrete_passport') or '',
+                'volume_concrete': float(data.get('volume_concrete') or 0),
+                'cubes_count': int(data.get('cubes_count') or 0),
+                'cones_count': int(data.get('cones_count') or 0),
+                'slump': data.get('slump') or '',
+                'temperature': data.get('temperature') or '',
+                'temp_measurements': int(data.get('temp_measurements') or 0),
+                'executor': data.get('executor') or '',
+                'act_number': data.get('act_number') or '',
+                'request_number': data.get('request_number') or '',
+                'invoice': ''
+            }
+            user_id = update.effective_user.id if update.effective_user else None
+
+            def save_job(conn):
+                cur = conn.cursor()
+                cur.execute(
+                    """
+                    INSERT INTO constructions (
+                        object_id, pour_date, element, concrete_class, frost_resistance,
+                        water_resistance, supplier, concrete_passport, volume_concrete, cubes_count,
+                        cones_count, slump, temperature, temp_measurements,
+                        executor, act_number, request_number, invoice
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        fields['object_id'], fields['pour_date'], fields['element'], fields['concrete_class'],
+                        fields['frost_resistance'], fields['water_resistance'], fields['supplier'], fields['concrete_passport'],
+                        fields['volume_concrete'], fields['cubes_count'], fields['cones_count'], fields['slump'],
+                        fields['temperature'], fields['temp_measurements'], fields['executor'], fields['act_number'],
+                        fields['request_number'], fields['invoice']
+                    )
+                )
+                if user_id is not None:
+                    usage_ranking.record_user_choices(conn, user_id, fields, cur.lastrowid)
+                return cur.lastrowid
+
+            try:
+                # Групповой коммит вместе с другими записями бота и GUI
+                new_id = await asyncio.wrap_future(writes.submit(save_job))
+            except Exception as e:
+                msg = f"Ошибка сохранения: {str(e)}"
+                if edit_message and update.callback_query:
+                    await update.callback_query.edit_message_text(msg)
+                else:
+                    await update.effective_message.reply_text(msg)
+                return ConversationHandler.END
+
+            # Предложить сразу прислать документы
+            context.user_data['new_construction_id'] = new_id
+            keyboard = [
+                [InlineKeyboardButton("Прислать акт", callback_data="SEND:ACT"), InlineKeyboardButton("Прислать заявку", callback_data="SEND:REQ")],
+                [InlineKeyboardButton("Прислать оба", callback_data="SEND:BOTH")],
+                [InlineKeyboardButton("Нет, спасибо", callback_data="SEND:NONE")]
+            ]
+            text = "Молодец что не был ленивой жопой и заполнил базу данных. Что прислать?"
+            if edit_message and update.callback_query:
+                await update.callback_query.edit_message_text(text, reply_markup=InlineKeyboardMarkup(keyboard))
+            else:
+                await update.effective_message.reply_text(text, reply_markup=InlineKeyboardMarkup(keyboard))
+            return self.SEND_ACT
+        async def send_act_choice(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            query = update.callback_query
+            await query.answer()
+            choice = query.data.split(":", 1)[1]
+            if choice == 'NONE':
+                await query.edit_message_text("Ок, ничего не отправляю")
+                context.user_data.clear()
+                return ConversationHandler.END
+
+            constr_id = context.user_data.get('new_construction_id')
+            if not constr_id:
+                await query.edit_message_text("Не найден идентификатор записи")
+                context.user_data.clear()
+                return ConversationHandler.END
+
+            # Сгенерировать документ(ы) во временный файл и отправить
+            try:
+                sent_any = await send_documents(query, constr_id, choice)
+                if sent_any is None:
+                    await query.edit_message_text("Запись не найдена для документов")
+                    return ConversationHandler.END
+                await query.edit_message_text("Готово" if sent_any else "Не удалось отправить документы")
+            except Exception as e:
+                await query.edit_message_text(f"Ошибка при формировании акта: {str(e)}")
+            finally:
+                context.user_data.clear()
+            return ConversationHandler.END
+
+        async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            context.user_data.clear()
+            await update.effective_message.reply_text("Отменено")
+            return ConversationHandler.END
+
+        conv = ConversationHandler(
+            entry_points=[CommandHandler("start", start_cmd)],
+            states={
+                self.ACTION: [CallbackQueryHandler(action_selected, pattern=r"^ACTION:")],
+                self.DOC_PICK: [
+                    CallbackQueryHandler(pick_construction, pattern=r"^PICK:"),
+                    CallbackQueryHandler(make_docs, pattern=r"^MAKE:"),
+                    CallbackQueryHandler(page_selected, pattern=r"^PAGE:REC:"),
+                ],
+                self.ORG_DOCS: [
+                    CallbackQueryHandler(org_docs_selected, pattern=r"^ORG_DOCS:"),
+                    CallbackQueryHandler(page_selected, pattern=r"^PAGE:ORG_DOCS:"),
+                    MessageHandler(filters.TEXT & ~filters.COMMAND, search_input),
+                ],
+                self.OBJ_DOCS: [
+                    CallbackQueryHandler(obj_docs_selected, pattern=r"^OBJ_DOCS:"),
+                    CallbackQueryHandler(page_selected, pattern=r"^PAGE:OBJ_DOCS:"),
+                    MessageHandler(filters.TEXT & ~filters.COMMAND, search_input),
+                ],
+                self.ORG: [
+                    CallbackQueryHandler(org_selected, pattern=r"^ORG:"),
+                    CallbackQueryHandler(page_selected, pattern=r"^PAGE:ORG:"),
+                    MessageHandler(filters.TEXT & ~filters.COMMAND, search_input),
+                ],
+                self.OBJ: [
+                    CallbackQueryHandler(obj_selected, pattern=r"^OBJ:"),
+                    CallbackQueryHandler(page_selected, pattern=r"^PAGE:OBJ:"),
+                    MessageHandler(filters.TEXT & ~filters.COMMAND, search_input),
+                ],
+                self.CLASS: [CallbackQueryHandler(class_selected, pattern=r"^CLASS:"), CallbackQueryHandler(skip_selected, pattern=r"^SKIP:concrete_class$")],
+                self.FROST: [CallbackQueryHandler(frost_selected, pattern=r"^FROST:"), CallbackQueryHandler(skip_selected, pattern=r"^SKIP:frost_resistance$")],
+                self.WATER: [CallbackQueryHandler(water_selected, pattern=r"^WATER:"), CallbackQueryHandler(skip_selected, pattern=r"^SKIP:water_resistance$")],
+                self.ELEMENT: [MessageHandler(filters.TEXT & ~filters.COMMAND, element_input)],
+                self.SUPPLIER: [CallbackQueryHandler(supplier_selected, pattern=r"^SUPPLIER:"), CallbackQueryHandler(skip_selected, pattern=r"^SKIP:supplier$")],
+                self.PASSPORT: [MessageHandler(filters.TEXT & ~filters.COMMAND, passport_input), CallbackQueryHandler(skip_selected, pattern=r"^SKIP:concrete_passport$")],
+                self.CUBES: [MessageHandler(filters.TEXT & ~filters.COMMAND, cubes_input), CallbackQueryHandler(skip_selected, pattern=r"^SKIP:cubes_count$")],
+                self.CONES: [MessageHandler(filters.TEXT & ~filters.COMMAND, cones_input), CallbackQueryHandler(skip_selected, pattern=r"^SKIP:cones_count$")],
+                self.SLUMP: [MessageHandler(filters.TEXT & ~filters.COMMAND, slump_input), CallbackQueryHandler(skip_selected, pattern=r"^SKIP:slump$")],
+                self.VOLUME: [MessageHandler(filters.TEXT & ~filters.COMMAND, volume_input), CallbackQueryHandler(skip_selected, pattern=r"^SKIP:volume_concrete$")],
+                self.TEMP: [MessageHandler(filters.TEXT & ~filters.COMMAND, temp_input), CallbackQueryHandler(skip_selected, pattern=r"^SKIP:temperature$")],
+                self.TEMP_MEAS: [MessageHandler(filters.TEXT & ~filters.COMMAND, temp_meas_input), CallbackQueryHandler(skip_selected, pattern=r"^SKIP:temp_measurements$")],
+                self.EXECUTOR: [CallbackQueryHandler(executor_selected, pattern=r"^EXECUTOR:"), CallbackQueryHandler(skip_selected, pattern=r"^SKIP:executor$")],
+                self.ACT: [MessageHandler(filters.TEXT & ~filters.COMMAND, act_input), CallbackQueryHandler(skip_selected, pattern=r"^SKIP:act_number$")],
+                self.REQUEST: [MessageHandler(filters.TEXT & ~filters.COMMAND, request_input), CallbackQueryHandler(skip_selected, pattern=r"^SKIP:request_number$")],
+                self.DATE: [
+                    CallbackQueryHandler(date_today, pattern=r"^DATE:TODAY$"),
+                    CallbackQueryHandler(skip_selected, pattern=r"^SKIP:"),
+                    MessageHandler(filters.TEXT & ~filters.COMMAND, date_input)
+                ],
+                self.SEND_ACT: [CallbackQueryHandler(send_act_choice, pattern=r"^SEND:")],
+            },
+            fallbacks=[CommandHandler("cancel", cancel)],
+            allow_reentry=True,
+            name="add_control",
+            persistent=True,
+        )
+
+        self.metrics.instrument_conversation(conv)
+        # По сохраненным диалогам: переживает перезапуск, брошенные уходят по сроку хранения
+        self.metrics.add_gauge(
+            'beton_bot_active_conversations', 'Диалоги в процессе заполнения',
+            lambda: persistence.active_conversations(conv.name)
+        )
+        self.metrics.add_gauge(
+            'beton_bot_update_queue_size', 'Обновления, ожидающие обработки', application.update_queue.qsize
+        )
+        application.add_handler(conv)
+        return application
+
+    def run(self) -> None:
+        """Запускает бота в текущем потоке и блокирует его до остановки"""
+        application = self.build_application()
+        if application is None:
+            return
+        # Сигналы ОС можно перехватывать только в главном потоке
+        run_kwargs = {}
+        if threading.current_thread() is not threading.main_thread():
+            run_kwargs['stop_signals'] = None
+        try:
+            metrics_port = self.metrics.serve()
+        except OSError as e:
+            metrics_port = None
+            print(f"[TG] Metrics server error: {e}")
+        if metrics_port:
+            print(f"[TG] Metrics on :{metrics_port}/metrics")
+        try:
+            print("[TG] Preparing event loop...")
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            if self.mode == 'webhook':
+                if not self.webhook_url:
+                    print("[TG] TELEGRAM_WEBHOOK_URL не задан, webhook не запущен")
+                    return
+                print(f"[TG] Starting webhook on {self.listen}:{self.port}/{self.webhook_path}...")
+                application.run_webhook(
+                    listen=self.listen,
+                    port=self.port,
+                    url_path=self.webhook_path,
+                    webhook_url=f"{self.webhook_url.rstrip('/')}/{self.webhook_path}",
+                    secret_token=self.secret_token,
+                    **run_kwargs
+                )
+            else:
+                print("[TG] Starting polling...")
+                application.run_polling(**run_kwargs)
+        except Exception as e:
+            print(f"[TG] run_{self.mode} error: {e}")
+        finally:
+            self.metrics.stop()
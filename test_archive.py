@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Тест архива прошлых лет в отдельных файлах SQLite
+"""
+
+import os
+
+import archive
+import change_log
+import queries
+from database_manager import DatabaseManager
+
+TEST_DB = 'test_archive.db'
+
+
+def _cleanup():
+    for path in [TEST_DB] + list(archive.list_archives(TEST_DB).values()):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def test_archive():
+    """Закрытые годы уходят в архивы, представление объединяет все годы"""
+    print("=== Тестирование архива прошлых лет ===\n")
+
+    _cleanup()
+    db = DatabaseManager(TEST_DB)
+    try:
+        org_id = db.insert_data('organizations', {'name': 'ООО "Тест"'})
+        obj_id = db.insert_data('objects', {'org_id': org_id, 'name': 'Объект'})
+        for date in ('10-05-2022', '11-06-2023', '12-07-2023', '01-02-2024'):
+            db.insert_data('constructions', {'object_id': obj_id, 'pour_date': date, 'supplier': 'Бетон-1'})
+        seq = change_log.last_seq(db.connection)
+
+        print("1. Перенос закрытых лет...")
+        assert archive.archive_closed_years(TEST_DB, before_year=2024) == {2022: 1, 2023: 2}
+        assert sorted(archive.list_archives(TEST_DB)) == [2022, 2023]
+        assert archive.open_years(db.connection) == [2024]
+        # Перенос в архив не попадает в журнал синхронизации
+        assert change_log.pending_count(db.connection, seq) == 0
+        assert archive.archive_closed_years(TEST_DB, before_year=2024) == {}
+        print("✅ В рабочей базе остался только 2024 год")
+
+        print("\n2. Представление за все годы...")
+        assert archive.attach_archives(db.connection) == [2022, 2023]
+        rows = queries.fetchall(db.connection, 'constructions.export_history', (obj_id,))
+        assert [row[0] for row in rows] == ['10-05-2022', '11-06-2023', '12-07-2023', '01-02-2024']
+        found = db.connection.execute(
+            queries.sql('constructions.by_object_history') + " AND pour_date LIKE ?", (obj_id, '%-2023')
+        ).fetchall()
+        assert len(found) == 2
+        print("✅ Поиск и выгрузка видят архивы")
+
+        print("\n🎉 Все тесты прошли успешно!")
+    finally:
+        db.close()
+        _cleanup()
+
+
+if __name__ == "__main__":
+    test_archive()
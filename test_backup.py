@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Тест онлайн-резервного копирования базы
+"""
+
+import gzip
+import os
+import shutil
+import sqlite3
+
+import archive
+import backup
+from database_manager import DatabaseManager
+
+TEST_DB = 'test_backup.db'
+TEST_DIR = 'test_backups'
+
+
+def test_backup():
+    """Копия снимается при открытом писателе, сжимается и ротируется"""
+    print("=== Тестирование резервного копирования ===\n")
+
+    if os.path.exists(TEST_DB):
+        os.remove(TEST_DB)
+    shutil.rmtree(TEST_DIR, ignore_errors=True)
+    db = DatabaseManager(TEST_DB)
+    try:
+        org_id = db.insert_data('organizations', {'name': 'ООО "Тест"'})
+        obj_id = db.insert_data('objects', {'org_id': org_id, 'name': 'Объект'})
+        for i in range(50):
+            db.insert_data('constructions', {'object_id': obj_id, 'pour_date': f'{i % 28 + 1:02d}-01-2024'})
+
+        print("1. Копия работающей базы...")
+        # Незакоммиченная транзакция писателя не попадает в копию
+        db.connection.execute("INSERT INTO organizations (name) VALUES ('Черновик')")
+        path = backup.backup_database(TEST_DB, TEST_DIR, keep=2, pages=1, pause=0)
+        db.connection.rollback()
+        assert path.endswith('.db.gz') and os.path.exists(path)
+        restored = os.path.join(TEST_DIR, 'restored.db')
+        with gzip.open(path, 'rb') as src, open(restored, 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        conn = sqlite3.connect(restored)
+        try:
+            assert conn.execute("SELECT COUNT(*) FROM constructions").fetchone()[0] == 50
+            assert conn.execute("SELECT COUNT(*) FROM organizations").fetchone()[0] == 1
+            assert conn.execute("PRAGMA quick_check").fetchone()[0] == 'ok'
+        finally:
+            conn.close()
+        os.remove(restored)
+        print("✅ Копия согласована и читается")
+
+        print("\n2. Ротация...")
+        backup.backup_database(TEST_DB, TEST_DIR, keep=2)
+        newest = backup.backup_database(TEST_DB, TEST_DIR, keep=2)
+        backups = backup.list_backups(TEST_DB, TEST_DIR)
+        assert len(backups) == 2 and backups[-1] == newest and path not in backups
+        assert backup.latest_backup_age(TEST_DB, TEST_DIR) < 60
+        print("✅ Хранятся только последние копии")
+
+        print("\n3. Архивы закрытых лет...")
+        db.insert_data('constructions', {'object_id': obj_id, 'pour_date': '01-02-2023'})
+        archive.archive_closed_years(TEST_DB, before_year=2024)
+        copied = backup.backup_archives(TEST_DB, TEST_DIR)
+        assert list(copied) == [2023] and copied[2023].endswith('test_backup_archive_2023.db.gz')
+        # Неизмененный архив повторно не копируется и в ротацию не попадает
+        backup.backup_database(TEST_DB, TEST_DIR, keep=1)
+        assert backup.backup_archives(TEST_DB, TEST_DIR) == {}
+        assert os.path.exists(copied[2023]) and len(backup.list_backups(TEST_DB, TEST_DIR)) == 1
+        print("✅ Каждый архив скопирован один раз")
+
+        print("\n🎉 Все тесты прошли успешно!")
+    finally:
+        db.close()
+        for path in [TEST_DB] + list(archive.list_archives(TEST_DB).values()):
+            if os.path.exists(path):
+                os.remove(path)
+        shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_backup()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Короткий прогон нагрузочного теста бота (bot_loadtest.py)
+"""
+
+import asyncio
+import os
+import shutil
+import sqlite3
+import tempfile
+
+import benchmark
+import bot_loadtest
+from fake_telegram_api import FakeTelegramAPI
+from telegram_bot import TelegramBotService
+
+
+def test_bot_loadtest_smoke():
+    """Диалоги проходят до конца, нехватка документов видна в отчете"""
+    print("=== Короткий нагрузочный прогон бота ===\n")
+
+    tmpdir = tempfile.mkdtemp(prefix='beton_load_test_')
+    db_path = os.path.join(tmpdir, 'load.db')
+    try:
+        benchmark.generate(db_path, 200)
+        conn = sqlite3.connect(db_path)
+        before = conn.execute("SELECT COUNT(*) FROM constructions").fetchone()[0]
+        conn.close()
+
+        print("1. Три пользователя с отправкой документов...")
+        with FakeTelegramAPI() as api:
+            service = TelegramBotService('123456:LOADTEST', db_path=db_path, base_url=api.base_url)
+            report = asyncio.run(bot_loadtest.run_load(service, api, 3, 1, 'BOTH', 0, 42))
+        conn = sqlite3.connect(db_path)
+        saved = conn.execute("SELECT COUNT(*) FROM constructions").fetchone()[0] - before
+        conn.close()
+        assert report['conversations'] == 3 and saved == 3
+        assert report['steps']['send']['count'] == 3 and report['documents_expected'] == 6
+        print(f"✅ Сохранено {saved} записей, документов {report['documents_sent']} из 6")
+
+        print("\n2. Проверка результата прогона...")
+        problems = bot_loadtest.problems(report)
+        if report['documents_sent'] < 6:
+            # Например, без docxtpl: каждый неотправленный документ виден в отчете
+            assert report['errors']['failed_documents'] > 0 and problems
+        else:
+            assert not problems
+        print(f"✅ {problems or 'без ошибок'}")
+
+        print("\n🎉 Все тесты прошли успешно!")
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_bot_loadtest_smoke()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Тест метрик бота и HTTP-выдачи в формате Prometheus
+"""
+
+import asyncio
+import urllib.request
+from types import SimpleNamespace
+
+from bot_metrics import BotMetrics
+
+
+def _update(user_id):
+    return SimpleNamespace(effective_chat=SimpleNamespace(id=user_id), effective_user=SimpleNamespace(id=user_id))
+
+
+async def start_cmd(update, context):
+    return 0
+
+
+async def finalize(update, context):
+    return -1
+
+
+async def broken(update, context):
+    raise RuntimeError("ошибка")
+
+
+def test_bot_metrics():
+    """Обработчики замеряются, /metrics отдает текст Prometheus"""
+    print("=== Тестирование метрик бота ===\n")
+    metrics = BotMetrics()
+
+    print("1. Замер обработчиков...")
+    start, done, fail = (metrics.instrument(f) for f in (start_cmd, finalize, broken))
+    asyncio.run(start(_update(1), None))
+    asyncio.run(start(_update(2), None))
+    assert asyncio.run(done(_update(1), None)) == -1
+    try:
+        asyncio.run(fail(_update(2), None))
+    except RuntimeError:
+        pass
+    assert metrics.handler_seconds.count(handler='start_cmd') == 2
+    assert metrics.handler_seconds.count(handler='broken') == 1
+    print("✅ Время и ошибки учтены")
+
+    print("\n2. Выдача /metrics...")
+    with metrics.document_render_seconds.time(doc='ACT'):
+        pass
+    metrics.add_gauge('beton_bot_update_queue_size', 'Очередь', lambda: 3)
+    metrics.add_gauge('beton_bot_active_conversations', 'Диалоги', lambda: 1)
+    port = metrics.serve(port=0)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+            text = response.read().decode()
+    finally:
+        metrics.stop()
+    assert 'beton_bot_handler_seconds_count{handler="start_cmd"} 2' in text
+    assert 'beton_bot_handler_seconds_bucket{handler="finalize",le="+Inf"} 1' in text
+    assert 'beton_bot_handler_errors_total{handler="broken"} 1.0' in text
+    assert 'beton_bot_document_render_seconds_count{doc="ACT"} 1' in text
+    assert 'beton_bot_active_conversations 1.0' in text
+    assert 'beton_bot_update_queue_size 3.0' in text
+    print("✅ Метрики доступны по HTTP")
+
+    print("\n🎉 Все тесты прошли успешно!")
+
+
+if __name__ == "__main__":
+    test_bot_metrics()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Тест хранения состояния диалогов бота в SQLite
+"""
+
+import asyncio
+import os
+import sqlite3
+import time
+
+import bot_persistence
+from bot_persistence import SQLitePersistence
+
+TEST_DB = 'test_bot_persistence.db'
+CONV = 'add_construction'
+
+
+def _persistence():
+    return SQLitePersistence(TEST_DB, update_interval=60, flush_delay=0)
+
+
+def test_bot_persistence():
+    """Диалоги и user_data переживают перезапуск, устаревшие и удаленные не возвращаются"""
+    print("=== Тестирование хранения состояния бота ===\n")
+
+    if os.path.exists(TEST_DB):
+        os.remove(TEST_DB)
+    try:
+        print("1. Сохранение и загрузка через файл базы...")
+
+        async def save():
+            persistence = _persistence()
+            await persistence.update_conversation(CONV, (42, 42), 3)
+            await persistence.update_conversation(CONV, (7, 7), 1)
+            await persistence.update_user_data(42, {'object_id': 5, 'grade': 'B25'})
+            await persistence.update_user_data(7, {'object_id': 1})
+            await persistence.flush()
+
+        async def load():
+            persistence = _persistence()
+            try:
+                return await persistence.get_conversations(CONV), await persistence.get_user_data()
+            finally:
+                await persistence.flush()
+
+        asyncio.run(save())
+        conversations, user_data = asyncio.run(load())
+        assert conversations == {(42, 42): 3, (7, 7): 1}
+        assert _persistence().active_conversations(CONV) == 2
+        assert user_data == {42: {'object_id': 5, 'grade': 'B25'}, 7: {'object_id': 1}}
+        print("✅ Состояние восстановлено после перезапуска")
+
+        print("\n2. Завершенные диалоги и пустые данные удаляются...")
+
+        async def finish():
+            persistence = _persistence()
+            await persistence.update_conversation(CONV, (7, 7), None)
+            await persistence.update_user_data(7, {})
+            # Незаписанное завершение уже учтено в числе активных диалогов
+            assert persistence.active_conversations(CONV) == 1
+            await persistence.flush()
+
+        asyncio.run(finish())
+        conversations, user_data = asyncio.run(load())
+        assert conversations == {(42, 42): 3} and list(user_data) == [42]
+        print("✅ Удаления доходят до базы")
+
+        print("\n3. Устаревшие записи...")
+        expired = time.time() - (bot_persistence.CONVERSATION_TTL_DAYS + 1) * 86400
+        conn = sqlite3.connect(TEST_DB)
+        try:
+            with conn:
+                conn.execute("UPDATE bot_conversations SET updated_at = ?", (expired,))
+                conn.execute("UPDATE bot_user_data SET updated_at = ?", (expired,))
+        finally:
+            conn.close()
+        assert _persistence().active_conversations(CONV) == 0
+        assert asyncio.run(load()) == ({}, {})
+        conn = sqlite3.connect(TEST_DB)
+        try:
+            assert conn.execute("SELECT COUNT(*) FROM bot_user_data").fetchone()[0] == 0
+        finally:
+            conn.close()
+        print("✅ Диалоги и user_data старше срока очищены")
+
+        print("\n🎉 Все тесты прошли успешно!")
+    finally:
+        if os.path.exists(TEST_DB):
+            os.remove(TEST_DB)
+
+
+if __name__ == "__main__":
+    test_bot_persistence()
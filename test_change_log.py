@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Тест журнала изменений для синхронизации с PostgreSQL
+"""
+
+import os
+import sqlite3
+
+import change_log
+from database_manager import DatabaseManager
+
+TEST_DB = 'test_change_log.db'
+
+
+def test_change_log():
+    """Триггеры пишут журнал, чтение сворачивает изменения по строкам, лента видит чужие коммиты"""
+    print("=== Тестирование журнала изменений ===\n")
+
+    if os.path.exists(TEST_DB):
+        os.remove(TEST_DB)
+    db = DatabaseManager(TEST_DB)
+    try:
+        print("1. Вставка, изменение и удаление...")
+        org_id = db.insert_data('organizations', {'name': 'ООО "Тест"'})
+        obj_id = db.insert_data('objects', {'org_id': org_id, 'name': 'Объект'})
+        first = db.insert_data('constructions', {'object_id': obj_id, 'pour_date': '15-01-2024'})
+        second = db.insert_data('constructions', {'object_id': obj_id, 'pour_date': '16-01-2024'})
+        db.update_data('constructions', {'supplier': 'Бетон-1'}, 'id = ?', (first,))
+        db.delete_data('constructions', 'id = ?', (second,))
+        assert change_log.pending_count(db.connection) == 6
+        print("✅ В журнале 6 записей")
+
+        print("\n2. Чтение порциями...")
+        seq, changes = change_log.read_changes(db.connection, 0, 3)
+        assert changes['organizations'] == {org_id: 'I'}
+        assert changes['constructions'] == {first: 'I'}
+        seq, changes = change_log.read_changes(db.connection, seq, 100)
+        assert changes['constructions'] == {first: 'U', second: 'D'}
+        assert change_log.read_changes(db.connection, seq, 100)[0] == seq
+        print("✅ Последняя операция по каждой строке")
+
+        print("\n3. Текущие строки и обрезка журнала...")
+        rows = change_log.fetch_rows(db.connection, 'constructions', ['id', 'supplier'], [first, second])
+        assert rows == [(first, 'Бетон-1')]
+        assert change_log.prune(db.connection, seq) == 6
+        assert change_log.pending_count(db.connection) == 0
+        db.insert_data('organizations', {'name': 'ООО "Новая"'})
+        assert change_log.read_changes(db.connection, 0, 100)[0] > seq
+        print("✅ Отправленные записи удалены, нумерация продолжается")
+
+        print("\n4. Лента изменений других соединений...")
+        feed = change_log.ChangeFeed(db.connection)
+        assert feed.poll() == {}
+        other = sqlite3.connect(TEST_DB)
+        try:
+            other.execute("UPDATE constructions SET element = 'Плита' WHERE id = ?", (first,))
+            other.execute("DELETE FROM objects WHERE id = ?", (obj_id,))
+            other.commit()
+            changes = feed.poll()
+            assert changes['constructions'] == {first: 'U'} and changes['objects'] == {obj_id: 'D'}
+            assert feed.poll() == {}
+            other.execute("INSERT INTO organizations (name) VALUES ('ООО \"Третья\"')")
+            other.commit()
+            change_log.prune(other, change_log.last_seq(other))
+            assert feed.poll() is None
+        finally:
+            other.close()
+        print("✅ Изменения видны, обрезанный журнал требует перезагрузки")
+
+        print("\n5. Журнал без синхронизации...")
+        for i in range(5):
+            db.insert_data('organizations', {'name': f'ООО "Орг {i}"'})
+        db.connection.execute("UPDATE change_log SET changed_at = datetime('now', '-30 days') "
+                              "WHERE seq = (SELECT MIN(seq) FROM change_log)")
+        total = change_log.pending_count(db.connection)
+        assert change_log.trim(db.connection, days=7, keep=100) == 1
+        assert change_log.trim(db.connection, days=7, keep=3) == total - 4
+        assert change_log.pending_count(db.connection) == 3
+        change_log.mark_consumer(db.connection, 'laptop', change_log.last_seq(db.connection))
+        db.insert_data('organizations', {'name': 'ООО "После синхронизации"'})
+        assert change_log.trim(db.connection, days=0, keep=0) == 0
+        print("✅ Без синхронизации журнал ограничен, с ней - не трогается")
+
+        print("\n🎉 Все тесты прошли успешно!")
+    finally:
+        db.close()
+        if os.path.exists(TEST_DB):
+            os.remove(TEST_DB)
+
+
+if __name__ == "__main__":
+    test_change_log()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Тест общего интерфейса DatabaseManager: строки-словари, потоковое чтение,
+информация о подключении
+"""
+
+import os
+
+from database_manager import DatabaseManager
+
+TEST_DB = 'test_database_manager.db'
+
+
+def test_database_manager_interface():
+    """Словари вместо кортежей, iter_query порциями, get_connection_info/test_connection"""
+    print("=== Тестирование интерфейса DatabaseManager ===\n")
+
+    if os.path.exists(TEST_DB):
+        os.remove(TEST_DB)
+    db = DatabaseManager(TEST_DB, row_factory='dict')
+    try:
+        print("1. Строки-словари...")
+        org_id = db.insert_data('organizations', {'name': 'ООО "Тест"', 'phone': '123'})
+        row = db.execute_single("SELECT id, name, phone FROM organizations WHERE id = ?", (org_id,))
+        assert row == {'id': org_id, 'name': 'ООО "Тест"', 'phone': '123'}
+        assert db.conn is db.connection
+        print("✅ Строки возвращаются словарями")
+
+        print("\n2. Потоковое чтение...")
+        obj_id = db.insert_data('objects', {'org_id': org_id, 'name': 'Объект'})
+        for i in range(25):
+            db.insert_data('constructions', {'object_id': obj_id, 'pour_date': f'{i + 1:02d}-01-2024'})
+        rows = list(db.iter_query(
+            "SELECT id, pour_date FROM constructions WHERE object_id = ? ORDER BY id", (obj_id,), batch_size=10
+        ))
+        assert len(rows) == 25 and rows[-1]['pour_date'] == '25-01-2024'
+        print("✅ Все записи прочитаны порциями")
+
+        print("\n3. Информация о подключении...")
+        info = db.get_connection_info()
+        assert info['type'] == 'SQLite' and info['database'] == TEST_DB
+        assert db.test_connection()
+        print("✅ Соединение проверено")
+
+        print("\n🎉 Все тесты прошли успешно!")
+    finally:
+        db.close()
+        if os.path.exists(TEST_DB):
+            os.remove(TEST_DB)
+
+
+if __name__ == "__main__":
+    test_database_manager_interface()
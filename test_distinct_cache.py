@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Тест справочника уникальных значений (distinct_values)
+"""
+
+import os
+
+from database_manager import DatabaseManager
+
+TEST_DB = 'test_distinct.db'
+
+
+def _construction(obj_id, supplier, executor, concrete_class='B25'):
+    return {
+        'object_id': obj_id,
+        'pour_date': '15-01-2024',
+        'concrete_class': concrete_class,
+        'supplier': supplier,
+        'executor': executor,
+    }
+
+
+def test_distinct_cache():
+    """Справочник обновляется при вставке, изменении и удалении"""
+    print("=== Тестирование справочника уникальных значений ===\n")
+
+    if os.path.exists(TEST_DB):
+        os.remove(TEST_DB)
+    db = DatabaseManager(TEST_DB)
+    try:
+        org_id = db.insert_data('organizations', {'name': 'ООО "Тест"'})
+        obj_id = db.insert_data('objects', {'org_id': org_id, 'name': 'Объект'})
+
+        print("1. Вставка конструктивов...")
+        first_id = db.insert_data('constructions', _construction(obj_id, 'Бетон-1', 'Иванов'))
+        db.insert_data('constructions', _construction(obj_id, 'Бетон-2', 'Иванов', 'B30'))
+        db.insert_data('constructions', _construction(obj_id, '', 'Петров'))
+        assert db.fetch_distinct('constructions', 'supplier') == ['Бетон-1', 'Бетон-2']
+        assert db.fetch_distinct('constructions', 'executor') == ['Иванов', 'Петров']
+        assert db.fetch_distinct('constructions', 'concrete_class') == ['B25', 'B30']
+        print("✅ Значения добавлены")
+
+        print("\n2. Изменение поставщика...")
+        db.update_data('constructions', {'supplier': 'Бетон-3'}, 'id = ?', (first_id,))
+        assert db.fetch_distinct('constructions', 'supplier') == ['Бетон-2', 'Бетон-3']
+        print("✅ Старое значение удалено, новое добавлено")
+
+        print("\n3. Удаление записей...")
+        db.delete_data('constructions', 'executor = ?', ('Петров',))
+        assert db.fetch_distinct('constructions', 'executor') == ['Иванов']
+        print("✅ Значение без ссылок удалено")
+
+        print("\n4. Сверка со SELECT DISTINCT...")
+        for column in ('supplier', 'executor', 'concrete_class'):
+            rows = db.execute_query(
+                f"SELECT DISTINCT {column} FROM constructions "
+                f"WHERE {column} IS NOT NULL AND {column} != '' ORDER BY {column}"
+            )
+            assert db.fetch_distinct('constructions', column) == [r[0] for r in rows]
+        print("✅ Справочник совпадает с таблицей")
+
+        print("\n🎉 Все тесты прошли успешно!")
+    finally:
+        db.close()
+        if os.path.exists(TEST_DB):
+            os.remove(TEST_DB)
+
+
+def test_distinct_cache_backfill():
+    """Справочник заполняется по уже существующим данным при первой установке"""
+    import sqlite3
+    import distinct_cache
+
+    if os.path.exists(TEST_DB):
+        os.remove(TEST_DB)
+    conn = sqlite3.connect(TEST_DB)
+    try:
+        conn.execute("CREATE TABLE constructions (id INTEGER PRIMARY KEY, concrete_class TEXT, "
+                     "frost_resistance TEXT, water_resistance TEXT, supplier TEXT, executor TEXT)")
+        conn.executemany("INSERT INTO constructions (supplier) VALUES (?)", [('А',), ('Б',), ('А',), (None,)])
+        distinct_cache.ensure_schema(conn)
+        conn.commit()
+        cache = distinct_cache.DistinctValueCache(conn)
+        assert cache.get('supplier') == ['А', 'Б']
+
+        # Изменения из другого соединения видны через data_version
+        other = sqlite3.connect(TEST_DB)
+        other.execute("INSERT INTO constructions (supplier) VALUES ('В')")
+        other.commit()
+        other.close()
+        assert cache.get('supplier') == ['А', 'Б', 'В']
+    finally:
+        conn.close()
+        if os.path.exists(TEST_DB):
+            os.remove(TEST_DB)
+
+
+if __name__ == "__main__":
+    test_distinct_cache()
+    test_distinct_cache_backfill()
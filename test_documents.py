@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Тест подготовки данных для документов (без GUI и без docxtpl)
+"""
+
+import os
+
+import documents
+from database_manager import DatabaseManager
+
+TEST_DB = 'test_documents.db'
+
+
+def test_documents_context():
+    """Контекст шаблона собирается из записи контроля с объектом и организацией"""
+    print("=== Тестирование подготовки документов ===\n")
+
+    if os.path.exists(TEST_DB):
+        os.remove(TEST_DB)
+    db = DatabaseManager(TEST_DB)
+    try:
+        org_id = db.insert_data('organizations', {'name': 'ООО "Тест"', 'phone': '123'})
+        obj_id = db.insert_data('objects', {'org_id': org_id, 'name': 'Объект', 'address': 'ул. Ленина'})
+        constr_id = db.insert_data('constructions', {
+            'object_id': obj_id,
+            'pour_date': '15-01-2024',
+            'element': 'Плита',
+            'concrete_class': 'B25',
+            'cones_count': 2,
+            'slump': 'П4',
+        })
+
+        print("1. Загрузка записи...")
+        data = documents.fetch_construction(db.connection, constr_id)
+        assert data['object_name'] == 'Объект'
+        assert data['org_name'] == 'ООО "Тест"'
+        assert documents.fetch_construction(db.connection, constr_id + 100) is None
+        print("✅ Запись найдена")
+
+        print("\n2. Контекст шаблона...")
+        context = documents.build_context(data, 'Акт')
+        assert context['doc_type'] == 'Акт'
+        assert context['construction']['address'] == 'ул. Ленина'
+        assert context['construction']['cones'] == 2
+        assert context['construction']['slump'] == 'П4'
+        assert context['construction']['invoice'] == ''
+        assert context['organization']['phone'] == '123'
+        print("✅ Контекст заполнен, пустые поля - пустые строки")
+
+        assert os.path.exists(documents.template_path(documents.ACT_TEMPLATE))
+        print("\n🎉 Все тесты прошли успешно!")
+    finally:
+        db.close()
+        if os.path.exists(TEST_DB):
+            os.remove(TEST_DB)
+
+
+if __name__ == "__main__":
+    test_documents_context()
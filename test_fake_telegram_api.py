@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Тест локальной имитации Telegram Bot API
+"""
+
+import json
+import threading
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from fake_telegram_api import FakeTelegramAPI
+
+
+def _call(api, method, params=None):
+    data = urllib.parse.urlencode(params or {}).encode()
+    with urllib.request.urlopen(f"{api.base_url}TOKEN/{method}", data=data, timeout=5) as response:
+        return json.loads(response.read())
+
+
+def test_fake_api_methods():
+    """Вызовы Bot API запоминаются, getUpdates отдает очередь с учетом offset"""
+    print("=== Тестирование fake Bot API ===\n")
+    with FakeTelegramAPI() as api:
+        assert _call(api, 'getMe')['result']['is_bot']
+
+        markup = json.dumps({'inline_keyboard': [[{'text': 'A', 'callback_data': 'ORG:1'}]]})
+        sent = _call(api, 'sendMessage', {'chat_id': 42, 'text': 'Привет', 'reply_markup': markup})
+        assert sent['result']['chat']['id'] == 42
+        call = api.calls_for('sendMessage', chat_id=42)[0]
+        assert call['params']['reply_markup']['inline_keyboard'][0][0]['callback_data'] == 'ORG:1'
+        print("✅ sendMessage записан с разобранной клавиатурой")
+
+        first = api.message_update(42, '/start')
+        second = api.callback_update(42, 'ACTION:ADD')
+        api.push_update(first)
+        api.push_update(second)
+        updates = _call(api, 'getUpdates', {'offset': 0, 'timeout': 0})['result']
+        assert [u['update_id'] for u in updates] == [first['update_id'], second['update_id']]
+        assert updates[0]['message']['entities'][0]['type'] == 'bot_command'
+        updates = _call(api, 'getUpdates', {'offset': second['update_id'], 'timeout': 0})['result']
+        assert [u['update_id'] for u in updates] == [second['update_id']]
+        print("✅ getUpdates учитывает offset")
+
+
+def test_fake_api_webhook():
+    """Обновления доставляются на зарегистрированный webhook с секретом"""
+    received = []
+
+    class Hook(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers['Content-Length']))
+            received.append((self.headers.get('X-Telegram-Bot-Api-Secret-Token'), json.loads(body)))
+            self.send_response(200)
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    hook = ThreadingHTTPServer(('127.0.0.1', 0), Hook)
+    threading.Thread(target=hook.serve_forever, daemon=True).start()
+    try:
+        with FakeTelegramAPI() as api:
+            url = f"http://127.0.0.1:{hook.server_address[1]}/telegram"
+            _call(api, 'setWebhook', {'url': url, 'secret_token': 's3cret'})
+            update = api.message_update(7, 'текст')
+            assert api.deliver_webhook(update) == 200
+        assert received == [('s3cret', update)]
+        print("✅ Webhook получил обновление")
+    finally:
+        hook.shutdown()
+        hook.server_close()
+
+
+if __name__ == "__main__":
+    test_fake_api_methods()
+    test_fake_api_webhook()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Тест отложенных импортов
+"""
+
+import subprocess
+import sys
+
+import lazy_imports
+
+
+def test_lazy_import():
+    """Модуль загружается при первом обращении, время импорта попадает в отчет"""
+    print("=== Тестирование отложенных импортов ===\n")
+
+    print("1. Первый импорт...")
+    sys.modules.pop('colorsys', None)
+    lazy_imports.IMPORT_TIMES.pop('colorsys', None)
+    module = lazy_imports.lazy_import('colorsys')
+    assert module is sys.modules['colorsys']
+    assert 'colorsys' in lazy_imports.IMPORT_TIMES
+    assert 'colorsys' in lazy_imports.import_report()
+    print("✅ Время импорта записано")
+
+    print("\n2. Повторное обращение...")
+    assert lazy_imports.lazy_import('colorsys') is module
+    print("✅ Модуль берется из sys.modules")
+
+    print("\n3. Модуль документов не тянет тяжелые зависимости...")
+    code = (
+        "import sys, documents; "
+        "heavy = {'docxtpl', 'openpyxl', 'telegram', 'tkinter'} & set(sys.modules); "
+        "print(', '.join(sorted(heavy)))"
+    )
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == '', result.stdout
+    print("✅ docxtpl, openpyxl, telegram и tkinter не загружены")
+
+    print("\n🎉 Все тесты прошли успешно!")
+
+
+if __name__ == "__main__":
+    test_lazy_import()
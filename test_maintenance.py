@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Тест обслуживания базы: ANALYZE, incremental vacuum, quick_check
+"""
+
+import os
+import sqlite3
+
+import change_log
+import maintenance
+from database_manager import DatabaseManager
+
+TEST_DB = 'test_maintenance.db'
+
+
+def test_maintenance():
+    """Обслуживание ждет простоя, собирает статистику и возвращает место"""
+    print("=== Тестирование обслуживания базы ===\n")
+
+    if os.path.exists(TEST_DB):
+        os.remove(TEST_DB)
+    db = DatabaseManager(TEST_DB)
+    try:
+        org_id = db.insert_data('organizations', {'name': 'ООО "Тест"'})
+        obj_id = db.insert_data('objects', {'org_id': org_id, 'name': 'Объект'})
+        db.connection.executemany(
+            "INSERT INTO constructions (object_id, pour_date, element) VALUES (?, ?, ?)",
+            [(obj_id, '01-01-2024', 'Плита ' + 'x' * 500) for _ in range(2000)]
+        )
+        db.connection.commit()
+
+        print("1. База не простаивает...")
+        assert maintenance.run_maintenance(TEST_DB) == {}
+        print("✅ Обслуживание отложено")
+
+        print("\n2. Первое обслуживание...")
+        timings = maintenance.run_maintenance(TEST_DB, idle_seconds=0)
+        assert set(timings) == {'change_log', 'optimize', 'incremental_vacuum', 'quick_check'}
+        conn = sqlite3.connect(TEST_DB)
+        try:
+            assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+            assert conn.execute("SELECT COUNT(*) FROM sqlite_stat1").fetchone()[0] > 0
+        finally:
+            conn.close()
+        print("✅ Статистика собрана, база переведена в incremental vacuum")
+
+        print("\n3. Статистика обновляется при росте данных...")
+        before = db.connection.execute(
+            "SELECT stat FROM sqlite_stat1 WHERE idx = 'idx_objects_org_id'").fetchone()[0]
+        db.connection.executemany(
+            "INSERT INTO objects (org_id, name) VALUES (?, ?)", [(org_id, f'Объект {i}') for i in range(5000)]
+        )
+        db.connection.commit()
+        maintenance.run_maintenance(TEST_DB, force=True)
+        after = db.connection.execute(
+            "SELECT stat FROM sqlite_stat1 WHERE idx = 'idx_objects_org_id'").fetchone()[0]
+        assert before.startswith('1 ') and after != before
+        print(f"✅ sqlite_stat1: '{before}' -> '{after}'")
+
+        print("\n4. Место после удалений...")
+        db.delete_data('constructions', 'object_id = ?', (obj_id,))
+        size = os.path.getsize(TEST_DB)
+        maintenance.run_maintenance(TEST_DB, force=True)
+        assert os.path.getsize(TEST_DB) < size / 2
+        print("✅ Пустые страницы возвращены системе")
+
+        print("\n5. База занята писателем...")
+        # Журнал забирает синхронизация: первый шаг только читает и успевает выполниться
+        change_log.mark_consumer(db.connection, 'test', 0)
+        busy_timeout = maintenance.BUSY_TIMEOUT
+        maintenance.BUSY_TIMEOUT = 0.1
+        writer = sqlite3.connect(TEST_DB)
+        try:
+            writer.execute("BEGIN IMMEDIATE")
+            # Прерванное обслуживание считается отложенным: планировщик его повторит
+            assert maintenance.run_maintenance(TEST_DB, force=True) == {}
+        finally:
+            writer.rollback()
+            writer.close()
+            maintenance.BUSY_TIMEOUT = busy_timeout
+        print("✅ Прерванное обслуживание будет повторено")
+
+        print("\n🎉 Все тесты прошли успешно!")
+    finally:
+        db.close()
+        if os.path.exists(TEST_DB):
+            os.remove(TEST_DB)
+
+
+if __name__ == "__main__":
+    test_maintenance()
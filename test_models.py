@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Тест типизированных записей строк (models)
+"""
+
+import os
+
+import models
+from database_manager import DatabaseManager
+
+TEST_DB = 'test_models.db'
+
+
+class _DictCursor:
+    """Курсор со строками-словарями (как RealDictCursor в PostgreSQL)"""
+    description = (('id',), ('name',), ('address',))
+
+
+def test_models():
+    """Записи создаются фабрикой строк и доступны по атрибуту, номеру и имени"""
+    print("=== Тестирование типизированных записей ===\n")
+
+    if os.path.exists(TEST_DB):
+        os.remove(TEST_DB)
+    db = DatabaseManager(TEST_DB)
+    try:
+        org_id = db.insert_data('organizations', {'name': 'ООО "Тест"', 'phone': '123'})
+        obj_id = db.insert_data('objects', {'org_id': org_id, 'name': 'Объект', 'address': 'ул. Ленина'})
+        for i in range(3):
+            db.insert_data('constructions', {'object_id': obj_id, 'pour_date': f'{i + 1:02d}-01-2024',
+                                             'supplier': 'Бетон-1'})
+
+        print("1. Записи из реестра запросов...")
+        orgs = models.fetchall(db.conn, 'organizations.list', models.Organization)
+        assert orgs == [models.Organization(org_id, 'ООО "Тест"')]
+        assert orgs[0].name == orgs[0]['name'] == orgs[0][1] and orgs[0].get('phone') is None
+        assert not hasattr(orgs[0], '__dict__')
+        print("✅ Поля по атрибуту, номеру и имени")
+
+        print("\n2. Общий курсор менеджера не меняется...")
+        assert db.execute_named('organizations.list', record=models.Organization)[0].name == 'ООО "Тест"'
+        assert db.execute_query("SELECT id, name, address FROM objects") == [(obj_id, 'Объект', 'ул. Ленина')]
+        assert db.execute_single("SELECT COUNT(*) FROM constructions") == (3,)
+        print("✅ Обычные запросы после execute_named(record=...) возвращают кортежи")
+
+        print("\n3. Колонки не совпадают с полями...")
+        rows = models.fetchall(db.conn, 'constructions.by_object', models.Construction, (obj_id,))
+        assert len(rows) == 3 and rows[0].object_id is None
+        assert rows[0].data_values[0] == '01-01-2024' and rows[0].supplier == 'Бетон-1'
+        streamed = list(db.iter_query("SELECT supplier, id FROM constructions", record=models.Construction))
+        assert [row.id for row in streamed] == [row.id for row in rows]
+        print("✅ Поля сопоставлены по именам колонок")
+
+        print("\n4. Строки-словари PostgreSQL...")
+        factory = models.row_factory(models.Object)
+        obj = factory(_DictCursor(), {'id': obj_id, 'name': 'Объект', 'address': 'ул. Ленина'})
+        assert obj == models.Object(obj_id, None, 'Объект', 'ул. Ленина')
+        assert dict(obj)['address'] == 'ул. Ленина'
+        print("✅ Словари превращаются в записи")
+
+        print("\n🎉 Все тесты прошли успешно!")
+    finally:
+        db.close()
+        if os.path.exists(TEST_DB):
+            os.remove(TEST_DB)
+
+
+if __name__ == "__main__":
+    test_models()
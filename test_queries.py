@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Тест реестра именованных запросов
+"""
+
+import sqlite3
+
+import queries
+
+
+class _RecordingCursor:
+    """Курсор, записывающий запросы (вместо соединения PostgreSQL)"""
+
+    def __init__(self):
+        self.connection = self
+        self.executed = []
+
+    def get_backend_pid(self):
+        return 4242
+
+    def execute(self, sql, params=None):
+        self.executed.append((sql, params))
+
+
+def test_queries():
+    """Компиляция под диалекты, выполнение в SQLite и PREPARE/EXECUTE в PostgreSQL"""
+    print("=== Тестирование реестра запросов ===\n")
+
+    print("1. Компиляция под диалекты...")
+    queries.register('test.literal', "SELECT '?%' AS mark, name FROM organizations WHERE id = ? AND name LIKE ?")
+    assert queries.compile_query('test.literal', 'sqlite').count('?') == 3
+    assert queries.compile_query('test.literal', 'postgresql') == (
+        "SELECT '?%' AS mark, name FROM organizations WHERE id = $1 AND name LIKE $2"
+    )
+    assert queries.sql('test.literal', 'postgresql') == (
+        "SELECT '?%%' AS mark, name FROM organizations WHERE id = %s AND name LIKE %s"
+    )
+    print("✅ Плейсхолдеры в литералах не тронуты")
+
+    print("\n2. Выполнение в SQLite...")
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE organizations (id INTEGER PRIMARY KEY, name TEXT)")
+    conn.executemany("INSERT INTO organizations (name) VALUES (?)", [('Б',), ('А',)])
+    assert queries.fetchall(conn, 'organizations.list') == [(2, 'А'), (1, 'Б')]
+    assert queries.fetchone(conn, 'test.literal', (1, 'Б')) == ('?%', 'Б')
+    conn.close()
+    print("✅ Запросы из реестра выполняются")
+
+    print("\n3. Подготовленные выражения PostgreSQL...")
+    cursor = _RecordingCursor()
+    queries.execute(cursor, 'objects.by_org', (1,))
+    queries.execute(cursor, 'objects.by_org', (2,))
+    assert cursor.executed[0][0].startswith("PREPARE beton_objects_by_org AS SELECT")
+    assert cursor.executed[1:] == [
+        ("EXECUTE beton_objects_by_org (%s)", (1,)),
+        ("EXECUTE beton_objects_by_org (%s)", (2,)),
+    ]
+    print("✅ PREPARE выполняется один раз на соединение")
+
+    print("\n🎉 Все тесты прошли успешно!")
+
+
+if __name__ == "__main__":
+    test_queries()
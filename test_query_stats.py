@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Тест замеров SQL-запросов и журнала медленных запросов
+"""
+
+import logging
+import os
+
+import query_stats
+from database_manager import DatabaseManager
+
+TEST_DB = 'test_query_stats.db'
+
+
+def test_normalize_query():
+    """Литералы и списки IN сводятся к одному ключу"""
+    first = query_stats.normalize_query("SELECT * FROM objects WHERE org_id = 5 AND name = 'А'")
+    second = query_stats.normalize_query("SELECT *  FROM objects\n WHERE org_id = 12 AND name = 'Б'")
+    assert first == second == "SELECT * FROM objects WHERE org_id = ? AND name = ?"
+    assert query_stats.normalize_query("SELECT 1 FROM t WHERE id IN (?, ?, ?)").endswith("IN (?, ...)")
+
+
+def test_query_stats(caplog):
+    """Запросы DatabaseManager и сырых курсоров попадают в статистику, медленные - в лог с планом"""
+    print("=== Тестирование замеров запросов ===\n")
+
+    if os.path.exists(TEST_DB):
+        os.remove(TEST_DB)
+    query_stats.stats.reset()
+    db = DatabaseManager(TEST_DB)
+    try:
+        print("1. Запросы через менеджер и курсор...")
+        org_id = db.insert_data('organizations', {'name': 'Орг'})
+        for i in range(3):
+            db.insert_data('objects', {'org_id': org_id, 'name': f'Объект {i}'})
+        cursor = db.connection.cursor()
+        cursor.execute("SELECT name FROM objects WHERE org_id = ?", (org_id,))
+        assert len(cursor.fetchall()) == 3
+        entries = {row['query']: row for row in db.get_query_stats()}
+        insert = entries["INSERT INTO objects (org_id, name) VALUES (?, ?)"]
+        assert insert['count'] == 3 and sum(insert['histogram'].values()) == 3
+        assert "SELECT name FROM objects WHERE org_id = ?" in entries
+        print("✅ Статистика собрана")
+
+        print("\n2. Время чтения строк...")
+        sql = "SELECT name FROM objects WHERE org_id = ?"
+        before = entries[sql]
+        rows = list(db.connection.execute(sql, (org_id,)))
+        assert db.connection.execute(sql, (org_id,)).fetchone() is not None
+        after = {row['query']: row for row in query_stats.stats.snapshot()}[sql]
+        assert len(rows) == 3 and after['count'] == before['count'] + 2
+        assert after['fetch_ms'] > before['fetch_ms'] and after['total_ms'] > before['total_ms']
+        print(f"✅ fetch_ms: {after['fetch_ms']:.3f}")
+
+        print("\n3. Журнал медленных запросов...")
+        os.environ['BETON_SLOW_QUERY_MS'] = '0'
+        with caplog.at_level(logging.WARNING, logger='query_stats'):
+            db.connection.execute("SELECT * FROM constructions WHERE supplier = 'X'").fetchall()
+        assert any('SCAN constructions' in r.getMessage() for r in caplog.records)
+        print("✅ Медленный запрос записан с планом выполнения")
+
+        print("\n🎉 Все тесты прошли успешно!")
+    finally:
+        os.environ.pop('BETON_SLOW_QUERY_MS', None)
+        db.close()
+        if os.path.exists(TEST_DB):
+            os.remove(TEST_DB)
+
+
+if __name__ == "__main__":
+    test_normalize_query()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Тест профилировщика запуска
+"""
+
+import json
+import os
+
+from startup_profiler import StartupProfiler
+
+TEST_REPORT = 'test_startup_profile.jsonl'
+
+
+def test_startup_profiler():
+    """Фазы замеряются и дописываются в отчет по строке за запуск"""
+    print("=== Тестирование профилировщика запуска ===\n")
+
+    if os.path.exists(TEST_REPORT):
+        os.remove(TEST_REPORT)
+    try:
+        print("1. Замер фаз...")
+        for _ in range(2):
+            profiler = StartupProfiler(enabled=True, report_path=TEST_REPORT)
+            profiler.mark('imports')
+            with profiler.phase('db_open_migrate'):
+                pass
+            profiler.mark('first_paint')
+            report = profiler.finish('test')
+            assert list(report['phases']) == ['imports', 'db_open_migrate', 'first_paint']
+            # Повторное завершение ничего не пишет
+            assert profiler.finish('test') is None
+        print("✅ Фазы записаны")
+
+        print("\n2. Отчет в файле...")
+        with open(TEST_REPORT, encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f]
+        assert len(lines) == 2
+        assert lines[0]['app'] == 'test' and 'total_ms' in lines[0]
+        print("✅ Каждый запуск - отдельная строка JSON")
+
+        print("\n3. Выключенный профилировщик...")
+        profiler = StartupProfiler(enabled=False, report_path=TEST_REPORT)
+        with profiler.phase('widgets'):
+            pass
+        assert profiler.phases == [] and profiler.finish('test') is None
+        print("✅ Без флага замеров нет")
+
+        print("\n🎉 Все тесты прошли успешно!")
+    finally:
+        if os.path.exists(TEST_REPORT):
+            os.remove(TEST_REPORT)
+
+
+if __name__ == "__main__":
+    test_startup_profiler()
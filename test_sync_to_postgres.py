@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Тест выбора строк для синхронизации с PostgreSQL (без сервера PostgreSQL)
+"""
+
+import os
+
+import archive
+import change_log
+from database_manager import DatabaseManager
+from sync_to_postgres import PostgresSync
+
+TEST_DB = 'test_sync_to_postgres.db'
+
+
+def _cleanup():
+    for path in [TEST_DB] + list(archive.list_archives(TEST_DB).values()):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def test_sync_after_archive():
+    """Записи, перенесенные в архив до синхронизации, отправляются, а не удаляются"""
+    print("=== Тестирование синхронизации после архивации ===\n")
+
+    _cleanup()
+    db = DatabaseManager(TEST_DB)
+    sync = PostgresSync(TEST_DB, source='test')
+    try:
+        org_id = db.insert_data('organizations', {'name': 'ООО "Тест"'})
+        obj_id = db.insert_data('objects', {'org_id': org_id, 'name': 'Объект'})
+        edited = db.insert_data('constructions', {'object_id': obj_id, 'pour_date': '11-05-2023'})
+        change_log.prune(db.connection, change_log.last_seq(db.connection))
+        # После прошлой синхронизации: новая запись, правка и удаление
+        inserted = db.insert_data('constructions', {'object_id': obj_id, 'pour_date': '10-05-2023'})
+        db.update_data('constructions', {'supplier': 'Бетон-2'}, 'id = ?', (edited,))
+        deleted = db.insert_data('constructions', {'object_id': obj_id, 'pour_date': '12-05-2024'})
+        db.delete_data('constructions', 'id = ?', (deleted,))
+
+        print("1. Архивация до синхронизации...")
+        assert archive.archive_closed_years(TEST_DB, before_year=2024) == {2023: 2}
+        assert sync.connect_sqlite()
+        archive.attach_archives(sync.sqlite_conn)
+        _, changes = change_log.read_changes(sync.sqlite_conn, 0, 100)
+        assert set(changes['constructions']) == {inserted, edited, deleted}
+        print("✅ Журнал сохранил изменения до архивации")
+
+        print("\n2. Строки для PostgreSQL...")
+        upserts, deletes = sync._current_rows(changes)
+        assert sorted(upserts['constructions']) == [edited, inserted]
+        assert 'Бетон-2' in upserts['constructions'][edited]
+        assert deletes['constructions'] == [deleted]
+        print("✅ Архивная запись записывается, удаленная - удаляется")
+
+        print("\n🎉 Все тесты прошли успешно!")
+    finally:
+        if sync.sqlite_conn is not None:
+            sync.sqlite_conn.close()
+        db.close()
+        _cleanup()
+
+
+if __name__ == "__main__":
+    test_sync_after_archive()
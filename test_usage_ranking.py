@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Тест ранжирования подсказок по частоте использования
+"""
+
+import os
+
+import usage_ranking
+from database_manager import DatabaseManager
+
+TEST_DB = 'test_usage.db'
+
+
+def test_ranked_values():
+    """Частые на объекте и у пользователя значения идут первыми"""
+    print("=== Тестирование ранжирования подсказок ===\n")
+
+    if os.path.exists(TEST_DB):
+        os.remove(TEST_DB)
+    db = DatabaseManager(TEST_DB)
+    try:
+        org_id = db.insert_data('organizations', {'name': 'ООО "Тест"'})
+        obj_a = db.insert_data('objects', {'org_id': org_id, 'name': 'Объект А'})
+        obj_b = db.insert_data('objects', {'org_id': org_id, 'name': 'Объект Б'})
+
+        for obj_id, cls, count in ((obj_a, 'B15', 1), (obj_a, 'B30', 3), (obj_b, 'B25', 5)):
+            for _ in range(count):
+                db.insert_data('constructions', {'object_id': obj_id, 'pour_date': '01-06-2024',
+                                                 'concrete_class': cls})
+
+        fallback = ['B10', 'B15', 'B25', 'B30']
+        print("1. Подсказки для объекта А...")
+        ranked = usage_ranking.ranked_values(db.connection, 'concrete_class', object_id=obj_a, fallback=fallback)
+        assert ranked == ['B30', 'B15', 'B25', 'B10']
+        print(f"✅ {ranked}")
+
+        print("\n2. Выбор пользователя поднимает значение...")
+        usage_ranking.record_user_choices(db.connection, 777, {'concrete_class': 'B25'}, None)
+        usage_ranking.record_user_choices(db.connection, 777, {'concrete_class': 'B25'}, None)
+        usage_ranking.record_user_choices(db.connection, 777, {'concrete_class': 'B25'}, None)
+        usage_ranking.record_user_choices(db.connection, 777, {'concrete_class': 'B25'}, None)
+        ranked = usage_ranking.ranked_values(db.connection, 'concrete_class', object_id=obj_a,
+                                             user_id=777, fallback=fallback)
+        assert ranked[0] == 'B25'
+        print(f"✅ {ranked}")
+
+        print("\n3. Без объекта и пользователя - по частоте в базе...")
+        ranked = usage_ranking.ranked_values(db.connection, 'concrete_class')
+        assert ranked == ['B25', 'B30', 'B15']
+        print(f"✅ {ranked}")
+
+        print("\n4. Изменение и удаление записей...")
+        db.connection.execute(
+            "UPDATE constructions SET concrete_class = 'B15' WHERE object_id = ? AND concrete_class = 'B30'", (obj_a,)
+        )
+        db.connection.execute("DELETE FROM constructions WHERE object_id = ?", (obj_b,))
+        counts = dict(db.connection.execute(
+            "SELECT scope_id || ':' || value, uses FROM value_usage WHERE scope = 'object'"
+        ).fetchall())
+        assert counts == {f'{obj_a}:B15': 4}
+        ranked = usage_ranking.ranked_values(db.connection, 'concrete_class', object_id=obj_a, fallback=fallback)
+        assert ranked == ['B15', 'B10', 'B25', 'B30']
+        print(f"✅ {ranked}")
+
+        print("\n🎉 Все тесты прошли успешно!")
+    finally:
+        db.close()
+        if os.path.exists(TEST_DB):
+            os.remove(TEST_DB)
+
+
+if __name__ == "__main__":
+    test_ranked_values()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Тест очереди записи с групповым коммитом
+"""
+
+import os
+import sqlite3
+import threading
+
+from database_manager import DatabaseManager
+from write_queue import WriteQueue
+
+TEST_DB = 'test_write_queue.db'
+
+
+def test_write_queue():
+    """Параллельные вставки объединяются в коммиты, id возвращаются вызывающим"""
+    print("=== Тестирование очереди записи ===\n")
+
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(TEST_DB + suffix):
+            os.remove(TEST_DB + suffix)
+    db = DatabaseManager(TEST_DB)
+    org_id = db.insert_data('organizations', {'name': 'ООО "Тест"'})
+    obj_id = db.insert_data('objects', {'org_id': org_id, 'name': 'Объект'})
+    db.close()
+    writes = WriteQueue(TEST_DB, max_delay=0.05)
+    try:
+        print("1. Вставки из нескольких потоков...")
+        ids = []
+
+        def worker(n):
+            futures = [writes.insert('constructions', {'object_id': obj_id, 'pour_date': f'{n:02d}-{i + 1:02d}-2024'})
+                       for i in range(10)]
+            ids.extend(future.result(timeout=10) for future in futures)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sorted(ids) == list(range(min(ids), min(ids) + 40))
+        assert writes.writes == 40 and writes.batches < 40
+        print(f"✅ 40 вставок за {writes.batches} коммитов")
+
+        print("\n2. Ошибка одной операции...")
+        bad = writes.execute("INSERT INTO no_such_table VALUES (1)")
+        good = writes.execute("UPDATE constructions SET element = 'Плита' WHERE object_id = ?", (obj_id,))
+        try:
+            bad.result(timeout=10)
+            raise AssertionError("ожидалась ошибка")
+        except sqlite3.OperationalError:
+            pass
+        assert good.result(timeout=10) == 40
+        print("✅ Остальные операции пачки сохранены")
+
+        print("\n3. Данные видны другим соединениям...")
+        writes.stop()
+        conn = sqlite3.connect(TEST_DB)
+        try:
+            assert conn.execute("SELECT COUNT(*) FROM constructions WHERE element = 'Плита'").fetchone()[0] == 40
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+        finally:
+            conn.close()
+        print("✅ Записи зафиксированы")
+
+        print("\n🎉 Все тесты прошли успешно!")
+    finally:
+        writes.stop()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(TEST_DB + suffix):
+                os.remove(TEST_DB + suffix)
+
+
+if __name__ == "__main__":
+    test_write_queue()
@@ -0,0 +1,152 @@
+"""
+Счетчики использования справочных значений для ранжирования подсказок
+
+Таблица value_usage хранит, сколько раз значение колонки выбиралось на объекте
+(scope = 'object', ведется триггерами на constructions при вставке, изменении
+и удалении) и конкретным
+пользователем бота (scope = 'user', пишется ботом при сохранении записи).
+Подсказки строятся одним запросом по первичному ключу: сначала значения,
+частые для объекта и пользователя, затем самые частые по всей базе
+(distinct_values), затем стандартный справочник.
+"""
+
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional
+
+from distinct_cache import CACHED_COLUMNS
+
+_TRIGGER_INSERT = 'trg_value_usage_ai'
+_TRIGGER_UPDATE = 'trg_value_usage_au'
+_TRIGGER_DELETE = 'trg_value_usage_ad'
+
+
+def _bump_sql(scope_id: str, column: str, alias: str, condition: str = '') -> str:
+    where = f"{alias}.{column} IS NOT NULL AND {alias}.{column} != ''"
+    if condition:
+        where += f" AND {condition}"
+    return (
+        f"INSERT INTO value_usage (scope, scope_id, column_name, value, uses, last_used) "
+        f"SELECT 'object', {scope_id}, '{column}', {alias}.{column}, 1, NEW.id "
+        f"WHERE {where} "
+        f"ON CONFLICT(scope, scope_id, column_name, value) "
+        f"DO UPDATE SET uses = uses + 1, last_used = excluded.last_used;"
+    )
+
+
+def _drop_sql(scope_id: str, column: str, alias: str, condition: str = '') -> str:
+    where = f"scope = 'object' AND scope_id = {scope_id} AND column_name = '{column}' AND value = {alias}.{column}"
+    if condition:
+        where += f" AND {condition}"
+    # Обнуленный счетчик удаляется по тому же ключу, без просмотра всей таблицы
+    return (
+        f"UPDATE value_usage SET uses = uses - 1 WHERE {where};\n"
+        f"DELETE FROM value_usage WHERE {where} AND uses <= 0;"
+    )
+
+
+def ensure_schema(conn: sqlite3.Connection) -> None:
+    """Создает таблицу счетчиков и триггеры; при первой установке заполняет счетчики объектов"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS value_usage (
+            scope TEXT NOT NULL,
+            scope_id INTEGER NOT NULL,
+            column_name TEXT NOT NULL,
+            value TEXT NOT NULL,
+            uses INTEGER NOT NULL DEFAULT 0,
+            last_used INTEGER,
+            PRIMARY KEY (scope, scope_id, column_name, value)
+        ) WITHOUT ROWID
+    """)
+    insert_body = "\n".join(_bump_sql('NEW.object_id', col, 'NEW') for col in CACHED_COLUMNS)
+    delete_body = "\n".join(_drop_sql('OLD.object_id', col, 'OLD') for col in CACHED_COLUMNS)
+    # Значение или объект записи изменились: старое значение теряет использование
+    changed = "(NEW.{col} IS NOT OLD.{col} OR NEW.object_id IS NOT OLD.object_id)"
+    update_body = "\n".join(
+        _drop_sql('OLD.object_id', col, 'OLD', changed.format(col=col)) + "\n"
+        + _bump_sql('NEW.object_id', col, 'NEW', changed.format(col=col))
+        for col in CACHED_COLUMNS
+    )
+    # Триггеры прежних версий (без уменьшения счетчиков или с очисткой всей
+    # таблицы) пересоздаются, счетчики объектов пересчитываются
+    cursor.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?",
+        (_TRIGGER_DELETE,)
+    )
+    row = cursor.fetchone()
+    if row and delete_body in row[0]:
+        return
+    for trigger in (_TRIGGER_INSERT, _TRIGGER_UPDATE, _TRIGGER_DELETE):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {_TRIGGER_INSERT} AFTER INSERT ON constructions
+        BEGIN
+        {insert_body}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {_TRIGGER_UPDATE}
+        AFTER UPDATE OF object_id, {', '.join(CACHED_COLUMNS)} ON constructions
+        BEGIN
+        {update_body}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {_TRIGGER_DELETE} AFTER DELETE ON constructions
+        BEGIN
+        {delete_body}
+        END
+    """)
+    # Первичное заполнение по уже накопленным записям
+    cursor.execute("DELETE FROM value_usage WHERE scope = 'object'")
+    for column in CACHED_COLUMNS:
+        cursor.execute(f"""
+            INSERT INTO value_usage (scope, scope_id, column_name, value, uses, last_used)
+            SELECT 'object', object_id, '{column}', {column}, COUNT(*), MAX(id) FROM constructions
+            WHERE {column} IS NOT NULL AND {column} != ''
+            GROUP BY object_id, {column}
+        """)
+
+
+def record_user_choices(conn: sqlite3.Connection, user_id: int, values: Dict[str, Any],
+                        construction_id: Optional[int] = None) -> None:
+    """Учитывает значения, выбранные пользователем бота (без коммита)"""
+    rows = [
+        (user_id, column, str(values[column]), construction_id)
+        for column in CACHED_COLUMNS
+        if values.get(column) not in (None, '')
+    ]
+    if not rows:
+        return
+    conn.executemany("""
+        INSERT INTO value_usage (scope, scope_id, column_name, value, uses, last_used)
+        VALUES ('user', ?, ?, ?, 1, ?)
+        ON CONFLICT(scope, scope_id, column_name, value)
+        DO UPDATE SET uses = uses + 1, last_used = excluded.last_used
+    """, rows)
+
+
+def ranked_values(conn: sqlite3.Connection, column: str, object_id: Optional[int] = None,
+                  user_id: Optional[int] = None, fallback: Iterable[str] = ()) -> List[str]:
+    """Значения колонки, отсортированные по частоте использования.
+
+    Порядок: часто используемые на объекте и пользователем, затем частые по
+    всей базе, затем значения из fallback. Повторы убираются.
+    """
+    if column not in CACHED_COLUMNS:
+        raise ValueError(f"Колонка {column} не входит в справочник уникальных значений")
+    rows = conn.execute("""
+        SELECT value FROM (
+            SELECT value, 0 AS tier, SUM(uses) AS score, MAX(last_used) AS recent
+            FROM value_usage
+            WHERE column_name = :column
+              AND ((scope = 'object' AND scope_id = :object_id) OR (scope = 'user' AND scope_id = :user_id))
+            GROUP BY value
+            UNION ALL
+            SELECT value, 1, ref_count, 0 FROM distinct_values WHERE column_name = :column
+        )
+        ORDER BY tier, score DESC, recent DESC, value
+    """, {'column': column, 'object_id': object_id, 'user_id': user_id}).fetchall()
+    ranked = dict.fromkeys(r[0] for r in rows)
+    ranked.update(dict.fromkeys(fallback))
+    return list(ranked)
@@ -0,0 +1,186 @@
+"""
+Очередь записи SQLite с групповым коммитом
+
+Все вставки и изменения бота и GUI выполняет один поток-писатель со своим
+соединением. Операции, пришедшие почти одновременно (в пределах MAX_DELAY),
+объединяются в одну транзакцию: на пачку приходится один fsync, а писатели
+больше не дерутся за блокировку записи ("database is locked"). Каждая
+операция выполняется в своей точке сохранения, поэтому ошибка одной не
+откатывает остальные. Вызывающий получает Future с результатом (например,
+id новой строки) уже после коммита.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Sequence
+
+import query_stats
+
+# Не больше операций в одной транзакции
+MAX_BATCH = 64
+# Сколько ждать попутные операции после первой, с
+MAX_DELAY = 0.01
+# Ожидание блокировки, если пишет кто-то помимо очереди, с
+BUSY_TIMEOUT = 30
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class WriteQueue:
+    """Единственный писатель файла SQLite с групповым коммитом"""
+
+    def __init__(self, db_path: str, max_batch: int = MAX_BATCH, max_delay: float = MAX_DELAY):
+        self.db_path = db_path
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.batches = 0
+        self.writes = 0
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='sqlite-writer', daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = None) -> None:
+        """Дописывает очередь и останавливает поток писателя"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def submit(self, job: Callable[[sqlite3.Connection], Any]) -> Future:
+        """Выполняет job(conn) в потоке писателя; Future получает результат после коммита.
+
+        job не должен сам делать commit/rollback.
+        """
+        future: Future = Future()
+        self.start()
+        self._queue.put((job, future))
+        return future
+
+    def execute(self, sql: str, params: Sequence[Any] = ()) -> Future:
+        """Запрос на изменение; результат - число затронутых строк"""
+        return self.submit(lambda conn: conn.execute(sql, params).rowcount)
+
+    def insert(self, table: str, data: Dict[str, Any]) -> Future:
+        """Вставка строки; результат - id новой строки"""
+        columns = ', '.join(data.keys())
+        placeholders = ', '.join('?' for _ in data)
+        sql = f"INSERT INTO {table} ({columns}) VALUES ({placeholders})"
+        values = tuple(data.values())
+        return self.submit(lambda conn: conn.execute(sql, values).lastrowid)
+
+    def _connect(self) -> sqlite3.Connection:
+        # Транзакциями управляем сами (BEGIN IMMEDIATE ... COMMIT)
+        conn = query_stats.connect(self.db_path, isolation_level=None, timeout=BUSY_TIMEOUT)
+        # В WAL читатели (GUI, бот) не блокируют коммит писателя
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _run(self) -> None:
+        try:
+            conn = self._connect()
+        except Exception as e:
+            logger.error(f"Очередь записи не открыла {self.db_path}: {e}")
+            self._fail_pending(e)
+            return
+        try:
+            while True:
+                batch = [self._queue.get()]
+                deadline = time.monotonic() + self.max_delay
+                while batch[-1] is not _STOP and len(batch) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    try:
+                        batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                stop = batch[-1] is _STOP
+                if stop:
+                    batch.pop()
+                if batch:
+                    self._commit(conn, batch)
+                if stop:
+                    return
+        finally:
+            conn.close()
+
+    def _fail_pending(self, error: Exception) -> None:
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not _STOP and item[1].set_running_or_notify_cancel():
+                item[1].set_exception(error)
+
+    def _commit(self, conn: sqlite3.Connection, batch) -> None:
+        """Выполняет пачку операций в одной транзакции"""
+        results = []
+        started = time.perf_counter()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for job, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                conn.execute("SAVEPOINT write_job")
+                try:
+                    results.append((future, job(conn), None))
+                    conn.execute("RELEASE write_job")
+                except Exception as e:
+                    conn.execute("ROLLBACK TO write_job")
+                    conn.execute("RELEASE write_job")
+                    results.append((future, None, e))
+            conn.execute("COMMIT")
+        except Exception as e:
+            logger.error(f"Ошибка группового коммита ({len(batch)} операций): {e}")
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.batches += 1
+        self.writes += len(results)
+        logger.debug(f"Коммит {len(results)} операций за {(time.perf_counter() - started) * 1000:.1f} мс")
+        for future, result, error in results:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+
+_queues: Dict[str, WriteQueue] = {}
+_queues_lock = threading.Lock()
+
+
+def get_queue(db_path: str) -> WriteQueue:
+    """Общая очередь записи для файла БД (одна на процесс: GUI и бот пишут через нее)"""
+    key = os.path.abspath(db_path)
+    with _queues_lock:
+        writes = _queues.get(key)
+        if writes is None:
+            writes = _queues[key] = WriteQueue(db_path)
+        return writes
+
+
+@atexit.register
+def stop_all() -> None:
+    """Дописывает все очереди (при выходе из программы)"""
+    with _queues_lock:
+        pending = list(_queues.values())
+    for writes in pending:
+        writes.stop()